@@ -1,10 +1,15 @@
 # accounts/backends.py
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.db.models import Value
+from django.db.models.functions import Lower
 
 class CaseInsensitiveModelBackend(ModelBackend):
     """
     Auth insensible à la casse pour USERNAME_FIELD (username par défaut).
+    Recherche sur LOWER(username) = LOWER(%s) : même expression que l'index
+    unique fonctionnel `unique_username_ci` (username__iexact passe par
+    UPPER / LIKE, que cet index ne couvre pas).
     """
     def authenticate(self, request, username=None, password=None, **kwargs):
         User = get_user_model()
@@ -13,7 +18,9 @@ class CaseInsensitiveModelBackend(ModelBackend):
 
         field = User.USERNAME_FIELD  # "username" sauf si tu l'as changé
         try:
-            user = User._default_manager.get(**{f"{field}__iexact": username})
+            user = User._default_manager.alias(username_ci=Lower(field)).get(
+                username_ci=Lower(Value(username))
+            )
         except User.DoesNotExist:
             # Anti-oracle de timing
             User().set_password(password)
@@ -4,10 +4,13 @@ from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
 
 # accounts/models.py
+import re
+
 from django.core.validators import RegexValidator
 from django.db import models
 from django.utils.text import slugify
 from django.contrib.auth.models import UserManager as DjangoUserManager
+from django.db.models import DEFERRED
 from django.db.models.functions import Lower
 
 
@@ -27,46 +30,74 @@ class Company(models.Model):
     secondary_color = models.CharField(max_length=7, default="#000000", validators=[hex_color_validator])
     logo = models.ImageField(upload_to="company_logos/", blank=True, null=True)
 
+    _TRACKED_FIELDS = ("name", "slug")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valeurs telles que chargées : renommage / changement de slug détectés sans relire la base
+        loaded = dict(zip(field_names, values))
+        instance._loaded_values = {f: loaded[f] for f in cls._TRACKED_FIELDS if f in loaded}
+        return instance
+
+    def loaded_value(self, field: str):
+        """Valeur de `field` au chargement depuis la base ; DEFERRED si inconnue (création, only/defer)."""
+        return getattr(self, "_loaded_values", {}).get(field, DEFERRED)
+
+    @staticmethod
+    def _slug_pattern(base: str) -> str:
+        return rf"^{re.escape(base)}(-[0-9]+)?$"
+
     def _build_unique_slug(self, base_name: str | None = None) -> str:
         """
         Slugifie le nom et garantit l'unicité en ajoutant -2, -3, ...
         (exclut l'objet courant pour éviter les faux positifs).
+        Une seule requête : tous les slugs « base » / « base-N » déjà pris,
+        puis premier suffixe libre.
         """
         base = slugify(base_name if base_name is not None else (self.name or "")) or "entreprise"
-        slug = base
-        i = 2
-        qs = Company.objects.all()
+        qs = Company.objects.filter(slug__iregex=self._slug_pattern(base))
         if self.pk:
             qs = qs.exclude(pk=self.pk)
-        while qs.filter(slug__iexact=slug).exists():
-            slug = f"{base}-{i}"
+        taken = {s.lower() for s in qs.values_list("slug", flat=True)}
+        if base not in taken:
+            return base
+        suffixes = {int(s.rsplit("-", 1)[1]) for s in taken if s != base}
+        i = 2
+        while i in suffixes:
             i += 1
-        return slug
+        return f"{base}-{i}"
+
+    def _renamed(self) -> bool:
+        if self._state.adding:
+            return True
+        original = self.loaded_value("name")
+        if original is DEFERRED:  # nom non chargé (only/defer) : on relit
+            original = Company.objects.filter(pk=self.pk).values_list("name", flat=True).first()
+            if original is None:
+                return True
+        return (original or "") != (self.name or "")
 
     def save(self, *args, **kwargs):
         """
         Aligne TOUJOURS le slug sur le nom :
         - à la création,
         - à l'édition si le nom change,
-        - ou si le slug saisi manuellement ne correspond pas au nom.
+        - ou si le slug saisi manuellement ne correspond pas au nom
+          (« nom » ou « nom-N », suffixe d'unicité, sont acceptés).
         """
         desired = slugify(self.name or "") or "entreprise"
 
-        # a) création -> on alignera
-        name_changed = True
-        # b) édition : on vérifie si le nom a changé
-        if self.pk:
-            try:
-                old = Company.objects.only("name").get(pk=self.pk)
-                name_changed = (old.name or "") != (self.name or "")
-            except Company.DoesNotExist:
-                name_changed = True
-
-        if not self.slug or name_changed or self.slug != desired:
+        if not self.slug or self._renamed() or not re.match(self._slug_pattern(desired), self.slug, re.I):
             # Regénère un slug unique basé sur le (nouveau) nom
             self.slug = self._build_unique_slug(desired)
 
         super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        self._loaded_values = {
+            **getattr(self, "_loaded_values", {}),
+            **{f: getattr(self, f) for f in self._TRACKED_FIELDS if update_fields is None or f in update_fields},
+        }
 
     class Meta:
         verbose_name = "Entreprise"
@@ -1,3 +1,63 @@
-from django.test import TestCase
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+from accounts.backends import CaseInsensitiveModelBackend
+from accounts.models import Company, User
+
+pytestmark = pytest.mark.django_db
+
+
+def test_slug_suffix_is_allocated_in_one_query(django_assert_num_queries):
+    Company.objects.create(name="Boulangerie Paul")
+    Company.objects.create(name="Boulangerie Paul !")
+    Company.objects.create(name="Boulangerie Paul 3")          # occupe déjà « -3 »
+    Company.objects.create(name="Boulangerie Paul Nord")       # même préfixe, hors motif
+
+    company = Company(name="Boulangerie  Paul")
+    with django_assert_num_queries(1):
+        assert company._build_unique_slug() == "boulangerie-paul-4"
+    assert Company.objects.get(name="Boulangerie Paul !").slug == "boulangerie-paul-2"
+
+
+def test_save_without_rename_does_not_touch_the_slug(django_assert_num_queries):
+    Company.objects.create(name="Shop")
+    company = Company.objects.create(name="Shop.")
+    assert company.slug == "shop-2"
+
+    company = Company.objects.get(pk=company.pk)
+    company.slogan = "Nouveau"
+    with django_assert_num_queries(1):  # UPDATE seul : ni relecture du nom ni recherche de slug
+        company.save()
+    assert company.slug == "shop-2"
+
+
+def test_rename_realigns_the_slug():
+    Company.objects.create(name="Alpha")
+    company = Company.objects.create(name="Beta")
+    company = Company.objects.only("id", "name", "slug").get(pk=company.pk)
+    company.name = "Alpha!"
+    company.save()
+    assert company.slug == "alpha-2"
+
+    company.name = "Gamma"
+    company.save()
+    assert Company.objects.get(pk=company.pk).slug == "gamma"
+
+
+def test_rename_detected_when_name_was_deferred():
+    company = Company.objects.create(name="Delta")
+    company = Company.objects.defer("name").get(pk=company.pk)
+    company.name = "Epsilon"
+    company.save()
+    assert company.slug == "epsilon"
+
+
+def test_login_lookup_uses_the_functional_index_expression():
+    user = User.objects.create_user("Marie.Dupont", password="s3cret!", profile=User.Profile.ADMIN)
+    backend = CaseInsensitiveModelBackend()
+    with CaptureQueriesContext(connection) as ctx:
+        assert backend.authenticate(None, username="MARIE.dupont", password="s3cret!") == user
+    assert 'WHERE LOWER("accounts_user"."username") = (LOWER(' in ctx.captured_queries[0]["sql"]
+    assert backend.authenticate(None, username="marie.dupont", password="wrong") is None
+    assert backend.authenticate(None, username="inconnu", password="s3cret!") is None
@@ -90,6 +90,7 @@ SITE_ID = int(os.getenv("SITE_ID", "1"))
 # ======================================================================
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.QueryInstrumentationMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -129,6 +130,64 @@ DATABASES = {
     )
 }
 
+# ======================================================================
+# CACHE (Redis si REDIS_URL, sinon mémoire locale du process)
+# ======================================================================
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": "parrainapp",
+        }
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+# Sessions : lues en cache (Redis) avec écriture de secours en base ; sans Redis,
+# base seule (un LocMem par processus servirait des sessions périmées).
+# SESSION_ENGINE=django.contrib.sessions.backends.cache : Redis seul, sans table.
+SESSION_ENGINE = os.getenv(
+    "SESSION_ENGINE",
+    "django.contrib.sessions.backends.cached_db" if REDIS_URL else "django.contrib.sessions.backends.db",
+)
+
+# Autocomplete parrains : durée de vie des préfixes en cache (secondes)
+REFERRER_AUTOCOMPLETE_CACHE_TTL = int(os.getenv("REFERRER_AUTOCOMPLETE_CACHE_TTL", "30"))
+# Pages publiques d'entreprise : cache serveur + en-têtes pour Caddy / CDN
+PUBLIC_LANDING_CACHE_TTL = int(os.getenv("PUBLIC_LANDING_CACHE_TTL", "3600"))
+PUBLIC_LANDING_MAX_AGE = int(os.getenv("PUBLIC_LANDING_MAX_AGE", "60"))
+PUBLIC_LANDING_EDGE_MAX_AGE = int(os.getenv("PUBLIC_LANDING_EDGE_MAX_AGE", "300"))
+# Page publique d'une récompense (lien SMS) : projection en cache par token
+REWARD_CLAIM_CACHE_TTL = int(os.getenv("REWARD_CLAIM_CACHE_TTL", "600"))
+REWARD_CLAIM_MISSING_TTL = int(os.getenv("REWARD_CLAIM_MISSING_TTL", "60"))
+# Jetons signés (id + entreprise + expiration) pour les nouveaux liens de récompense
+REWARD_SIGNED_TOKENS = env_bool("REWARD_SIGNED_TOKENS", False)
+# Clé des flux de tirage déterministes (rewards.services.rng) ; défaut : SECRET_KEY.
+# À fixer une fois pour toutes : la changer rend les tirages journalisés non rejouables.
+REWARD_RNG_SECRET = os.getenv("REWARD_RNG_SECRET", "")
+
+# ======================================================================
+# INSTRUMENTATION (core.middleware.QueryInstrumentationMiddleware)
+# ======================================================================
+PERF_INSTRUMENTATION = env_bool("PERF_INSTRUMENTATION", True)
+PERF_SERVER_TIMING = env_bool("PERF_SERVER_TIMING", True)
+# Nombre max de requêtes SQL par vue (nom d'URL) ; au-delà : WARNING, ou exception si QUERY_BUDGET_RAISE
+QUERY_BUDGETS = {
+    "dashboard:superadmin_home": int(os.getenv("QUERY_BUDGET_SUPERADMIN_HOME", "60")),
+    "dashboard:client_detail": int(os.getenv("QUERY_BUDGET_CLIENT_DETAIL", "12")),
+    "dashboard:referral_create": int(os.getenv("QUERY_BUDGET_REFERRAL_CREATE", "40")),
+}
+QUERY_BUDGET_RAISE = env_bool("QUERY_BUDGET_RAISE", False)
+# /metrics (format Prometheus) : superadmin, jeton Bearer ou IP autorisée (stockage Redis si REDIS_URL)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_ALLOWED_IPS = env_list("METRICS_ALLOWED_IPS", "127.0.0.1,::1")
+# Envoi à Redis par un thread de fond, toutes les N secondes (jamais pendant une requête)
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))
+
 # ======================================================================
 # AUTH / PASSWORDS
 # ======================================================================
@@ -231,20 +290,39 @@ else:
 # ======================================================================
 # LOGGING
 # ======================================================================
+# Handler non bloquant : file bornée + QueueListener (core.logs), aucune écriture
+# console dans le thread de la requête. Les loggers applicatifs propagent vers root
+# (un seul handler : plus de lignes en double).
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
     "handlers": {
-        "console": {"class": "logging.StreamHandler"},
+        "console": {
+            "class": "core.logs.QueueStreamHandler",
+            "maxsize": int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+        },
     },
     "root": {"handlers": ["console"], "level": "INFO" if not DEBUG else "DEBUG"},
     "loggers": {
-        "rewards.services.smsmode": {"handlers": ["console"], "level": "INFO"},
-        "dashboard": {"handlers": ["console"], "level": "INFO"},
-        "dashboard.views": {"handlers": ["console"], "level": "INFO"},
+        "rewards.services.smsmode": {"level": "INFO"},
+        "dashboard": {"level": "INFO"},
+        "dashboard.views": {"level": "INFO"},
+        "events": {"level": os.getenv("LOG_EVENTS_LEVEL", "INFO")},
     },
 }
 
+# Événements structurés (core.events) : niveau et taux d'échantillonnage par type
+LOG_EVENT_LEVELS = {
+    "wheel.eligibility": "DEBUG",
+    "referral.draw": "INFO",
+    "sms.sent": "INFO",
+}
+LOG_EVENT_SAMPLE_RATES = {
+    "wheel.eligibility": float(os.getenv("LOG_SAMPLE_WHEEL_ELIGIBILITY", "0.01")),
+    "referral.draw": float(os.getenv("LOG_SAMPLE_REFERRAL_DRAW", "0.1")),
+    "sms.sent": float(os.getenv("LOG_SAMPLE_SMS_SENT", "1.0")),
+}
+
 # ======================================================================
 # DÉBOGAGE EMAIL (envoi immédiat au lieu de queue)
 # ======================================================================
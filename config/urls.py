@@ -9,6 +9,8 @@ from django.db import connection
 from django.http import JsonResponse
 from django.urls import reverse
 
+from core.views import metrics_view
+
 
 def healthz(request):
     try:
@@ -43,6 +45,7 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("healthz", healthz, name="healthz"),
     path("healthz/", healthz, name="healthz-slash"),
+    path("metrics", metrics_view, name="metrics"),
     path("legal/", include("legal.urls", namespace="legal")),
 ]
 
@@ -0,0 +1,50 @@
+# core/events.py
+"""
+Événements structurés des chemins chauds (tirages, éligibilité, envois SMS…).
+
+- Un événement = un nom ("wheel.eligibility") + des champs clé=valeur, émis
+  sur le logger "events" (champs aussi disponibles en extra pour un formatter JSON).
+- Niveau par type d'événement (settings.LOG_EVENT_LEVELS, INFO par défaut).
+- Échantillonnage par type (settings.LOG_EVENT_SAMPLE_RATES, 1.0 par défaut) ;
+  WARNING et au-delà ne sont jamais échantillonnés.
+- Les handlers sont non bloquants (core.logs.QueueStreamHandler, cf. LOGGING).
+"""
+from __future__ import annotations
+
+import logging
+import random
+
+from django.conf import settings
+
+logger = logging.getLogger("events")
+
+_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+}
+
+
+def _level_for(name: str) -> int:
+    level = getattr(settings, "LOG_EVENT_LEVELS", {}).get(name, "INFO")
+    return _LEVELS.get(str(level).upper(), logging.INFO) if not isinstance(level, int) else level
+
+
+def _sampled(name: str, level: int) -> bool:
+    if level >= logging.WARNING:
+        return True
+    rate = float(getattr(settings, "LOG_EVENT_SAMPLE_RATES", {}).get(name, 1.0))
+    return rate >= 1.0 or random.random() < rate
+
+
+def emit(name: str, level: int | None = None, **fields) -> None:
+    """
+    Émet l'événement `name` (niveau forcé possible, ex. WARNING sur un échec).
+    Coût quasi nul si le niveau est filtré ou l'événement non échantillonné.
+    """
+    level = _level_for(name) if level is None else level
+    if not logger.isEnabledFor(level) or not _sampled(name, level):
+        return
+    message = " ".join(f"{k}={v}" for k, v in fields.items())
+    logger.log(level, "event=%s %s", name, message, extra={"event": name, "fields": fields})
@@ -0,0 +1,37 @@
+# core/logs.py
+"""
+Handler de logs non bloquant pour LOGGING.
+
+Le thread de la requête ne fait que déposer l'enregistrement (déjà formaté)
+dans une file bornée ; un QueueListener écrit sur le flux en arrière-plan.
+File pleine : l'enregistrement est abandonné plutôt que de bloquer la requête.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+
+class QueueStreamHandler(QueueHandler):
+    def __init__(self, stream=None, maxsize: int = 10000):
+        super().__init__(queue.Queue(maxsize))
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.dropped = 0
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        # Vide la file avant l'arrêt (idempotent : atexit puis logging.shutdown)
+        if self.listener._thread is not None:
+            self.listener.stop()
+        super().close()
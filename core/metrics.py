@@ -0,0 +1,274 @@
+# core/metrics.py
+"""
+Métriques applicatives exposées au format texte Prometheus (core.views.metrics).
+
+Stockage partagé entre les workers gunicorn :
+- Redis (settings.REDIS_URL) : un hash par métrique, champ = série complète
+  (nom + labels), incréments atomiques HINCRBYFLOAT. Les incréments sont
+  cumulés dans le process et envoyés en un seul pipeline par un thread de fond
+  (METRICS_FLUSH_INTERVAL) : aucune requête HTTP n'attend Redis, même injoignable ;
+- sinon dictionnaire du process (dev / tests : un seul worker).
+
+Une erreur de stockage n'interrompt jamais la requête : la mesure est perdue, c'est tout.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+try:  # dépendance optionnelle (présente en prod avec REDIS_URL)
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+COUNTER, GAUGE, HISTOGRAM = "counter", "gauge", "histogram"
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# nom -> (type, aide)
+METRICS: Dict[str, Tuple[str, str]] = {
+    "http_request_duration_seconds": (HISTOGRAM, "Durée des requêtes HTTP par vue (nom d'URL)."),
+    "http_request_queries": (HISTOGRAM, "Nombre de requêtes SQL par requête HTTP, par vue."),
+    "wheel_draws_total": (COUNTER, "Tirages de récompense par entreprise, bucket et mode."),
+    "wheel_lock_wait_seconds": (HISTOGRAM, "Attente du verrou de ligne ProbabilityWheel (select_for_update)."),
+    "notification_send_duration_seconds": (HISTOGRAM, "Durée d'envoi SMS / email par fournisseur et résultat."),
+    "notifications_inflight": (GAUGE, "Notifications (SMS / email) en cours d'envoi."),
+}
+
+QUERY_BUCKETS: Tuple[float, ...] = (1, 2, 5, 10, 20, 50, 100)
+_BUCKETS = {"http_request_queries": QUERY_BUCKETS}
+
+
+def _labels(labels: Dict[str, object], le: Optional[str] = None) -> str:
+    parts = []
+    for key in sorted(labels):
+        value = str(labels[key]).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    if le is not None:
+        parts.append(f'le="{le}"')  # toujours en dernier (tri des buckets à l'exposition)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# ------------------ Stockage ------------------
+class LocalStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    def add(self, metric: str, increments: Iterable[Tuple[str, float]]) -> None:
+        with self._lock:
+            for series, amount in increments:
+                self._data[metric][series] += amount
+
+    def dump(self, metric: str) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._data.get(metric, {}))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class RedisStore:
+    """
+    add() cumule en mémoire (aucune E/S) ; flush() envoie le cumul en un pipeline,
+    depuis un thread de fond démarré au premier add() du process (après le fork gunicorn).
+    Redis injoignable : le cumul est conservé et renvoyé au flush suivant.
+    """
+
+    def __init__(self, url: str, prefix: str = "parrainapp:metrics:", *, client=None,
+                 flush_interval: float = 1.0):
+        self._client = client or redis.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+        self._prefix = prefix
+        self._flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], float] = defaultdict(float)
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_pid: Optional[int] = None
+
+    def add(self, metric: str, increments: Iterable[Tuple[str, float]]) -> None:
+        with self._lock:
+            for series, amount in increments:
+                self._pending[(metric, series)] += amount
+        self._ensure_flusher()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(float)
+        if not pending:
+            return
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for (metric, series), amount in pending.items():
+                pipe.hincrbyfloat(self._prefix + metric, series, amount)
+            pipe.execute()
+        except Exception:
+            with self._lock:  # réessayé au prochain flush
+                for key, amount in pending.items():
+                    self._pending[key] += amount
+            raise
+
+    def _ensure_flusher(self) -> None:
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            self._flusher_pid = pid
+            self._flusher = threading.Thread(target=self._run, name="metrics-flush", daemon=True)
+            self._flusher.start()
+            atexit.register(self._flush_quietly)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self._flush_interval)
+            self._flush_quietly()
+
+    def _flush_quietly(self) -> None:
+        try:
+            self.flush()
+        except Exception:
+            logger.debug("Métriques non envoyées à Redis (nouvel essai au prochain flush)", exc_info=True)
+
+    def dump(self, metric: str) -> Dict[str, float]:
+        self._flush_quietly()  # /metrics voit aussi le cumul du process courant
+        raw = self._client.hgetall(self._prefix + metric)
+        return {k.decode(): float(v) for k, v in raw.items()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+        for metric in METRICS:
+            self._client.delete(self._prefix + metric)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                url = getattr(settings, "REDIS_URL", "")
+                _store = (
+                    RedisStore(url, flush_interval=getattr(settings, "METRICS_FLUSH_INTERVAL", 1.0))
+                    if (url and redis is not None) else LocalStore()
+                )
+    return _store
+
+
+def _add(metric: str, increments) -> None:
+    try:
+        get_store().add(metric, increments)
+    except Exception:
+        logger.debug("Métrique %s non enregistrée", metric, exc_info=True)
+
+
+# ------------------ API d'enregistrement ------------------
+def inc(name: str, amount: float = 1, **labels) -> None:
+    """Compteur (ou jauge, avec un montant négatif)."""
+    _add(name, [(name + _labels(labels), amount)])
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """Histogramme cumulatif : buckets le=…, +Inf, _sum et _count."""
+    # Tous les buckets sont écrits (0 compris) pour que chaque série soit complète
+    increments = [
+        (f"{name}_bucket" + _labels(labels, le=_fmt(bound)), 1 if value <= bound else 0)
+        for bound in _BUCKETS.get(name, DEFAULT_BUCKETS)
+    ]
+    increments += [
+        (f"{name}_bucket" + _labels(labels, le="+Inf"), 1),
+        (f"{name}_sum" + _labels(labels), value),
+        (f"{name}_count" + _labels(labels), 1),
+    ]
+    _add(name, increments)
+
+
+def observe_on_commit(name: str, value: float, **labels) -> None:
+    """
+    observe() différé au commit de la transaction courante (immédiat hors transaction) :
+    une mesure prise sous verrou de ligne n'ajoute rien à la section critique.
+    """
+    transaction.on_commit(lambda: observe(name, value, **labels))
+
+
+@contextmanager
+def timer(name: str, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def email_provider() -> str:
+    # "django.core.mail.backends.smtp.EmailBackend" -> "smtp"
+    parts = getattr(settings, "EMAIL_BACKEND", "").split(".")
+    return parts[-2] if len(parts) >= 2 else "email"
+
+
+@contextmanager
+def track_send(channel: str, provider: str):
+    """
+    Mesure un envoi de notification. Le bloc peut préciser le résultat
+    (outcome["value"] = "error" / "dry_run"…) ; une exception compte comme "error".
+    """
+    outcome = {"value": "ok"}
+    inc("notifications_inflight", 1, channel=channel)
+    start = time.perf_counter()
+    try:
+        yield outcome
+    except Exception:
+        outcome["value"] = "error"
+        raise
+    finally:
+        inc("notifications_inflight", -1, channel=channel)
+        observe(
+            "notification_send_duration_seconds", time.perf_counter() - start,
+            channel=channel, provider=provider, outcome=outcome["value"],
+        )
+
+
+# ------------------ Exposition ------------------
+def _sort_key(series: str) -> Tuple[str, float]:
+    # Buckets dans l'ordre numérique de "le" (+Inf en dernier)
+    if 'le="' not in series:
+        return series, 0.0
+    head, _, rest = series.partition('le="')
+    bound = rest.split('"', 1)[0]
+    return head, float("inf") if bound == "+Inf" else float(bound)
+
+
+def render(store=None) -> str:
+    store = store or get_store()
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        try:
+            series = store.dump(name)
+        except Exception:
+            logger.warning("Lecture de la métrique %s impossible", name, exc_info=True)
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for key in sorted(series, key=_sort_key):
+            lines.append(f"{key} {_fmt(series[key])}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,119 @@
+# core/middleware.py
+"""
+Instrumentation des requêtes HTTP : nombre de requêtes SQL, temps base, temps total.
+
+- Un wrapper connection.execute_wrapper() compte et chronomètre chaque requête SQL
+  exécutée pendant la vue (toutes les connexions configurées).
+- Une ligne de log structurée par requête HTTP, indexée par nom d'URL résolu
+  (ex. "dashboard:client_detail"), un en-tête Server-Timing (onglet réseau du navigateur,
+  personnel connecté uniquement) et les histogrammes de core.metrics (durée, nombre de requêtes SQL).
+- Budgets par vue (settings.QUERY_BUDGETS) : dépassement = WARNING, ou exception
+  QueryBudgetExceeded si settings.QUERY_BUDGET_RAISE (tests) — pour attraper les N+1.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Une vue a exécuté plus de requêtes SQL que son budget."""
+
+
+class QueryStats:
+    """Wrapper d'exécution : compte les requêtes et cumule le temps passé en base."""
+
+    def __init__(self):
+        self.count = 0
+        self.db_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - start
+            self.count += 1
+
+
+def view_name(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    return (match.view_name if match else "") or "-"
+
+
+def sees_server_timing(request) -> bool:
+    """
+    Server-Timing réservé au personnel connecté : les pages publiques (landing,
+    mises en cache par les proxys) ne doivent pas exposer les temps internes.
+    """
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return False
+    return bool(
+        user.is_staff or user.is_superuser
+        or any(getattr(user, check, lambda: False)() for check in ("is_superadmin", "is_admin_entreprise", "is_operateur"))
+    )
+
+
+class QueryInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, "PERF_INSTRUMENTATION", True):
+            return self.get_response(request)
+
+        stats = QueryStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(stats))
+            response = self.get_response(request)
+        total_seconds = time.perf_counter() - start
+
+        name = view_name(request)
+        request.query_stats = stats
+        request.total_seconds = total_seconds
+
+        if getattr(settings, "PERF_SERVER_TIMING", True) and sees_server_timing(request):
+            response["Server-Timing"] = (
+                f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.count} queries", '
+                f"app;dur={total_seconds * 1000:.1f}"
+            )
+
+        logger.info(
+            "request view=%s method=%s status=%s queries=%d db_ms=%.1f total_ms=%.1f",
+            name, request.method, response.status_code, stats.count,
+            stats.db_seconds * 1000, total_seconds * 1000,
+            extra={
+                "view": name,
+                "status": response.status_code,
+                "queries": stats.count,
+                "db_ms": round(stats.db_seconds * 1000, 1),
+                "total_ms": round(total_seconds * 1000, 1),
+            },
+        )
+
+        metrics.observe("http_request_duration_seconds", total_seconds, view=name, method=request.method)
+        metrics.observe("http_request_queries", stats.count, view=name)
+
+        self._check_budget(name, stats.count)
+        return response
+
+    @staticmethod
+    def _check_budget(name: str, count: int) -> None:
+        budget = getattr(settings, "QUERY_BUDGETS", {}).get(name)
+        if budget is None or count <= budget:
+            return
+        message = f"Budget de requêtes dépassé pour {name} : {count} > {budget}"
+        if getattr(settings, "QUERY_BUDGET_RAISE", False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
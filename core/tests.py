@@ -1,3 +1,176 @@
-from django.test import TestCase
+import io
+import logging
 
-# Create your tests here.
+import pytest
+from django.urls import reverse
+
+from accounts.models import Company, User
+from core import events, metrics
+from core.logs import QueueStreamHandler
+from core.middleware import QueryBudgetExceeded
+from dashboard.models import Client, Referral
+from rewards.models import Reward
+from rewards.services.smsmode import SMSPayload, send_sms
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def company_admin(client):
+    c = Company.objects.create(name="Shop Perf")
+    parrain = Client.objects.create(company=c, last_name="Parrain", is_referrer=True)
+    for i in range(3):
+        referee = Client.objects.create(company=c, last_name=f"Filleul{i}")
+        ref = Referral.objects.create(company=c, referrer=parrain, referee=referee)
+        Reward.objects.create(company=c, client=parrain, referral=ref, label=f"R{i}", bucket="SOUVENT")
+    client.force_login(User.objects.create_user("admin-perf", password="pw", profile="admin", company=c))
+    return parrain
+
+
+def test_server_timing_and_structured_log_per_url_name(client, company_admin, caplog):
+    with caplog.at_level(logging.INFO, logger="core.middleware"):
+        resp = client.get(reverse("dashboard:client_detail", args=[company_admin.id]))
+
+    assert resp.status_code == 200
+    assert resp["Server-Timing"].startswith("db;dur=") and "app;dur=" in resp["Server-Timing"]
+    record = next(r for r in caplog.records if r.name == "core.middleware")
+    assert record.view == "dashboard:client_detail"
+    assert record.queries == resp.wsgi_request.query_stats.count > 0
+
+
+def test_server_timing_is_not_sent_on_public_landing(client):
+    Company.objects.create(name="Shop Public", slug="shop-public")
+    resp = client.get(reverse("public:company_presentation", args=["shop-public"]))
+    assert resp.status_code == 200
+    assert "Server-Timing" not in resp
+
+
+def test_query_budget_logs_or_raises(client, company_admin, settings, caplog):
+    url = reverse("dashboard:client_detail", args=[company_admin.id])
+    settings.QUERY_BUDGETS = {"dashboard:client_detail": 1}
+
+    with caplog.at_level(logging.WARNING, logger="core.middleware"):
+        assert client.get(url).status_code == 200
+    assert any("Budget de requêtes dépassé" in r.getMessage() for r in caplog.records)
+
+    settings.QUERY_BUDGET_RAISE = True
+    with pytest.raises(QueryBudgetExceeded):
+        client.get(url)
+
+    settings.QUERY_BUDGETS = {"dashboard:client_detail": 12}
+    assert client.get(url).status_code == 200
+
+
+@pytest.fixture
+def metric_store():
+    store = metrics.get_store()
+    store.clear()
+    yield store
+    store.clear()
+
+
+def test_histogram_is_cumulative_and_rendered_in_bucket_order(metric_store):
+    metrics.observe("wheel_lock_wait_seconds", 0.03, key="base_100")
+    metrics.observe("wheel_lock_wait_seconds", 3, key="base_100")
+    metrics.inc("wheel_draws_total", company=1, bucket="SOUVENT", mode="wheel")
+
+    lines = metrics.render().splitlines()
+    buckets = [l for l in lines if l.startswith("wheel_lock_wait_seconds_bucket")]
+    assert [l.rsplit(" ", 1)[1] for l in buckets] == ["0", "0", "0", "1", "1", "1", "1", "1", "1", "2", "2", "2"]
+    assert buckets[-1].startswith('wheel_lock_wait_seconds_bucket{key="base_100",le="+Inf"}')
+    assert 'wheel_lock_wait_seconds_count{key="base_100"} 2' in lines
+    assert 'wheel_draws_total{bucket="SOUVENT",company="1",mode="wheel"} 1' in lines
+
+
+def test_lock_wait_is_observed_after_commit_only(metric_store, django_capture_on_commit_callbacks):
+    from django.db import transaction
+
+    series = 'wheel_lock_wait_seconds_count{key="base_100"} 1'
+    with django_capture_on_commit_callbacks(execute=True):
+        with transaction.atomic():
+            metrics.observe_on_commit("wheel_lock_wait_seconds", 0.01, key="base_100")
+            assert series not in metrics.render().splitlines()  # verrou encore tenu
+    assert series in metrics.render().splitlines()
+
+
+class _FakeRedis:
+    def __init__(self, down=False):
+        self.down, self.calls, self.data = down, [], {}
+
+    def pipeline(self, transaction=False):
+        return self
+
+    def hincrbyfloat(self, key, field, amount):
+        self.calls.append((key, field, amount))
+
+    def execute(self):
+        if self.down:
+            self.calls.clear()
+            raise ConnectionError("redis injoignable")
+        for key, field, amount in self.calls:
+            self.data.setdefault(key, {}).setdefault(field, 0.0)
+            self.data[key][field] += amount
+        self.calls.clear()
+
+
+def test_redis_store_buffers_in_process_and_retries_after_outage(monkeypatch):
+    fake = _FakeRedis(down=True)
+    store = metrics.RedisStore("redis://unused", prefix="t:", client=fake)
+    monkeypatch.setattr(store, "_ensure_flusher", lambda: None)  # flush piloté par le test
+
+    store.add("wheel_draws_total", [("wheel_draws_total", 1)])  # aucune E/S dans la requête
+    store.add("wheel_draws_total", [("wheel_draws_total", 2)])
+    assert fake.data == {}
+    with pytest.raises(ConnectionError):
+        store.flush()
+
+    fake.down = False
+    store.flush()
+    assert fake.data == {"t:wheel_draws_total": {"wheel_draws_total": 3.0}}
+
+
+def test_metrics_endpoint_is_restricted_and_exposes_requests_and_sms(client, settings, metric_store):
+    settings.METRICS_ALLOWED_IPS = []
+    settings.METRICS_TOKEN = "s3cret"
+    settings.SMSMODE = {**settings.SMSMODE, "DRY_RUN": True}
+    url = reverse("metrics")
+
+    assert client.get(url).status_code == 403
+    assert client.get(url, HTTP_AUTHORIZATION="Bearer nope").status_code == 403
+
+    send_sms(SMSPayload(to="0612345678", text="Bonjour"))
+    resp = client.get(url, HTTP_AUTHORIZATION="Bearer s3cret")
+    body = resp.content.decode()
+    assert resp.status_code == 200 and resp["Content-Type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",view="metrics"} 2' in body
+    assert 'notification_send_duration_seconds_count{channel="sms",outcome="dry_run",provider="smsmode"} 1' in body
+    assert 'notifications_inflight{channel="sms"} 0' in body
+
+
+def test_events_are_levelled_and_sampled(settings, caplog):
+    settings.LOG_EVENT_LEVELS = {"wheel.eligibility": "DEBUG", "sms.sent": "INFO"}
+    settings.LOG_EVENT_SAMPLE_RATES = {"wheel.eligibility": 1.0, "sms.sent": 0.0}
+
+    with caplog.at_level(logging.INFO, logger="events"):
+        events.emit("wheel.eligibility", company=1)           # DEBUG filtré
+        events.emit("sms.sent", ok=True)                       # taux 0 : jamais émis
+        events.emit("sms.sent", logging.WARNING, ok=False)     # WARNING : jamais échantillonné
+    assert [(r.levelno, r.event, r.fields) for r in caplog.records] == [
+        (logging.WARNING, "sms.sent", {"ok": False}),
+    ]
+    assert caplog.records[0].getMessage() == "event=sms.sent ok=False"
+
+
+def test_queue_handler_never_blocks_when_full():
+    stream = io.StringIO()
+    handler = QueueStreamHandler(stream=stream, maxsize=1)
+    handler.listener.stop()  # plus de consommateur : la file se remplit
+
+    record = logging.LogRecord("x", logging.INFO, __file__, 1, "bonjour", None, None)
+    handler.handle(record)
+    handler.handle(record)
+    assert handler.dropped == 1
+
+    handler.listener.start()
+    handler.listener.stop()
+    assert stream.getvalue() == "bonjour\n"
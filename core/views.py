@@ -1,3 +1,27 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import never_cache
 
-# Create your views here.
+from core import metrics
+
+
+def _metrics_allowed(request) -> bool:
+    """Superadmin connecté, jeton Bearer METRICS_TOKEN ou IP de METRICS_ALLOWED_IPS."""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated and getattr(user, "is_superadmin", lambda: False)():
+        return True
+
+    token = getattr(settings, "METRICS_TOKEN", "")
+    auth = request.META.get("HTTP_AUTHORIZATION", "")
+    if token and auth.startswith("Bearer ") and constant_time_compare(auth[7:].strip(), token):
+        return True
+
+    return request.META.get("REMOTE_ADDR", "") in getattr(settings, "METRICS_ALLOWED_IPS", ())
+
+
+@never_cache
+def metrics_view(request):
+    if not _metrics_allowed(request):
+        return HttpResponseForbidden("Accès refusé")
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
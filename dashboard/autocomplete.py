@@ -0,0 +1,124 @@
+# dashboard/autocomplete.py
+"""
+Autocomplete des parrains (saisie au comptoir, une requête par frappe).
+
+- Recherche par PRÉFIXE sur les clés normalisées de Client
+  (search_name / search_name_alt / phone_key / email_key), couvertes par des index partiels
+  (company, clé) WHERE is_referrer.
+- Projection values() : aucune instance de modèle n'est construite.
+- Cache court des préfixes, invalidé par numéro de version à chaque écriture Client.
+"""
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from dashboard.models import Client, normalize_search, phone_search_key
+
+AUTOCOMPLETE_LIMIT = 20
+MIN_PHONE_DIGITS = 2
+
+_VALUES = ("id", "first_name", "last_name", "email", "phone", "company__name")
+
+
+# ------------------ Versions de cache (invalidation) ------------------
+def _version_key(company_id) -> str:
+    return f"refac:v:{company_id or 'all'}"
+
+
+def _get_version(company_id) -> int:
+    key = _version_key(company_id)
+    version = cache.get(key)
+    if version is None:
+        version = 1
+        cache.add(key, version, None)
+    return int(version)
+
+
+def bump_version(company_id) -> None:
+    """Invalide les préfixes en cache de l'entreprise (et de la vue globale superadmin)."""
+    for cid in {company_id, None}:
+        key = _version_key(cid)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, None)
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+def _invalidate_on_client_change(sender, instance: Client, **kwargs):
+    bump_version(instance.company_id)
+
+
+# ------------------ Libellés ------------------
+def _label(row: Dict[str, Any]) -> str:
+    name = f"{row['last_name']} {row['first_name']}".strip()
+    label = name or (row["email"] or row["phone"] or "—")
+    label += f" — {row['email'] or '—'}"
+    label += f" — {row['phone'] or '—'}"
+    label += f" ({row['company__name'] or '—'})"
+    return label
+
+
+def _scope(company_id) -> "Q":
+    cond = Q(is_referrer=True)
+    if company_id:
+        cond &= Q(company_id=company_id)
+    return cond
+
+
+# ------------------ API ------------------
+def referrer_search_q(q: str) -> Q:
+    """
+    Filtre « commence par » sur les clés indexées : nom/prénom dans les deux ordres,
+    email (en minuscules), téléphone si la saisie est numérique.
+    """
+    nq = normalize_search(q)
+    cond = Q(search_name__startswith=nq) | Q(search_name_alt__startswith=nq)
+    pkey = phone_search_key(q)
+    if len(pkey) >= MIN_PHONE_DIGITS and nq.replace(" ", "").isdigit():
+        cond |= Q(phone_key__startswith=pkey)
+    raw = (q or "").strip().lower()
+    if raw:
+        cond |= Q(email_key__startswith=raw)
+    return cond
+
+
+def lookup_referrer(pk, company_id=None) -> Optional[Dict[str, Any]]:
+    """Un parrain par id (pré-remplissage du champ après une erreur de formulaire)."""
+    row = Client.objects.filter(_scope(company_id), pk=pk).values(*_VALUES).first()
+    if not row:
+        return None
+    return {"id": row["id"], "label": _label(row)}
+
+
+def search_referrers(q: str, company_id=None, limit: int = AUTOCOMPLETE_LIMIT) -> List[Dict[str, Any]]:
+    """
+    Parrains dont le nom, le prénom (dans les deux ordres), le téléphone ou l'email
+    commence par `q` ; `q` vide : les premiers par ordre alphabétique.
+    `company_id=None` : toutes les entreprises (superadmin).
+    """
+    nq = normalize_search(q)
+    digest = hashlib.md5(f"{nq}|{(q or '').strip().lower()}".encode()).hexdigest()
+    key = f"refac:{company_id or 'all'}:{_get_version(company_id)}:{limit}:{digest}"
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    rows = (
+        Client.objects.filter(_scope(company_id))
+        .filter(referrer_search_q(q) if nq else Q())
+        .order_by("last_name", "first_name", "id")
+        .values(*_VALUES)[:limit]
+    )
+    results = [{"id": r["id"], "label": _label(r)} for r in rows]
+
+    cache.set(key, results, getattr(settings, "REFERRER_AUTOCOMPLETE_CACHE_TTL", 30))
+    return results
@@ -0,0 +1,108 @@
+# dashboard/exports.py
+"""
+Exports CSV en flux (récompenses, parrainages, clients), par entreprise ou globaux.
+
+- Projection values_list() : aucune instance de modèle n'est construite.
+- .iterator(chunk_size=…) : curseur serveur côté Postgres, mémoire constante
+  quel que soit le nombre de lignes.
+- Les lignes sont produites par paquets de texte (generator) consommés par
+  StreamingHttpResponse ou écrits directement dans un fichier (commande export_csv).
+"""
+from __future__ import annotations
+
+import csv
+import io
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from dashboard.models import Client, Referral
+from rewards.models import Reward
+
+EXPORT_CHUNK_SIZE = 2000
+CSV_DELIMITER = ";"  # Excel FR
+
+
+@dataclass(frozen=True)
+class ExportSpec:
+    header: Tuple[str, ...]
+    fields: Tuple[str, ...]
+    queryset: Callable[[], QuerySet]
+
+
+EXPORTS: Dict[str, ExportSpec] = {
+    "rewards": ExportSpec(
+        header=("id", "entreprise", "client_id", "nom", "prenom", "email", "libelle", "categorie",
+                "etat", "parrainage_id", "cree_le", "utilise_le", "canal"),
+        fields=("id", "company__name", "client_id", "client__last_name", "client__first_name",
+                "client__email", "label", "bucket", "state", "referral_id", "created_at",
+                "redeemed_at", "redeemed_channel"),
+        queryset=lambda: Reward.objects.order_by("id"),
+    ),
+    "referrals": ExportSpec(
+        header=("id", "entreprise", "cree_le", "parrain_id", "parrain_nom", "parrain_prenom",
+                "parrain_email", "filleul_id", "filleul_nom", "filleul_prenom", "filleul_email"),
+        fields=("id", "company__name", "created_at", "referrer_id", "referrer__last_name",
+                "referrer__first_name", "referrer__email", "referee_id", "referee__last_name",
+                "referee__first_name", "referee__email"),
+        queryset=lambda: Referral.objects.order_by("id"),
+    ),
+    "clients": ExportSpec(
+        header=("id", "entreprise", "nom", "prenom", "email", "telephone", "parrain"),
+        fields=("id", "company__name", "last_name", "first_name", "email", "phone", "is_referrer"),
+        queryset=lambda: Client.objects.order_by("id"),
+    ),
+}
+
+
+# Débuts de cellule interprétés comme formule par Excel / LibreOffice (injection CSV)
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+# Nombre seul (dont téléphone E.164 « +33… ») : lu comme une valeur, jamais comme une formule
+_PLAIN_NUMBER = re.compile(r"[+-]?\d+(?:[.,]\d+)?")
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, bool):
+        return "oui" if value else "non"
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES) and not _PLAIN_NUMBER.fullmatch(value):
+        return "'" + value  # saisie utilisateur : affichée telle quelle, jamais évaluée
+    return value
+
+
+def export_rows(kind: str, company_id: Optional[int] = None, state: str = "") -> Iterator[tuple]:
+    """Tuples bruts (values_list) de l'export `kind`, lus par paquets de EXPORT_CHUNK_SIZE."""
+    spec = EXPORTS[kind]
+    qs = spec.queryset()
+    if company_id:
+        qs = qs.filter(company_id=company_id)
+    if state and kind == "rewards":
+        qs = qs.filter(state=state)
+    return qs.values_list(*spec.fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def iter_csv(kind: str, company_id: Optional[int] = None, state: str = "", *, bom: bool = True) -> Iterator[str]:
+    """
+    Texte CSV de l'export, par blocs d'environ EXPORT_CHUNK_SIZE lignes
+    (BOM UTF-8 en tête pour qu'Excel détecte l'encodage).
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=CSV_DELIMITER)
+    if bom:
+        buf.write("\ufeff")
+    writer.writerow(EXPORTS[kind].header)
+
+    for n, row in enumerate(export_rows(kind, company_id, state), start=1):
+        writer.writerow([_cell(v) for v in row])
+        if n % EXPORT_CHUNK_SIZE == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
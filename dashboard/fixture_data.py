@@ -0,0 +1,189 @@
+# dashboard/fixture_data.py
+"""
+Jeu de données synthétique multi-entreprises, à l'échelle de la prod (tests de charge).
+
+- Tout passe par bulk_create par paquets : aucun save() ni signal post_save
+  (roues, cache des pages publiques, autocomplete…) par ligne.
+- Répartition réaliste et reproductible (graine) :
+    * taille des entreprises log-normale : beaucoup de petites boutiques, quelques grosses ;
+    * parrains « moteurs » : loi de Zipf sur les parrains, une poignée fait l'essentiel ;
+    * historique sur plusieurs années, plus dense sur la période récente ;
+    * une récompense filleul + une récompense parrain par parrainage (980/19/1),
+      états selon l'âge (anciennes = utilisées / expirées).
+- Une transaction par entreprise : un arrêt en cours de route ne laisse pas
+  d'entreprise à moitié générée.
+"""
+from __future__ import annotations
+
+import itertools
+import math
+import random
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Callable, List, Optional
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from accounts.models import Company
+from dashboard.models import Client, Referral
+from rewards.models import ProbabilityWheel, Reward, RewardTemplate
+from rewards.services.probabilities import (
+    BASE_KEY, BASE_SIZE, VERY_RARE_KEY, VR_SIZE, _build_base_pool, _build_very_rare_pool,
+)
+
+FIXTURE_CHUNK_SIZE = 5000
+WHEEL_CHUNK_SIZE = 20  # pool very_rare = 100 000 cases : paquets courts
+
+REFERRER_SHARE = 0.15   # part des clients qui sont parrains
+ZIPF_EXPONENT = 1.1     # concentration des parrainages sur les premiers parrains
+_BUCKETS = (("SOUVENT", 980), ("MOYEN", 19), ("RARE", 1))
+_TEMPLATES = (("SOUVENT", "-10 %"), ("MOYEN", "-20 %"), ("RARE", "Produit offert"), ("TRES_RARE", "Jackpot"))
+
+
+@dataclass
+class FixtureReport:
+    companies: int = 0
+    clients: int = 0
+    referrals: int = 0
+    rewards: int = 0
+    wheels: int = 0
+    slugs: List[str] = field(default_factory=list)
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while batch := list(itertools.islice(it, size)):
+        yield batch
+
+
+def _company_weight(rng: random.Random) -> float:
+    # Log-normale de moyenne 1 : médiane ~0,5, queue jusqu'à ~10x
+    return min(12.0, rng.lognormvariate(-0.5, 1.0))
+
+
+def _age_days(rng: random.Random, years: int) -> float:
+    # Densité croissante vers aujourd'hui (activité en croissance)
+    return years * 365 * (1 - math.sqrt(rng.random()))
+
+
+def _reward_state(rng: random.Random, age_days: float) -> str:
+    if age_days < 30:
+        return rng.choice(("PENDING", "PENDING", "SENT"))
+    if age_days < 180:
+        return rng.choice(("PENDING", "SENT", "SENT", "EXPIRED"))
+    return rng.choice(("SENT", "SENT", "EXPIRED", "ARCHIVED"))
+
+
+def _insert_company(c: Company, rng: random.Random, *, clients: int, referrals: int,
+                    years: int, report: FixtureReport) -> None:
+    now = timezone.now()
+    n_referrers = max(1, int(clients * REFERRER_SHARE))
+    referrals = min(referrals, clients - n_referrers)  # un parrainage par filleul (uniq_referee_per_company)
+
+    rows = []
+    for i in range(clients):
+        is_referrer = i < n_referrers
+        cl = Client(
+            company=c, is_referrer=is_referrer,
+            last_name=f"{'Parrain' if is_referrer else 'Client'}{i:06d}",
+            first_name=rng.choice(("Marie", "Jean", "Lina", "Noah", "Emma", "Louis", "Chloé", "Hugo")),
+            email=f"c{i}@{c.slug}.example", phone=f"06{rng.randrange(10 ** 8):08d}",
+        )
+        cl.refresh_search_keys()
+        rows.append(cl)
+    for batch in _chunks(rows, FIXTURE_CHUNK_SIZE):
+        Client.objects.bulk_create(batch)
+    report.clients += clients
+
+    referrer_ids = [cl.pk for cl in rows[:n_referrers]]
+    referee_ids = [cl.pk for cl in rows[n_referrers:]]
+    rng.shuffle(referee_ids)
+    cum = list(itertools.accumulate(1 / (rank ** ZIPF_EXPONENT) for rank in range(1, n_referrers + 1)))
+
+    refs = [
+        Referral(
+            company=c, referrer_id=rng.choices(referrer_ids, cum_weights=cum)[0], referee_id=referee_id,
+            created_at=now - timedelta(days=_age_days(rng, years)),
+        )
+        for referee_id in referee_ids[:referrals]
+    ]
+    for batch in _chunks(refs, FIXTURE_CHUNK_SIZE):
+        Referral.objects.bulk_create(batch)
+    report.referrals += len(refs)
+
+    buckets, weights = [b for b, _ in _BUCKETS], [w for _, w in _BUCKETS]
+
+    def rewards():
+        for ref in refs:
+            age = (now - ref.created_at).days
+            for role, client_id in ((Reward.ROLE_REFEREE, ref.referee_id), (Reward.ROLE_REFERRER, ref.referrer_id)):
+                state = _reward_state(rng, age)
+                yield Reward(
+                    company=c, client_id=client_id, referral_id=ref.pk, role=role,
+                    bucket=rng.choices(buckets, weights)[0], label="Cadeau", cooldown_days=30,
+                    state=state, created_at=ref.created_at,
+                    token=f"{rng.getrandbits(128):032x}",
+                    token_expires_at=ref.created_at + timedelta(days=30),
+                    redeemed_at=ref.created_at + timedelta(days=rng.randrange(1, 30)) if state == "SENT" else None,
+                )
+
+    for batch in _chunks(rewards(), FIXTURE_CHUNK_SIZE):
+        Reward.objects.bulk_create(batch)
+        report.rewards += len(batch)
+    # Reward.created_at est en auto_now_add (écrasé par bulk_create) : l'historique est
+    # reposé ensuite, en un UPDATE ensembliste (date du parrainage de chaque récompense)
+    Reward.objects.filter(company=c).update(
+        created_at=Subquery(Referral.objects.filter(pk=OuterRef("referral_id")).values("created_at")[:1])
+    )
+
+
+def generate_fixture_data(*, companies: int, clients_per: int, referrals_per: int, years: int = 3,
+                          seed: int = 1, prefix: str = "fx",
+                          progress: Optional[Callable[[FixtureReport], None]] = None) -> FixtureReport:
+    """
+    Génère `companies` entreprises ; `clients_per` / `referrals_per` sont des moyennes,
+    pondérées par entreprise (répartition log-normale).
+    """
+    rng = random.Random(f"{prefix}:{seed}")  # jetons distincts d'un préfixe à l'autre
+    report = FixtureReport()
+
+    new = [
+        Company(name=f"{prefix.upper()} {seed}-{i:05d}", slug=f"{prefix}-{seed}-{i:05d}")
+        for i in range(companies)
+    ]
+    for batch in _chunks(new, FIXTURE_CHUNK_SIZE):
+        Company.objects.bulk_create(batch)
+    report.companies = len(new)
+    report.slugs = [c.slug for c in new]
+
+    for batch in _chunks(
+        (RewardTemplate(company=c, bucket=b, label=label) for c in new for b, label in _TEMPLATES),
+        FIXTURE_CHUNK_SIZE,
+    ):
+        RewardTemplate.objects.bulk_create(batch)
+
+    # Roues posées en masse (pas de ensure_wheels / signal par entreprise)
+    base_pool, vr_pool = _build_base_pool(), _build_very_rare_pool()
+    wheels = (
+        ProbabilityWheel(company=c, key=key, pool=pool, size=size, idx=0)
+        for c in new for key, pool, size in ((BASE_KEY, base_pool, BASE_SIZE), (VERY_RARE_KEY, vr_pool, VR_SIZE))
+    )
+    for batch in _chunks(wheels, WHEEL_CHUNK_SIZE):
+        ProbabilityWheel.objects.bulk_create(batch)
+        report.wheels += len(batch)
+
+    for c in new:
+        weight = _company_weight(rng)
+        with transaction.atomic():
+            _insert_company(
+                c, rng,
+                clients=max(5, int(clients_per * weight)),
+                referrals=max(1, int(referrals_per * weight)),
+                years=years, report=report,
+            )
+        if progress:
+            progress(report)
+
+    return report
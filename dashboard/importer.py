@@ -0,0 +1,348 @@
+# dashboard/importer.py
+"""
+Import en masse de clients (et de parrainages) depuis un fichier CSV ou XLSX.
+
+- Lecture en flux, traitement par paquets de IMPORT_CHUNK_SIZE lignes.
+- Normalisation groupée (email en minuscules, téléphone via normalize_phone).
+- Doublons détectés par requêtes groupées : email (toute l'entreprise) et
+  (nom, prénom) insensible à la casse pour les parrains (uniq_referrer_name_per_company_ci).
+- Écriture par bulk_create(ignore_conflicts=True) ; les signaux post_save ne sont pas
+  émis : les clés d'autocomplete sont calculées ici et son cache est invalidé à la fin.
+- Les parrainages (colonnes parrain_email / parrain_telephone) sont résolus après
+  l'insertion de tous les clients : un parrain peut donc figurer plus bas dans le fichier.
+  Aucune récompense n'est tirée pour ces parrainages historiques.
+
+Colonnes reconnues (en-têtes insensibles à la casse et aux accents) :
+  nom, prenom, email, telephone, parrain (oui/non), parrain_email, parrain_telephone
+"""
+from __future__ import annotations
+
+import csv
+import io
+import logging
+import zipfile
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from accounts.models import Company
+from dashboard.autocomplete import bump_version
+from dashboard.forms import normalize_phone
+from dashboard.models import Client, Referral, normalize_search, phone_search_key
+
+try:
+    import openpyxl
+    from openpyxl.utils.exceptions import InvalidFileException
+except Exception:
+    openpyxl = None  # XLSX indisponible si la lib est absente
+    InvalidFileException = ValueError
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 500
+
+# En-tête normalisé -> champ interne
+COLUMN_ALIASES: Dict[str, str] = {
+    "nom": "last_name", "last_name": "last_name",
+    "prenom": "first_name", "first_name": "first_name",
+    "email": "email", "e_mail": "email", "mail": "email",
+    "telephone": "phone", "tel": "phone", "phone": "phone", "mobile": "phone",
+    "parrain": "is_referrer", "is_referrer": "is_referrer",
+    "parrain_email": "referrer_email", "referrer_email": "referrer_email",
+    "parrain_telephone": "referrer_phone", "parrain_tel": "referrer_phone", "referrer_phone": "referrer_phone",
+}
+_TRUTHY = {"1", "oui", "o", "yes", "y", "true", "vrai", "x"}
+
+
+class ImportFileError(Exception):
+    """Fichier illisible ou format non supporté (aucune ligne traitée)."""
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    clients_created: int = 0
+    referrals_created: int = 0
+    duplicates: int = 0
+    error_count: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+    def add_error(self, line: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+# ------------------ Lecture ------------------
+def _header_key(raw) -> str:
+    return COLUMN_ALIASES.get(normalize_search(str(raw or "")).replace(" ", "_"), "")
+
+
+def _iter_csv(fileobj) -> Iterator[Tuple[int, Dict[str, str]]]:
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="") if not isinstance(fileobj, io.TextIOBase) else fileobj
+    reader = None
+    try:
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(text, dialect)
+        header = [_header_key(h) for h in next(reader, [])]
+        for line, values in enumerate(reader, start=2):
+            if any((v or "").strip() for v in values):
+                yield line, {k: (v or "").strip() for k, v in zip(header, values) if k}
+    except csv.Error as exc:
+        # Champ trop long, guillemet non fermé… : l'import (une transaction) est annulé
+        raise ImportFileError(f"Fichier CSV invalide ligne {reader.line_num} : {exc}") from exc
+    except UnicodeDecodeError as exc:
+        # Export Excel en cp1252, etc.
+        where = f" ligne {reader.line_num + 1}" if reader is not None else ""
+        raise ImportFileError(f"Fichier CSV illisible{where} : encodage attendu UTF-8.") from exc
+
+
+def _iter_xlsx(fileobj) -> Iterator[Tuple[int, Dict[str, str]]]:
+    if openpyxl is None:
+        raise ImportFileError("Le format XLSX nécessite le paquet openpyxl.")
+    try:
+        wb = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError, OSError) as exc:
+        # .xlsx corrompu ou fichier d'un autre format renommé
+        raise ImportFileError("Fichier XLSX illisible (classeur Excel .xlsx attendu).") from exc
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = [_header_key(h) for h in next(rows, ())]
+        for line, values in enumerate(rows, start=2):
+            cells = ["" if v is None else str(v).strip() for v in values]
+            if any(cells):
+                yield line, {k: v for k, v in zip(header, cells) if k}
+    finally:
+        wb.close()
+
+
+def iter_rows(fileobj, filename: str) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """(numéro de ligne, {champ: valeur}) pour chaque ligne non vide du fichier."""
+    name = (filename or "").lower()
+    if name.endswith(".xlsx"):
+        return _iter_xlsx(fileobj)
+    if name.endswith((".csv", ".txt")):
+        return _iter_csv(fileobj)
+    raise ImportFileError("Format non supporté (attendu : .csv ou .xlsx).")
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# ------------------ Normalisation ------------------
+@dataclass
+class _Row:
+    line: int
+    client: Client
+    email: str
+    name_key: Optional[Tuple[str, str]]
+    referrer_email: str = ""
+    referrer_phone_key: str = ""
+
+
+def _normalize_chunk(chunk, company: Company, report: ImportReport) -> List[_Row]:
+    rows: List[_Row] = []
+    for line, data in chunk:
+        last = data.get("last_name", "")
+        first = data.get("first_name", "")
+        email = data.get("email", "").lower()
+        phone = normalize_phone(data.get("phone", ""), company)
+        is_referrer = data.get("is_referrer", "").lower() in _TRUTHY
+
+        if not (last or email or phone):
+            report.add_error(line, "Nom, email ou téléphone requis.")
+            continue
+        if len(last) > 100 or len(first) > 100:
+            report.add_error(line, "Nom ou prénom trop long (100 caractères max).")
+            continue
+        if len(phone) > 32:
+            report.add_error(line, f"Téléphone invalide : {data.get('phone')!r}.")
+            continue
+        if email:
+            try:
+                validate_email(email)
+            except ValidationError:
+                report.add_error(line, f"Email invalide : {email!r}.")
+                continue
+
+        referrer_email = data.get("referrer_email", "").lower()
+        referrer_phone_key = phone_search_key(data.get("referrer_phone", ""))
+        if (referrer_email or referrer_phone_key) and is_referrer:
+            report.add_error(line, "Un parrain ne peut pas être lui-même filleul dans le même import.")
+            continue
+
+        client = Client(
+            company=company, last_name=last, first_name=first,
+            email=email or None, phone=phone, is_referrer=is_referrer,
+        )
+        client.refresh_search_keys()
+        rows.append(_Row(
+            line=line,
+            client=client,
+            email=email,
+            name_key=(last.lower(), first.lower()) if is_referrer and last else None,
+            referrer_email=referrer_email,
+            referrer_phone_key=referrer_phone_key,
+        ))
+    return rows
+
+
+# ------------------ Doublons (requêtes groupées) ------------------
+def _existing_emails(company: Company, emails) -> set:
+    if not emails:
+        return set()
+    return set(
+        Client.objects.filter(company=company)
+        .annotate(email_l=Lower("email"))
+        .filter(email_l__in=emails)
+        .values_list("email_l", flat=True)
+    )
+
+
+def _existing_referrer_names(company: Company, keys) -> set:
+    if not keys:
+        return set()
+    return set(
+        Client.objects.filter(company=company, is_referrer=True)
+        .annotate(ln=Lower("last_name"), fn=Lower("first_name"))
+        .filter(ln__in={k[0] for k in keys}, fn__in={k[1] for k in keys})
+        .values_list("ln", "fn")
+    ) & set(keys)
+
+
+def _insert_clients(rows: List[_Row], company: Company, report: ImportReport,
+                    seen_emails: set, seen_names: set) -> None:
+    known_emails = _existing_emails(company, {r.email for r in rows if r.email})
+    known_names = _existing_referrer_names(company, {r.name_key for r in rows if r.name_key})
+
+    to_create = []
+    for r in rows:
+        if r.email and (r.email in known_emails or r.email in seen_emails):
+            report.duplicates += 1
+            continue
+        if r.name_key and (r.name_key in known_names or r.name_key in seen_names):
+            report.duplicates += 1
+            continue
+        if r.email:
+            seen_emails.add(r.email)
+        if r.name_key:
+            seen_names.add(r.name_key)
+        to_create.append(r.client)
+
+    with transaction.atomic():
+        Client.objects.bulk_create(to_create, batch_size=IMPORT_CHUNK_SIZE, ignore_conflicts=True)
+
+
+# ------------------ Parrainages ------------------
+def _resolve(company: Company, emails, phone_keys, referrers_only: bool) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """{email: id}, {phone_key: id} des clients de l'entreprise (plus petit id en cas d'ambiguïté)."""
+    if not emails and not phone_keys:
+        return {}, {}
+    qs = Client.objects.filter(company=company)
+    if referrers_only:
+        qs = qs.filter(is_referrer=True)
+    qs = (
+        qs.annotate(email_l=Lower("email"))
+        .filter(Q(email_l__in=emails) | Q(phone_key__in=phone_keys))
+        .order_by("-id")
+        .values_list("id", "email_l", "phone_key")
+    )
+    by_email, by_phone = {}, {}
+    for pk, email, pkey in qs:
+        if email:
+            by_email[email] = pk
+        if pkey:
+            by_phone[pkey] = pk
+    return by_email, by_phone
+
+
+def _insert_referrals(links: List[Tuple[int, str, str, str, str]], company: Company, report: ImportReport) -> None:
+    """links : (ligne, email filleul, clé tél. filleul, email parrain, clé tél. parrain)."""
+    ref_emails, ref_phones = _resolve(
+        company, {l[3] for l in links if l[3]}, {l[4] for l in links if l[4]}, referrers_only=True,
+    )
+    ree_emails, ree_phones = _resolve(
+        company, {l[1] for l in links if l[1]}, {l[2] for l in links if l[2]}, referrers_only=False,
+    )
+
+    to_create = []
+    for line, ree_email, ree_phone, ref_email, ref_phone in links:
+        referrer_id = ref_emails.get(ref_email) or ref_phones.get(ref_phone)
+        referee_id = ree_emails.get(ree_email) or ree_phones.get(ree_phone)
+        if not referrer_id:
+            report.add_error(line, "Parrain introuvable : parrainage ignoré.")
+            continue
+        if not referee_id:
+            report.add_error(line, "Filleul introuvable (email ou téléphone requis) : parrainage ignoré.")
+            continue
+        if referrer_id == referee_id:
+            report.add_error(line, "Le parrain et le filleul sont la même personne.")
+            continue
+        to_create.append(Referral(company=company, referrer_id=referrer_id, referee_id=referee_id))
+
+    with transaction.atomic():
+        # uniq_referee_per_company : un filleul déjà parrainé est ignoré
+        Referral.objects.bulk_create(to_create, batch_size=IMPORT_CHUNK_SIZE, ignore_conflicts=True)
+
+
+# ------------------ API ------------------
+def import_clients(fileobj, filename: str, company: Company, *,
+                   chunk_size: int = IMPORT_CHUNK_SIZE, dry_run: bool = False) -> ImportReport:
+    """
+    Importe les clients/parrainages du fichier dans `company`.
+    `dry_run=True` : tout est exécuté puis annulé (le rapport reste exact).
+    """
+    report = ImportReport()
+    clients_before = Client.objects.filter(company=company).count()
+    referrals_before = Referral.objects.filter(company=company).count()
+
+    with transaction.atomic():
+        seen_emails: set = set()
+        seen_names: set = set()
+        links: List[Tuple[int, str, str, str, str]] = []
+
+        for chunk in _chunks(iter_rows(fileobj, filename), chunk_size):
+            report.rows += len(chunk)
+            rows = _normalize_chunk(chunk, company, report)
+            _insert_clients(rows, company, report, seen_emails, seen_names)
+            links.extend(
+                (r.line, r.email, r.client.phone_key, r.referrer_email, r.referrer_phone_key)
+                for r in rows if r.referrer_email or r.referrer_phone_key
+            )
+
+        for chunk in _chunks(links, chunk_size):
+            _insert_referrals(chunk, company, report)
+
+        report.clients_created = Client.objects.filter(company=company).count() - clients_before
+        report.referrals_created = Referral.objects.filter(company=company).count() - referrals_before
+
+        if dry_run:
+            transaction.set_rollback(True)
+
+    if not dry_run and report.clients_created:
+        bump_version(company.id)
+
+    logger.info(
+        "import_clients company=%s rows=%s clients=%s referrals=%s duplicates=%s errors=%s dry_run=%s",
+        company.id, report.rows, report.clients_created, report.referrals_created,
+        report.duplicates, report.error_count, dry_run,
+    )
+    return report
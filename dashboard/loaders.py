@@ -0,0 +1,163 @@
+# dashboard/loaders.py
+"""
+Chargement groupé des données de la fiche client (dashboard:client_detail).
+
+Plan de requêtes :
+  1) compteurs par état : UN agrégat conditionnel (Count(filter=...))
+  2) 1ʳᵉ page de chaque onglet (SENT / PENDING / DISABLED / EXPIRED) : UNE requête fenêtrée
+     ROW_NUMBER() OVER (PARTITION BY state ORDER BY id DESC)
+  3) historique des parrainages : page + id de la récompense liée en sous-requête
+Les pages suivantes d'un onglet sont servies par un fragment (dashboard:client_rewards_fragment) ;
+le total étant connu via (1), aucune requête COUNT n'est rejouée.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from django.core.paginator import Paginator
+from django.db.models import Count, F, OuterRef, Q, Subquery, Window
+from django.db.models.functions import RowNumber
+
+from dashboard.models import Client, Referral
+from rewards.models import Reward
+
+REWARDS_PER_TAB = 5
+HISTORY_PER_PAGE = 8
+
+# Onglets de la fiche : clé d'onglet -> état Reward
+REWARD_TABS: Dict[str, str] = {
+    "ok": "SENT",
+    "pending": "PENDING",
+    "unused": "DISABLED",
+    "expired": "EXPIRED",  # liens expirés, passés par le balayeur
+}
+
+
+@dataclass
+class RewardTabPage:
+    """Page d'un onglet de récompenses (interface proche d'une Page de Paginator)."""
+    tab: str
+    number: int
+    count: int
+    per_page: int = REWARDS_PER_TAB
+    object_list: List[Reward] = field(default_factory=list)
+
+    @property
+    def num_pages(self) -> int:
+        return max(1, -(-self.count // self.per_page))
+
+    def has_previous(self) -> bool:
+        return self.number > 1
+
+    def has_next(self) -> bool:
+        return self.number < self.num_pages
+
+    def previous_page_number(self) -> int:
+        return self.number - 1
+
+    def next_page_number(self) -> int:
+        return self.number + 1
+
+
+def _page_number(raw, num_pages: int) -> int:
+    try:
+        n = int(raw)
+    except (TypeError, ValueError):
+        return 1
+    return min(max(n, 1), num_pages)
+
+
+def _client_rewards(client: Client):
+    return Reward.objects.filter(company_id=client.company_id, client=client)
+
+
+def reward_state_counts(client: Client) -> Dict[str, int]:
+    """Nombre de récompenses par onglet, en un seul agrégat conditionnel."""
+    agg = _client_rewards(client).aggregate(
+        **{tab: Count("id", filter=Q(state=state)) for tab, state in REWARD_TABS.items()}
+    )
+    return {tab: int(agg.get(tab) or 0) for tab in REWARD_TABS}
+
+
+def first_reward_pages(client: Client, counts: Dict[str, int]) -> Dict[str, RewardTabPage]:
+    """1ʳᵉ page de tous les onglets via une seule requête fenêtrée."""
+    pages = {tab: RewardTabPage(tab=tab, number=1, count=counts[tab]) for tab in REWARD_TABS}
+    states = [REWARD_TABS[tab] for tab in REWARD_TABS if counts[tab]]
+    if not states:
+        return pages
+
+    by_state = {state: tab for tab, state in REWARD_TABS.items()}
+    rows = (
+        _client_rewards(client)
+        .filter(state__in=states)
+        .annotate(
+            rn=Window(RowNumber(), partition_by=[F("state")], order_by=F("id").desc())
+        )
+        .filter(rn__lte=REWARDS_PER_TAB)
+        .order_by("state", "-id")
+    )
+    for rw in rows:
+        pages[by_state[rw.state]].object_list.append(rw)
+    return pages
+
+
+def reward_tab_qs(client: Client, tab: str):
+    return _client_rewards(client).filter(state=REWARD_TABS[tab]).order_by("-id")
+
+
+def reward_tab_page(client: Client, tab: str, page, count: int | None = None) -> RewardTabPage:
+    """Une page quelconque d'un onglet (fragment lazy)."""
+    if count is None:
+        count = reward_state_counts(client)[tab]
+    tab_page = RewardTabPage(tab=tab, number=1, count=count)
+    tab_page.number = _page_number(page, tab_page.num_pages)
+    start = (tab_page.number - 1) * REWARDS_PER_TAB
+    tab_page.object_list = list(reward_tab_qs(client, tab)[start:start + REWARDS_PER_TAB])
+    return tab_page
+
+
+def history_page(client: Client, page):
+    """
+    Historique des parrainages (client parrain OU filleul), avec l'id de la récompense
+    de ce client pour chaque parrainage (existing_reward_id) calculé dans la même requête.
+    """
+    existing_reward = (
+        Reward.objects.filter(client=client, referral=OuterRef("pk"))
+        .exclude(state="DISABLED")
+        .order_by("id")
+        .values("id")[:1]
+    )
+    qs = (
+        Referral.objects.select_related("referrer", "referee")
+        .filter(company_id=client.company_id)
+        .filter(Q(referrer=client) | Q(referee=client))
+        .annotate(existing_reward_id=Subquery(existing_reward))
+        .order_by("-created_at", "-id")
+    )
+    return Paginator(qs, HISTORY_PER_PAGE).get_page(page)
+
+
+def load_client_detail(client: Client, params) -> Dict[str, object]:
+    """
+    Contexte complet de la fiche client.
+    `params` : request.GET (h=<page historique>, ok/pending/unused/expired=<page d'onglet>).
+    """
+    counts = reward_state_counts(client)
+    pages = first_reward_pages(client, counts)
+    # Liens « à l'ancienne » (?ok=3…) : seule la page demandée est rechargée
+    for tab in REWARD_TABS:
+        if _page_number(params.get(tab), pages[tab].num_pages) > 1:
+            pages[tab] = reward_tab_page(client, tab, params.get(tab), count=counts[tab])
+
+    return {
+        "history_page": history_page(client, params.get("h")),
+        "page_ok": pages["ok"],
+        "page_pending": pages["pending"],
+        "page_unused": pages["unused"],
+        "page_expired": pages["expired"],
+        "kpi_obtenus": counts["ok"],
+        "kpi_attente": counts["pending"],
+        "kpi_nonutils": counts["unused"],
+        "kpi_expirees": counts["expired"],
+    }
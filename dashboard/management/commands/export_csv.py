@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from accounts.models import Company
+from dashboard.exports import EXPORTS, iter_csv
+
+
+class Command(BaseCommand):
+    help = "Exporte en CSV (flux, mémoire constante) les récompenses, parrainages ou clients."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(EXPORTS))
+        parser.add_argument("--company", help="Id ou slug de l'entreprise (défaut : toutes).")
+        parser.add_argument("--state", default="", help="Filtre d'état (récompenses uniquement).")
+        parser.add_argument("-o", "--output", help="Fichier de sortie (défaut : sortie standard).")
+
+    def handle(self, *args, **options):
+        company_id = None
+        ref = options.get("company")
+        if ref:
+            cond = Q(slug=ref) | (Q(pk=int(ref)) if ref.isdigit() else Q())
+            company_id = Company.objects.filter(cond).values_list("pk", flat=True).first()
+            if company_id is None:
+                raise CommandError(f"Entreprise introuvable : {ref}")
+
+        chunks = iter_csv(
+            options["kind"], company_id=company_id, state=options["state"].upper(),
+            bom=bool(options.get("output")),
+        )
+        if options.get("output"):
+            with open(options["output"], "w", encoding="utf-8", newline="") as fh:
+                for chunk in chunks:
+                    fh.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Export écrit dans {options['output']}"))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
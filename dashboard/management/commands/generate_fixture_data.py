@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Company
+from dashboard.fixture_data import generate_fixture_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère un jeu de données synthétique multi-entreprises (clients, parrainages, "
+        "récompenses, roues) par bulk_create, avec une répartition réaliste. "
+        "À n'utiliser que sur une base de recette / de test."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--companies", type=int, required=True)
+        parser.add_argument("--clients-per", type=int, default=500, help="Clients par entreprise (moyenne).")
+        parser.add_argument("--referrals-per", type=int, default=200, help="Parrainages par entreprise (moyenne).")
+        parser.add_argument("--years", type=int, default=3, help="Profondeur d'historique (années).")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--prefix", default="fx", help="Préfixe des slugs générés.")
+
+    def handle(self, *args, **o):
+        if o["companies"] < 1 or o["clients_per"] < 1 or o["referrals_per"] < 0 or o["years"] < 1:
+            raise CommandError("--companies, --clients-per et --years doivent être >= 1.")
+        if Company.objects.filter(slug__startswith=f"{o['prefix']}-{o['seed']}-").exists():
+            raise CommandError(
+                f"Données '{o['prefix']}-{o['seed']}-…' déjà présentes : changer --seed ou --prefix."
+            )
+
+        started = time.monotonic()
+        step = max(1, o["companies"] // 20)
+        state = {"done": 0}
+
+        def progress(report):
+            state["done"] += 1
+            if state["done"] % step == 0 or state["done"] == o["companies"]:
+                rate = report.rewards / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(
+                    f"{state['done']}/{o['companies']} entreprises — {report.clients} clients, "
+                    f"{report.referrals} parrainages, {report.rewards} récompenses ({rate:,.0f}/s)"
+                )
+
+        report = generate_fixture_data(
+            companies=o["companies"], clients_per=o["clients_per"], referrals_per=o["referrals_per"],
+            years=o["years"], seed=o["seed"], prefix=o["prefix"], progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Terminé en {time.monotonic() - started:.1f} s : {report.companies} entreprises, "
+            f"{report.clients} clients, {report.referrals} parrainages, {report.rewards} récompenses, "
+            f"{report.wheels} roues."
+        ))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from accounts.models import Company
+from dashboard.importer import IMPORT_CHUNK_SIZE, ImportFileError, import_clients
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe des clients (et parrainages) depuis un fichier CSV ou XLSX.\n"
+        "Colonnes : nom, prenom, email, telephone, parrain, parrain_email, parrain_telephone."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Fichier .csv ou .xlsx")
+        parser.add_argument("--company", required=True, help="Id ou slug de l'entreprise.")
+        parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE,
+                            help=f"Lignes traitées par paquet (défaut {IMPORT_CHUNK_SIZE}).")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Analyse complète sans rien enregistrer.")
+
+    def handle(self, *args, **options):
+        ref = options["company"]
+        cond = Q(slug=ref) | (Q(pk=int(ref)) if ref.isdigit() else Q())
+        company = Company.objects.filter(cond).first()
+        if company is None:
+            raise CommandError(f"Entreprise introuvable : {ref}")
+
+        try:
+            with open(options["path"], "rb") as fh:
+                report = import_clients(
+                    fh, options["path"], company,
+                    chunk_size=max(1, options["chunk_size"]), dry_run=options["dry_run"],
+                )
+        except (OSError, ImportFileError) as exc:
+            raise CommandError(str(exc))
+
+        for line, message in report.errors:
+            self.stdout.write(self.style.WARNING(f"Ligne {line} : {message}"))
+        if report.error_count > len(report.errors):
+            self.stdout.write(self.style.WARNING(
+                f"… {report.error_count - len(report.errors)} autre(s) erreur(s) non affichée(s)."
+            ))
+
+        prefix = "[dry-run] " if options["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{company.name} : {report.rows} ligne(s), {report.clients_created} client(s) créé(s), "
+            f"{report.referrals_created} parrainage(s), {report.duplicates} doublon(s), "
+            f"{report.error_count} erreur(s)."
+        ))
@@ -0,0 +1,87 @@
+# Generated by Django 4.2.25 on 2026-10-18 23:47
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Copie figée de dashboard.models.normalize_search / phone_search_key au moment
+# de la migration : une évolution ultérieure des helpers ne doit pas changer ce backfill.
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_NON_DIGITS = re.compile(r"\D+")
+_PHONE_COUNTRY_CODES = ("33", "590", "594", "596", "262")
+PHONE_KEY_LEN = 9
+
+
+def normalize_search(value):
+    s = unicodedata.normalize("NFKD", value or "")
+    s = "".join(ch for ch in s if not unicodedata.combining(ch)).lower()
+    return _NON_ALNUM.sub(" ", s).strip()
+
+
+def phone_search_key(value):
+    raw = (value or "").strip()
+    ds = _NON_DIGITS.sub("", raw)
+    if raw.startswith("+") or raw.startswith("00"):
+        ds = ds[2:] if raw.startswith("00") else ds
+        for cc in _PHONE_COUNTRY_CODES:
+            if ds.startswith(cc) and len(ds) > len(cc):
+                ds = ds[len(cc):]
+                break
+    ds = ds.lstrip("0")
+    return ds[-PHONE_KEY_LEN:] if len(ds) > PHONE_KEY_LEN else ds
+
+
+def backfill_search_keys(apps, schema_editor):
+    """Remplit les clés d'autocomplete des clients existants (par lots)."""
+    Client = apps.get_model("dashboard", "Client")
+    batch = []
+    for c in Client.objects.only("id", "first_name", "last_name", "phone").iterator(chunk_size=2000):
+        last, first = normalize_search(c.last_name), normalize_search(c.first_name)
+        c.search_name = f"{last} {first}".strip()
+        c.search_name_alt = f"{first} {last}".strip()
+        c.phone_key = phone_search_key(c.phone)
+        batch.append(c)
+        if len(batch) >= 2000:
+            Client.objects.bulk_update(batch, ["search_name", "search_name_alt", "phone_key"])
+            batch = []
+    if batch:
+        Client.objects.bulk_update(batch, ["search_name", "search_name_alt", "phone_key"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_referral_uniq_referee_per_company'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='phone_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='search_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=201),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='search_name_alt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=201),
+        ),
+        migrations.RunPython(backfill_search_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(condition=models.Q(('is_referrer', True)), fields=['company', 'search_name'], name='client_ref_search_name_idx', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(condition=models.Q(('is_referrer', True)), fields=['company', 'search_name_alt'], name='client_ref_search_alt_idx', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(condition=models.Q(('is_referrer', True)), fields=['company', 'phone_key'], name='client_ref_phone_key_idx', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+    ]
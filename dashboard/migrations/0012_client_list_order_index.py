@@ -0,0 +1,17 @@
+# Generated by Django 4.2.25 on 2026-10-18 23:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0011_client_search_keys'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(condition=models.Q(('is_referrer', True)), fields=['company', 'last_name', 'first_name', 'id'], name='client_ref_list_order_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.25 on 2026-10-19 00:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0012_client_list_order_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='referral',
+            index=models.Index(fields=['company', 'created_at'], name='referral_company_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='referral',
+            index=models.Index(fields=['company', 'referrer'], name='referral_company_referrer_idx'),
+        ),
+    ]
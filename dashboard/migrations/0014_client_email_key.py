@@ -0,0 +1,30 @@
+# Generated by Django 4.2.25 on 2026-10-19 02:06
+
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+
+def backfill_email_keys(apps, schema_editor):
+    """Email en minuscules des clients existants, en un UPDATE ensembliste."""
+    Client = apps.get_model("dashboard", "Client")
+    Client.objects.exclude(email__isnull=True).exclude(email="").update(email_key=Lower(Trim("email")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0013_referral_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='email_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=254),
+        ),
+        migrations.RunPython(backfill_email_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(condition=models.Q(('is_referrer', True)), fields=['company', 'email_key'], name='client_ref_email_key_idx', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+    ]
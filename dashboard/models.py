@@ -4,6 +4,44 @@ from django.utils import timezone
 from accounts.models import Company
 from django.db.models import Q, UniqueConstraint
 from django.db.models.functions import Lower
+import re
+import unicodedata
+
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_NON_DIGITS = re.compile(r"\D+")
+
+# Indicatifs FR/DOM retirés devant le numéro national (cf. core.utils.phones)
+_PHONE_COUNTRY_CODES = ("33", "590", "594", "596", "262")
+PHONE_KEY_LEN = 9  # longueur du numéro national FR/DOM sans le 0
+
+
+def normalize_search(value: str | None) -> str:
+    """
+    Clé de recherche : minuscules, sans accents, séparateurs réduits à un espace.
+    'Éloïse  Dupont-Martin' -> 'eloise dupont martin'
+    """
+    s = unicodedata.normalize("NFKD", value or "")
+    s = "".join(ch for ch in s if not unicodedata.combining(ch)).lower()
+    return _NON_ALNUM.sub(" ", s).strip()
+
+
+def phone_search_key(value: str | None) -> str:
+    """
+    Numéro national (9 chiffres FR/DOM) quel que soit le format saisi :
+    '+590 690 12 34 56', '0690123456' et '690123456' -> '690123456'.
+    Un préfixe partiel ('0690') donne le préfixe correspondant ('690').
+    """
+    raw = (value or "").strip()
+    ds = _NON_DIGITS.sub("", raw)
+    if raw.startswith("+") or raw.startswith("00"):
+        ds = ds[2:] if raw.startswith("00") else ds
+        for cc in _PHONE_COUNTRY_CODES:
+            if ds.startswith(cc) and len(ds) > len(cc):
+                ds = ds[len(cc):]
+                break
+    ds = ds.lstrip("0")
+    return ds[-PHONE_KEY_LEN:] if len(ds) > PHONE_KEY_LEN else ds
 
 
 class Client(models.Model):
@@ -14,7 +52,49 @@ class Client(models.Model):
     phone       = models.CharField(max_length=32, blank=True)
     is_referrer = models.BooleanField(default=False)
 
+    # Clés dérivées pour l'autocomplete (cf. dashboard.autocomplete), tenues à jour par save()
+    search_name     = models.CharField(max_length=201, blank=True, default="", editable=False)  # "nom prénom"
+    search_name_alt = models.CharField(max_length=201, blank=True, default="", editable=False)  # "prénom nom"
+    phone_key       = models.CharField(max_length=16, blank=True, default="", editable=False)
+    email_key       = models.CharField(max_length=254, blank=True, default="", editable=False)  # email en minuscules
+
+    SEARCH_SOURCE_FIELDS = {"first_name", "last_name", "phone", "email"}
+    SEARCH_KEY_FIELDS = ("search_name", "search_name_alt", "phone_key", "email_key")
+
     class Meta:
+        indexes = [
+            # Recherche par préfixe (LIKE 'xxx%') : opclass *_pattern_ops côté Postgres
+            models.Index(
+                fields=["company", "search_name"],
+                name="client_ref_search_name_idx",
+                condition=Q(is_referrer=True),
+                opclasses=["int8_ops", "varchar_pattern_ops"],
+            ),
+            models.Index(
+                fields=["company", "search_name_alt"],
+                name="client_ref_search_alt_idx",
+                condition=Q(is_referrer=True),
+                opclasses=["int8_ops", "varchar_pattern_ops"],
+            ),
+            models.Index(
+                fields=["company", "phone_key"],
+                name="client_ref_phone_key_idx",
+                condition=Q(is_referrer=True),
+                opclasses=["int8_ops", "varchar_pattern_ops"],
+            ),
+            models.Index(
+                fields=["company", "email_key"],
+                name="client_ref_email_key_idx",
+                condition=Q(is_referrer=True),
+                opclasses=["int8_ops", "varchar_pattern_ops"],
+            ),
+            # Liste des parrains : pagination keyset (last_name, first_name, id)
+            models.Index(
+                fields=["company", "last_name", "first_name", "id"],
+                name="client_ref_list_order_idx",
+                condition=Q(is_referrer=True),
+            ),
+        ]
         constraints = [
             # Unicité (insensible à la casse) du couple (nom, prénom, entreprise) pour les PARRAINS,
             # et seulement si "last_name" non vide pour éviter de bloquer les créations incomplètes.
@@ -27,6 +107,21 @@ class Client(models.Model):
             ),
         ]
 
+    def refresh_search_keys(self):
+        """Recalcule les clés d'autocomplete (à appeler avant un bulk_create/bulk_update)."""
+        last, first = normalize_search(self.last_name), normalize_search(self.first_name)
+        self.search_name = f"{last} {first}".strip()
+        self.search_name_alt = f"{first} {last}".strip()
+        self.phone_key = phone_search_key(self.phone)
+        self.email_key = (self.email or "").strip().lower()
+
+    def save(self, *args, **kwargs):
+        self.refresh_search_keys()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and self.SEARCH_SOURCE_FIELDS & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, *self.SEARCH_KEY_FIELDS}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.last_name} {self.first_name}".strip() or self.email or f"Client #{self.pk}"
 
@@ -39,6 +134,12 @@ class Referral(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
+        indexes = [
+            # KPI du mois / derniers événements : par entreprise sur une plage de dates
+            models.Index(fields=["company", "created_at"], name="referral_company_created_idx"),
+            # Éligibilité (minimums de parrainages) : par entreprise et parrain
+            models.Index(fields=["company", "referrer"], name="referral_company_referrer_idx"),
+        ]
         constraints = [
             # si tu as déjà d'autres contraintes, garde-les
             models.UniqueConstraint(
@@ -1,3 +1,275 @@
-from django.test import TestCase
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
 
-# Create your tests here.
+from accounts.models import Company
+from dashboard.autocomplete import search_referrers, lookup_referrer
+from dashboard.models import Client, Referral, normalize_search, phone_search_key
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _referrer(company, last, first, phone="", email=None):
+    return Client.objects.create(
+        company=company, last_name=last, first_name=first,
+        phone=phone, email=email, is_referrer=True,
+    )
+
+
+def test_search_keys_are_normalized():
+    assert normalize_search("  Éloïse  Dupont-Martin ") == "eloise dupont martin"
+    assert phone_search_key("+590 690 12 34 56") == "690123456"
+    assert phone_search_key("0690123456") == "690123456"
+    assert phone_search_key("0690") == "690"
+
+
+def test_autocomplete_prefix_on_name_phone_and_company_scope():
+    c1 = Company.objects.create(name="Shop A")
+    c2 = Company.objects.create(name="Shop B")
+    jean = _referrer(c1, "Dupont", "Jéan", phone="+33612345678")
+    _referrer(c1, "Martin", "Paul")
+    _referrer(c2, "Dupond", "Jean")
+    Client.objects.create(company=c1, last_name="Dupuis", first_name="Filleul")  # pas parrain
+
+    assert [r["id"] for r in search_referrers("dup", company_id=c1.id)] == [jean.id]
+    assert [r["id"] for r in search_referrers("jean d", company_id=c1.id)] == [jean.id]
+    assert [r["id"] for r in search_referrers("06 12", company_id=c1.id)] == [jean.id]
+    assert len(search_referrers("dupon")) == 2  # superadmin : toutes entreprises
+
+    item = lookup_referrer(jean.id, company_id=c2.id)
+    assert item is None
+
+
+def test_autocomplete_cache_is_invalidated_on_client_write():
+    c = Company.objects.create(name="Shop C")
+    _referrer(c, "Durand", "Luc")
+    assert len(search_referrers("dur", company_id=c.id)) == 1
+
+    _referrer(c, "Durieux", "Anne")
+    assert len(search_referrers("dur", company_id=c.id)) == 2
+
+
+def test_autocomplete_email_prefix_and_empty_query():
+    c = Company.objects.create(name="Shop E")
+    luc = _referrer(c, "Zed", "Luc", email="luc.zed@example.com")
+    anne = _referrer(c, "Abel", "Anne")
+
+    assert [r["id"] for r in search_referrers("luc.z", company_id=c.id)] == [luc.id]
+    assert [r["id"] for r in search_referrers("LUC.ZED@", company_id=c.id)] == [luc.id]
+    assert Client.objects.get(pk=luc.pk).email_key == "luc.zed@example.com"
+    assert [r["id"] for r in search_referrers("", company_id=c.id)] == [anne.id, luc.id]
+
+
+def test_clients_list_search_matches_inside_names(client):
+    from django.urls import reverse
+    from accounts.models import User
+
+    c = Company.objects.create(name="Shop F")
+    user = User.objects.create_user("admin-f", password="pw", profile="admin", company=c)
+    lea = _referrer(c, "Dupont-Martin", "Léa", email="lea@shop.fr")
+    _referrer(c, "Durand", "Paul")
+
+    client.force_login(user)
+    for q in ("martin", "shop.fr"):
+        rows = client.get(reverse("dashboard:clients_list"), {"q": q}).context["clients"]
+        assert [r.id for r in rows] == [lea.id]
+
+
+def test_clients_list_keyset_pages_with_row_counters(client, monkeypatch):
+    from django.urls import reverse
+    from accounts.models import User
+    from dashboard import views
+    from rewards.models import Reward
+
+    monkeypatch.setattr(views, "CLIENTS_PAGE_SIZE", 2)
+
+    c = Company.objects.create(name="Shop D")
+    user = User.objects.create_user("admin-d", password="pw", profile="admin", company=c)
+    a = _referrer(c, "Alpha", "Zoe")
+    b = _referrer(c, "Alpha", "Zoe2")
+    d = _referrer(c, "Beta", "Yann")
+    referee = Client.objects.create(company=c, last_name="Filleul", first_name="X")
+    ref = Referral.objects.create(company=c, referrer=a, referee=referee)
+    Reward.objects.create(company=c, client=a, referral=ref, label="-10 %", bucket="SOUVENT", state="PENDING")
+
+    client.force_login(user)
+    resp = client.get(reverse("dashboard:clients_list"))
+    rows = resp.context["clients"]
+    assert [r.id for r in rows] == [a.id, b.id]
+    assert (rows[0].referral_count, rows[0].pending_rewards) == (1, 1)
+    assert resp.context["next_cursor"]
+
+    more = client.get(reverse("dashboard:clients_list_api"), {"after": resp.context["next_cursor"]}).json()
+    assert more["ok"] and more["next"] is None
+    assert f"/clients/{d.id}/" in more["html"]
+
+
+def test_client_detail_batches_reward_tabs_and_serves_fragments(client, django_assert_max_num_queries):
+    from django.urls import reverse
+    from accounts.models import User
+    from rewards.models import Reward
+
+    c = Company.objects.create(name="Shop E")
+    user = User.objects.create_user("admin-e", password="pw", profile="admin", company=c)
+    parrain = _referrer(c, "Gamma", "Iris")
+    for i in range(7):
+        referee = Client.objects.create(company=c, last_name=f"Filleul{i}", first_name="X")
+        ref = Referral.objects.create(company=c, referrer=parrain, referee=referee)
+        Reward.objects.create(company=c, client=parrain, referral=ref, label=f"R{i}", bucket="SOUVENT",
+                              state="SENT" if i % 2 else "PENDING")
+    Reward.objects.filter(label="R0").update(state=Reward.STATE_EXPIRED)  # passé par le balayeur
+
+    client.force_login(user)
+    url = reverse("dashboard:client_detail", args=[parrain.id])
+    resp = client.get(url)
+    assert (resp.context["kpi_obtenus"], resp.context["kpi_attente"], resp.context["kpi_nonutils"]) == (3, 3, 0)
+    assert [rw.label for rw in resp.context["page_pending"].object_list] == ["R6", "R4", "R2"]
+    assert [rw.label for rw in resp.context["page_expired"].object_list] == ["R0"]
+    assert resp.context["kpi_expirees"] == 1 and Reward.objects.get(label="R0").get_state_display() == "Expirée"
+
+    # Le nombre de requêtes ne dépend pas du nombre de récompenses
+    with django_assert_max_num_queries(12):
+        client.get(url)
+
+    frag = client.get(reverse("dashboard:client_rewards_fragment", args=[parrain.id, "ok"]), {"page": 1})
+    assert frag.status_code == 200 and b"R5" in frag.content
+    assert client.get(reverse("dashboard:client_rewards_fragment", args=[parrain.id, "nope"])).status_code == 404
+    hist = client.get(reverse("dashboard:client_history_fragment", args=[parrain.id]), {"page": 2})
+    assert hist.status_code == 200
+
+
+def test_import_clients_bulk_with_duplicates_errors_and_referrals():
+    import io
+    from dashboard.importer import import_clients
+
+    c = Company.objects.create(name="Shop F")
+    _referrer(c, "Existant", "Paul", email="paul@ex.fr")
+    csv_data = (
+        "Nom;Prénom;E-mail;Téléphone;Parrain;Parrain_email\n"
+        "Martin;Léa;LEA@EX.FR;0690123456;oui;\n"
+        "Filleul;Tom;tom@ex.fr;;;lea@ex.fr\n"
+        "Autre;Ana;ana@ex.fr;;;paul@ex.fr\n"
+        "existant;paul;;;oui;\n"          # doublon (nom, prénom) de parrain
+        "Copie;Tom;tom@ex.fr;;;\n"        # doublon email dans le fichier
+        "Bad;Mail;pas-un-mail;;;\n"
+        ";;;;;\n"
+        "Orphelin;Max;max@ex.fr;;;inconnu@ex.fr\n"
+    )
+
+    report = import_clients(io.BytesIO(csv_data.encode("utf-8")), "clients.csv", c, chunk_size=2)
+
+    assert (report.rows, report.clients_created, report.referrals_created) == (7, 4, 2)
+    assert report.duplicates == 2
+    assert [line for line, _ in report.errors] == [7, 9]
+
+    lea = Client.objects.get(company=c, email="lea@ex.fr")
+    assert lea.is_referrer and lea.phone == "+590690123456" and lea.search_name == "martin lea"
+    assert set(Referral.objects.filter(company=c).values_list("referrer__email", "referee__email")) == {
+        ("lea@ex.fr", "tom@ex.fr"), ("paul@ex.fr", "ana@ex.fr"),
+    }
+    assert [r["id"] for r in search_referrers("mart", company_id=c.id)] == [lea.id]
+
+
+def test_import_clients_dry_run_writes_nothing():
+    import io
+    from dashboard.importer import import_clients
+
+    c = Company.objects.create(name="Shop G")
+    report = import_clients(io.BytesIO(b"nom,prenom,email\nA,B,a@b.fr\n"), "x.csv", c, dry_run=True)
+    assert report.clients_created == 1
+    assert not Client.objects.filter(company=c).exists()
+
+
+def test_import_rejects_unparsable_csv_with_its_line_number():
+    import csv
+    import io
+    from dashboard.importer import ImportFileError, import_clients
+
+    c = Company.objects.create(name="Shop G")
+    data = "nom;prenom\nA;B\nC;" + "x" * (csv.field_size_limit() + 1) + "\n"
+    with pytest.raises(ImportFileError, match="ligne 3"):
+        import_clients(io.BytesIO(data.encode()), "clients.csv", c)
+    assert not Client.objects.filter(company=c).exists()
+
+
+def test_import_reports_undecodable_or_corrupt_files():
+    import io
+    from dashboard.importer import ImportFileError, import_clients, openpyxl
+
+    c = Company.objects.create(name="Shop H")
+    with pytest.raises(ImportFileError, match="encodage attendu UTF-8"):
+        import_clients(io.BytesIO("nom;prenom\nHérault;Zoé\n".encode("cp1252")), "clients.csv", c)
+    if openpyxl is not None:
+        with pytest.raises(ImportFileError, match="XLSX illisible"):
+            import_clients(io.BytesIO(b"nom;prenom\nA;B\n"), "clients.xlsx", c)
+    assert not Client.objects.filter(company=c).exists()
+
+
+def test_export_csv_streams_company_scope(client):
+    from django.urls import reverse
+    from accounts.models import User
+    from rewards.models import Reward
+
+    c1 = Company.objects.create(name="Shop H")
+    c2 = Company.objects.create(name="Shop I")
+    admin = User.objects.create_user("admin-h", password="pw", profile="admin", company=c1)
+    a = _referrer(c1, "Delta", "Eve", email="eve@ex.fr")
+    b = _referrer(c2, "Omega", "Bob")
+    Reward.objects.create(company=c1, client=a, label="-10 %", bucket="SOUVENT", state="SENT")
+    Reward.objects.create(company=c2, client=b, label="-50 %", bucket="RARE", state="SENT")
+
+    client.force_login(admin)
+    resp = client.get(reverse("dashboard:export_csv", args=["rewards"]), {"company": c2.id})
+    assert resp.streaming
+    lines = b"".join(resp.streaming_content).decode("utf-8-sig").splitlines()
+    assert lines[0].startswith("id;entreprise;client_id")
+    assert len(lines) == 2 and "Shop H;" in lines[1] and "eve@ex.fr" in lines[1]
+
+    assert client.get(reverse("dashboard:export_csv", args=["nope"])).status_code == 404
+
+
+def test_export_cells_never_start_a_formula():
+    from dashboard.exports import _cell
+
+    assert [_cell(v) for v in ("=HYPERLINK(\"x\")", "+33 6", "-10 %", "@SUM(A1)", "\tx", "\rx")] == [
+        "'=HYPERLINK(\"x\")", "'+33 6", "'-10 %", "'@SUM(A1)", "'\tx", "'\rx",
+    ]
+    assert [_cell(v) for v in ("Dupont", "a=b", 42, None)] == ["Dupont", "a=b", 42, ""]
+    # Téléphones E.164 et nombres signés : intacts
+    assert [_cell(v) for v in ("+33612345678", "-10", "+1.5")] == ["+33612345678", "-10", "+1.5"]
+    assert _cell("+33612345678+cmd|' /C calc'!A0") == "'+33612345678+cmd|' /C calc'!A0"
+
+
+def test_generate_fixture_data_bulk_inserts_skewed_history_without_signals():
+    from django.db.models import Count
+    from django.db.models.signals import post_save
+    from dashboard.fixture_data import generate_fixture_data
+    from rewards.models import ProbabilityWheel, Reward
+
+    saved = []
+    receiver = lambda sender, **kw: saved.append(sender)  # noqa: E731
+    post_save.connect(receiver, weak=False)
+    try:
+        report = generate_fixture_data(companies=4, clients_per=60, referrals_per=40, years=2, seed=3)
+    finally:
+        post_save.disconnect(receiver)
+
+    assert saved == []
+    assert report.companies == 4 and report.wheels == 8
+    assert ProbabilityWheel.objects.filter(company__slug__startswith="fx-3-").count() == 8
+    assert Reward.objects.count() == report.rewards == 2 * report.referrals
+    assert Referral.objects.values("company", "referee").annotate(n=Count("id")).filter(n__gt=1).count() == 0
+
+    oldest = Reward.objects.order_by("created_at").values_list("created_at", flat=True).first()
+    assert (timezone.now() - oldest).days > 180  # historique conservé malgré auto_now_add
+    assert Reward._meta.get_field("created_at").auto_now_add  # métadonnées du champ intactes
+    sample = Reward.objects.select_related("referral").first()
+    assert sample.created_at == sample.referral.created_at
+    assert set(Reward.objects.values_list("role", flat=True)) == {"referrer", "referee"}
@@ -12,7 +12,10 @@ urlpatterns = [
 
     # Clients – liste / détail
     path("clients/", views.clients_list, name="clients_list"),
+    path("api/clients/", views.clients_list_api, name="clients_list_api"),
     path("clients/<int:pk>/", views.client_detail, name="client_detail"),
+    path("clients/<int:pk>/history/", views.client_history_fragment, name="client_history_fragment"),
+    path("clients/<int:pk>/tabs/<slug:tab>/", views.client_rewards_fragment, name="client_rewards_fragment"),
 
 
     # Clients – édition & suppression (le form est choisi automatiquement)
@@ -21,6 +24,8 @@ urlpatterns = [
     
   # # ✅ Création d'un PARRAIN (écran séparé)
     path("clients/referrers/new/", views.referrer_create, name="referrer_create"),
+    path("clients/import/", views.clients_import, name="clients_import"),
+    path("exports/<slug:kind>.csv", views.export_csv, name="export_csv"),
     
     # Parrainage : création via recherche du parrain + formulaire du filleul
     path("referrals/create/", views.referral_create, name="referral_create"),
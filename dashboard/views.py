@@ -4,9 +4,9 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
-from django.core.paginator import Paginator
 from django.db import IntegrityError, transaction
 from django.db.models import Q
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 
@@ -16,7 +16,9 @@ from django.shortcuts import render, redirect
 from django.utils import timezone
 
 from accounts.models import Company
+from core import events, metrics
 from dashboard.models import Client, Referral
+from dashboard.autocomplete import lookup_referrer, search_referrers, bump_version
 from rewards.services.smsmode import SMSPayload, send_sms
 from .forms import (
     ReferrerClientForm,
@@ -37,8 +39,15 @@ from decimal import Decimal, getcontext
 
 from dashboard.forms import ReferralForm, RefereeInlineForm
 from common.phone_utils import normalize_msisdn
-from django.db.models import Q, F
+from django.db.models import Q, Count, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
+from django.template.loader import render_to_string
+from dashboard.loaders import REWARD_TABS, history_page, load_client_detail, reward_tab_page
+from dashboard.importer import ImportFileError, import_clients
+from dashboard.exports import EXPORTS, iter_csv
+import base64
 import calendar
+import json
 
 
 
@@ -98,6 +107,7 @@ def _promote_to_referrer(client: Client) -> bool:
     updated = Client.objects.filter(pk=client.pk, is_referrer=False).update(is_referrer=True)
     if updated:
         client.is_referrer = True
+        bump_version(client.company_id)  # update() ne déclenche pas post_save
         return True
     return False
 
@@ -114,52 +124,58 @@ def _month_bounds(now=None):
         prev_month_start = month_start.replace(month=month_start.month - 1)
     return month_start, prev_month_start, prev_month_end
 
-def _kpis_for_company(company: Company):
-    now = timezone.now()
+def _kpi_querysets(company: Company, now=None):
+    """Requêtes des KPI d'entreprise (aussi vérifiées par `manage.py check_query_plans`)."""
     month_start, prev_month_start, prev_month_end = _month_bounds(now)
+    return {
+        "referrals_month": Referral.objects.filter(company=company, created_at__gte=month_start),
+        "referrals_prev_month": Referral.objects.filter(
+            company=company, created_at__gte=prev_month_start, created_at__lt=prev_month_end
+        ),
+        # Rôle dénormalisé (Reward.role) : un seul agrégat, sans jointure sur Referral
+        "referrer_rewards": Reward.objects.filter(company=company, role=Reward.ROLE_REFERRER),
+        "clients": Client.objects.filter(company=company),
+    }
 
-    # Parrainages du mois
-    referrals_this_month = Referral.objects.filter(
-        company=company, created_at__gte=month_start
-    ).count()
 
-    prev_referrals = Referral.objects.filter(
-        company=company, created_at__gte=prev_month_start, created_at__lt=prev_month_end
-    ).count()
+def _kpis_for_company(company: Company):
+    kpi = _kpi_querysets(company, timezone.now())
+
+    # Parrainages du mois
+    referrals_this_month = kpi["referrals_month"].count()
+    prev_referrals = kpi["referrals_prev_month"].count()
 
     delta_pct = 0
     if prev_referrals:
         delta_pct = round((referrals_this_month - prev_referrals) * 100 / prev_referrals)
 
     # --- KPI Cadeaux PARRAIN uniquement ---
-    # On ne compte que les rewards liés à un parrainage
-    # ET dont le client est le PARRAIN (referral.referrer)
-    base_qs = Reward.objects.filter(
-        company=company,
-        referral__isnull=False,
-    ).filter(
-        client_id=F("referral__referrer_id")
+    referrer_rewards = kpi["referrer_rewards"].aggregate(
+        sent=Count("id", filter=Q(state="SENT")),
+        pending=Count("id", filter=Q(state="PENDING")),
     )
 
-    rewards_sent = base_qs.filter(state="SENT").count()
-    rewards_pending = base_qs.filter(state="PENDING").count()
+    rewards_sent = referrer_rewards["sent"]
+    rewards_pending = referrer_rewards["pending"]
 
     return {
         "referrals_month": referrals_this_month,
         "referrals_delta_pct": delta_pct,
         "rewards_sent": rewards_sent,          # Cadeaux parrain distribués
         "rewards_pending": rewards_pending,    # Cadeaux parrain en attente
-        "clients": Client.objects.filter(company=company).count(),
+        "clients": kpi["clients"].count(),
     }
 
+def _recent_referrals_qs(company: Company, limit=8):
+    return Referral.objects.select_related("referrer", "referee").filter(company=company).order_by("-created_at")[:limit]
+
+def _pending_rewards_qs(company: Company):
+    return Reward.objects.filter(company=company, state="PENDING")
+
 def _recent_events_for_company(company: Company, limit=8):
     events = []
 
-    for r in (
-        Referral.objects.select_related("referrer", "referee")
-        .filter(company=company)
-        .order_by("-created_at")[:limit]
-    ):
+    for r in _recent_referrals_qs(company, limit):
         events.append(
             {
                 "icon": "👥",
@@ -169,7 +185,7 @@ def _recent_events_for_company(company: Company, limit=8):
             }
         )
 
-    pend = Reward.objects.filter(company=company, state="PENDING").count()
+    pend = _pending_rewards_qs(company).count()
     if pend:
         events.append(
             {"icon": "🎁", "text": "Cadeau en attente — Envoyer le lien au parrain", "badge": str(pend)}
@@ -255,22 +271,40 @@ def company_home(request):
 # -------------------------------------------------------------
 # Clients : liste / détail
 # -------------------------------------------------------------
-@login_required
-def clients_list(request):
-    """
-    Liste des PARRAINS (clients is_referrer=True) de l'entreprise courante
-    (ou de toutes si superadmin). Affiche une popup d'award si présente
-    dans la session (après création d’un parrainage).
-    """
-    _require_company_staff(request.user)
+CLIENTS_PAGE_SIZE = 50
 
-    # Récupère et consomme la popup éventuelle (parrainage créé)
-    award_popup = request.session.pop("award_popup", None)
 
-    u = request.user    
+def _encode_cursor(obj) -> str:
+    """Curseur keyset opaque : (last_name, first_name, id) de la dernière ligne servie."""
+    raw = json.dumps([obj.last_name, obj.first_name, obj.id], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(raw: str | None):
+    if not raw:
+        return None
+    try:
+        last, first, pk = json.loads(base64.urlsafe_b64decode(raw.encode()).decode())
+        return str(last), str(first), int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+def _referrers_list_qs(request):
+    """
+    Parrains visibles par l'utilisateur + compteurs par ligne (sous-requêtes corrélées,
+    calculées dans la même requête SQL) :
+      - referral_count  : parrainages faits
+      - pending_rewards : récompenses en attente
+    """
+    u = request.user
     qs = Client.objects.filter(is_referrer=True)
     if not _is_superadmin(u):
         qs = qs.filter(company=u.company)
+    else:
+        cid = (request.GET.get("company") or "").strip()
+        if cid.isdigit():
+            qs = qs.filter(company_id=int(cid))
 
     q = (request.GET.get("q") or "").strip()
     if q:
@@ -280,13 +314,67 @@ def clients_list(request):
             Q(email__icontains=q)
         )
 
-    qs = qs.order_by("last_name", "first_name")
+    referral_count = (
+        Referral.objects.filter(referrer=OuterRef("pk"))
+        .order_by().values("referrer").annotate(n=Count("id")).values("n")
+    )
+    pending_rewards = (
+        Reward.objects.filter(client=OuterRef("pk"), state="PENDING")
+        .order_by().values("client").annotate(n=Count("id")).values("n")
+    )
+    qs = (
+        qs.only("id", "company_id", "last_name", "first_name", "email", "phone", "is_referrer")
+        .annotate(
+            referral_count=Coalesce(Subquery(referral_count, output_field=IntegerField()), 0),
+            pending_rewards=Coalesce(Subquery(pending_rewards, output_field=IntegerField()), 0),
+        )
+        .order_by("last_name", "first_name", "id")
+    )
+    return qs, q
+
+
+def _keyset_page(qs, cursor, size: int | None = None):
+    """
+    Page suivante après `cursor` (pagination keyset sur last_name, first_name, id :
+    pas d'OFFSET ni de COUNT). Retourne (lignes, curseur suivant | None).
+    """
+    size = size or CLIENTS_PAGE_SIZE
+    after = _decode_cursor(cursor)
+    if after:
+        last, first, pk = after
+        qs = qs.filter(
+            Q(last_name__gt=last)
+            | Q(last_name=last, first_name__gt=first)
+            | Q(last_name=last, first_name=first, id__gt=pk)
+        )
+    rows = list(qs[: size + 1])
+    has_more = len(rows) > size
+    rows = rows[:size]
+    return rows, (_encode_cursor(rows[-1]) if has_more and rows else None)
+
+
+@login_required
+def clients_list(request):
+    """
+    Liste des PARRAINS (clients is_referrer=True) de l'entreprise courante
+    (ou de toutes si superadmin). Affiche une popup d'award si présente
+    dans la session (après création d’un parrainage).
+    Première page rendue côté serveur, la suite via clients_list_api (scroll infini).
+    """
+    _require_company_staff(request.user)
+
+    # Récupère et consomme la popup éventuelle (parrainage créé)
+    award_popup = request.session.pop("award_popup", None)
+
+    qs, q = _referrers_list_qs(request)
+    clients, next_cursor = _keyset_page(qs, request.GET.get("after"))
 
     return render(
         request,
         "dashboard/clients_list.html",
         {
-            "clients": qs,
+            "clients": clients,
+            "next_cursor": next_cursor,
             "filter_type": "parrains",
             "current_q": q,
             "award_popup": award_popup,  # <-- important
@@ -295,66 +383,75 @@ def clients_list(request):
 
 
 @login_required
-def client_detail(request, pk: int):
+def clients_list_api(request):
+    """
+    API JSON du scroll infini de la liste des parrains.
+    GET ?after=<curseur>&q=… -> {"ok": True, "html": "<tr>…", "next": <curseur|null>}
+    """
     _require_company_staff(request.user)
 
+    qs, _q = _referrers_list_qs(request)
+    clients, next_cursor = _keyset_page(qs, request.GET.get("after"))
+    html = render_to_string(
+        "partials/_clients_rows.html", {"clients": clients}, request=request
+    )
+    return JsonResponse({"ok": True, "html": html, "next": next_cursor})
+
+
+def _client_for_staff(request, pk: int) -> Client:
     u = request.user
     if _is_superadmin(u):
-        client = get_object_or_404(Client.objects.select_related("company"), pk=pk)
-    else:
-        client = get_object_or_404(
-            Client.objects.select_related("company"), pk=pk, company=u.company
-        )
-
-    # Historique des parrainages (où ce client est parrain OU filleul)
-    history_qs = (
-        Referral.objects.select_related("referrer", "referee")
-        .filter(company=client.company)
-        .filter(Q(referrer=client) | Q(referee=client))
-        .order_by("-created_at", "-id")
-    )
-    history_page = Paginator(history_qs, 8).get_page(request.GET.get("h"))
-
-    # Map referral_id -> reward_id (récompense de ce client liée à ce parrainage)
-    ref_ids = [r.id for r in history_page.object_list]
-    rewards_for_rows = (
-        Reward.objects.filter(company=client.company, client=client, referral_id__in=ref_ids)
-        .exclude(state="DISABLED")
-        .values_list("referral_id", "id")
+        return get_object_or_404(Client.objects.select_related("company"), pk=pk)
+    return get_object_or_404(
+        Client.objects.select_related("company"), pk=pk, company=u.company
     )
-    ref_rewards = {ref_id: reward_id for ref_id, reward_id in rewards_for_rows}
-    for r in history_page.object_list:
-        r.existing_reward_id = ref_rewards.get(r.id)
 
-    # Récompenses par statut (3 colonnes)
-    rewards_ok = (
-        Reward.objects.filter(company=client.company, client=client, state="SENT").order_by("-id")
-    )
-    rewards_pending = (
-        Reward.objects.filter(company=client.company, client=client, state="PENDING").order_by("-id")
+
+@login_required
+def client_detail(request, pk: int):
+    _require_company_staff(request.user)
+
+    client = _client_for_staff(request, pk)
+
+    # Historique + onglets de récompenses : plan de requêtes groupé (cf. dashboard.loaders)
+    ctx = load_client_detail(client, request.GET)
+
+    return render(
+        request,
+        "dashboard/client_detail.html",
+        {"company": client.company, "client": client, **ctx},
     )
-    rewards_unused = (
-        Reward.objects.filter(company=client.company, client=client, state="DISABLED").order_by("-id")
+
+
+@login_required
+def client_rewards_fragment(request, pk: int, tab: str):
+    """
+    Fragment HTML d'un onglet de récompenses de la fiche client (pagination lazy).
+    GET ?page=N
+    """
+    _require_company_staff(request.user)
+    if tab not in REWARD_TABS:
+        raise Http404("Onglet inconnu")
+
+    client = _client_for_staff(request, pk)
+    page = reward_tab_page(client, tab, request.GET.get("page"))
+    return render(
+        request,
+        "partials/_client_rewards_tab.html",
+        {"company": client.company, "client": client, "tab": tab, "page": page},
     )
 
-    page_ok = Paginator(rewards_ok, 5).get_page(request.GET.get("ok"))
-    page_pending = Paginator(rewards_pending, 5).get_page(request.GET.get("pending"))
-    page_unused = Paginator(rewards_unused, 5).get_page(request.GET.get("unused"))
 
+@login_required
+def client_history_fragment(request, pk: int):
+    """Fragment HTML de l'historique des parrainages de la fiche client. GET ?page=N"""
+    _require_company_staff(request.user)
+
+    client = _client_for_staff(request, pk)
     return render(
         request,
-        "dashboard/client_detail.html",
-        {
-            "company": client.company,
-            "client": client,
-            "history_page": history_page,
-            "page_ok": page_ok,
-            "page_pending": page_pending,
-            "page_unused": page_unused,
-            "kpi_obtenus": rewards_ok.count(),
-            "kpi_attente": rewards_pending.count(),
-            "kpi_nonutils": rewards_unused.count(),
-        },
+        "partials/_client_history.html",
+        {"client": client, "history_page": history_page(client, request.GET.get("page"))},
     )
     
 from django.conf import settings
@@ -505,10 +602,84 @@ def referrer_update(request, pk: int):
         request, "dashboard/referrer_form.html", {"form": form, "referrer": obj, "is_update": True}
     )
 
+@login_required
+def clients_import(request):
+    """
+    Import en masse de clients / parrainages (CSV ou XLSX), cf. dashboard.importer.
+    Réservé aux admins d'entreprise et au superadmin (qui choisit l'entreprise).
+    """
+    if not (_is_superadmin(request.user) or _is_company_admin(request.user)):
+        raise PermissionDenied("Import réservé aux administrateurs.")
+
+    is_super = _is_superadmin(request.user)
+    companies = Company.objects.order_by("name") if is_super else None
+    report = None
+
+    if request.method == "POST":
+        upload = request.FILES.get("file")
+        if is_super:
+            company = Company.objects.filter(pk=request.POST.get("company") or 0).first()
+        else:
+            company = _company_for(request.user)
+
+        if company is None:
+            messages.error(request, "Choisissez une entreprise.")
+        elif upload is None:
+            messages.error(request, "Sélectionnez un fichier à importer.")
+        else:
+            try:
+                report = import_clients(
+                    upload, upload.name, company, dry_run=bool(request.POST.get("dry_run")),
+                )
+            except ImportFileError as exc:
+                messages.error(request, str(exc))
+            except (UnicodeDecodeError, ValueError):
+                logger.exception("clients_import: fichier illisible (%s)", upload.name)
+                messages.error(request, "Fichier illisible (encodage attendu : UTF-8).")
+
+    return render(
+        request,
+        "dashboard/clients_import.html",
+        {"companies": companies, "report": report, "dry_run": bool(request.POST.get("dry_run"))},
+    )
+
+
+@login_required
+def export_csv(request, kind: str):
+    """
+    Export CSV en flux (rewards / referrals / clients), cf. dashboard.exports.
+    - Superadmin : global, ou ?company=<id>
+    - Admin d'entreprise : son entreprise uniquement
+    GET ?state=PENDING|SENT|DISABLED (récompenses)
+    """
+    if kind not in EXPORTS:
+        raise Http404("Export inconnu")
+    if _is_superadmin(request.user):
+        company_id = request.GET.get("company") or None
+        if company_id and not str(company_id).isdigit():
+            raise Http404("Entreprise inconnue")
+    elif _is_company_admin(request.user) and request.user.company_id:
+        company_id = request.user.company_id
+    else:
+        raise PermissionDenied("Export réservé aux administrateurs.")
+
+    state = (request.GET.get("state") or "").strip().upper()
+    suffix = f"-{company_id}" if company_id else ""
+    response = StreamingHttpResponse(
+        iter_csv(kind, company_id=company_id, state=state),
+        content_type="text/csv; charset=utf-8",
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{kind}{suffix}-{timezone.localdate():%Y%m%d}.csv"'
+    )
+    return response
+
+
 @login_required
 def referrer_lookup(request):
     """
     API JSON pour l’autocomplete des parrains.
+    Recherche par préfixe (nom, prénom, téléphone, email) via dashboard.autocomplete.
     """
     _require_company_staff(request.user)
 
@@ -516,45 +687,19 @@ def referrer_lookup(request):
     id_param = request.GET.get("id")
     company_id = request.GET.get("company_id")
 
-    qs = Client.objects.filter(is_referrer=True).select_related("company")
-
     if _is_superadmin(request.user):
-        if company_id:
-            qs = qs.filter(company_id=company_id)
+        scope_company_id = company_id or None
     else:
-        qs = qs.filter(company=request.user.company)
+        scope_company_id = request.user.company_id
 
     if id_param:
-        obj = qs.filter(pk=id_param).first()
-        if not obj:
-            from django.http import JsonResponse
-
+        item = lookup_referrer(id_param, company_id=scope_company_id)
+        if not item:
             return JsonResponse({"ok": False, "error": "not_found"}, status=404)
-        label = f"{obj.last_name} {obj.first_name}".strip() or (obj.email or "—")
-        label += f" — {obj.email or '—'} ({obj.company.name if obj.company else '—'})"
-        label += f" — {obj.phone or '—'}"
-        return JsonResponse({"ok": True, "result": {"id": obj.id, "label": label}})
-
-    if q:
-        qs = qs.filter(
-            Q(last_name__icontains=q) |
-            Q(first_name__icontains=q) |
-            Q(email__icontains=q) |
-            Q(phone__icontains=q)
-        )
-
-    qs = qs.order_by("last_name", "first_name")[:20]
+        return JsonResponse({"ok": True, "result": item})
 
-    def to_item(o):
-        label = f"{o.last_name} {o.first_name}".strip() or (o.email or o.phone or "—")
-        label += f" — {o.email or '—'}"
-        label += f" — {o.phone or '—'}"
-        label += f" ({o.company.name if o.company else '—'})"
-        return {"id": o.id, "label": label}
-
-    from django.http import JsonResponse
-
-    return JsonResponse({"ok": True, "results": [to_item(o) for o in qs]})
+    results = search_referrers(q, company_id=scope_company_id)
+    return JsonResponse({"ok": True, "results": results})
 
 # -------------------------------------------------------------
 # Parrainage : création (recherche parrain + filleul inline)
@@ -660,9 +805,9 @@ def referral_create(request, company_id=None):
                     # =========================
                     rw_referee = None
                     bucket_referee = tirer_recompense_with_normalization(company, referee)
-                    logger.warning(
-                        "tirage_normalisé (FILLEUL) -> %s (client_id=%s, company_id=%s)",
-                        bucket_referee, referee.id, company.id
+                    events.emit(
+                        "referral.draw", role="referee", bucket=bucket_referee,
+                        client=referee.id, company=company.id,
                     )
 
                     # si NO_HIT et aucun min configuré (>0), on force SOUVENT
@@ -707,6 +852,7 @@ def referral_create(request, company_id=None):
                             cooldown_days=tpl_referee.cooldown_days,
                             state="SENT",
                             referral=referral,
+                            role=Reward.ROLE_REFEREE,
                         )
 
                         upd = []
@@ -729,9 +875,9 @@ def referral_create(request, company_id=None):
                     # 2) Tirage PARRAIN (indépendant)
                     # =========================
                     bucket = tirer_recompense_with_normalization(company, referrer)
-                    logger.warning(
-                        "tirage_normalisé -> %s (referrer_id=%s, company_id=%s)",
-                        bucket, referrer.id, company.id
+                    events.emit(
+                        "referral.draw", role="referrer", bucket=bucket,
+                        client=referrer.id, company=company.id,
                     )
 
                     # si NO_HIT et aucun min configuré (>0), on force SOUVENT
@@ -783,9 +929,10 @@ def referral_create(request, company_id=None):
                                         text=text,
                                         sender=(conf.get("SENDER") or "ParrainApp"),
                                     ))
-                                    logger.warning(
-                                        "SMS FILLEUL ok=%s status=%s meta=%s raw=%s",
-                                        res.ok, res.status, meta, (res.raw or {})
+                                    events.emit(
+                                        "sms.sent", None if res.ok else logging.WARNING,
+                                        role="referee", ok=res.ok, status=res.status,
+                                        provider_id=res.provider_id,
                                     )
                                 except Exception:
                                     logger.exception("SMS filleul non envoyé")
@@ -825,6 +972,7 @@ def referral_create(request, company_id=None):
                         cooldown_days=tpl_referrer.cooldown_days if tpl_referrer else 0,
                         state="PENDING",
                         referral=referral,
+                        role=Reward.ROLE_REFERRER,
                     )
                     claim_referrer_abs = _safe_abs(request, rw_referrer)
 
@@ -889,13 +1037,14 @@ def referral_create(request, company_id=None):
                             ]
 
                             body = "\n".join(lines)
-                            send_mail(
-                                subject,
-                                body,
-                                getattr(settings, "DEFAULT_FROM_EMAIL", None),
-                                [to_email],
-                                fail_silently=False,
-                            )
+                            with metrics.track_send("email", metrics.email_provider()):
+                                send_mail(
+                                    subject,
+                                    body,
+                                    getattr(settings, "DEFAULT_FROM_EMAIL", None),
+                                    [to_email],
+                                    fail_silently=False,
+                                )
                         except Exception as e:
                             logger.exception("Email parrain non envoyé: %s", e)
 
@@ -925,9 +1074,10 @@ def referral_create(request, company_id=None):
                                 text=text,
                                 sender=(settings.SMSMODE.get("SENDER") or None),
                             ))
-                            logger.warning(
-                                "SMS PARRAIN ok=%s status=%s meta=%s raw=%s",
-                                res.ok, res.status, meta, (res.raw or {})
+                            events.emit(
+                                "sms.sent", None if res.ok else logging.WARNING,
+                                role="referrer", ok=res.ok, status=res.status,
+                                provider_id=res.provider_id,
                             )
                         except Exception:
                             logger.exception("SMS parrain non envoyé")
@@ -1082,6 +1232,7 @@ def validate_referral_and_award(request, referral_id: int):
         bucket=token,
         cooldown_days=tpl.cooldown_days,
         state="PENDING",
+        role=Reward.ROLE_REFEREE,
     )
 
     messages.success(
@@ -0,0 +1,93 @@
+# public/landing_cache.py
+"""
+Cache des pages publiques d'entreprise (public:company_presentation).
+
+- Page rendue SANS requête (ni jeton CSRF, ni messages) puis mise en cache,
+  clé = slug + version de contenu.
+- La version (horodatage ns) est changée à chaque écriture Company / RewardTemplate :
+  l'ancienne entrée n'est plus jamais lue et expire seule. La clé de version a la
+  même durée de vie que les pages : un slug inconnu (robot) ne laisse pas de clé
+  permanente, et une version expirée est simplement remplacée par une nouvelle.
+- ETag (empreinte du HTML) et Last-Modified (date de la version) permettent
+  les réponses 304 ; Cache-Control public autorise Caddy / un CDN à servir les répétitions.
+- Le jeton CSRF de la modale d'inscription est servi à part (public:csrf_token).
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DEFERRED
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts.models import Company
+from rewards.models import RewardTemplate
+
+
+def _version_key(slug: str) -> str:
+    return f"landing:v:{slug}"
+
+
+def _page_key(slug: str, version: int) -> str:
+    return f"landing:page:{slug}:{version}"
+
+
+def _ttl() -> int:
+    return getattr(settings, "PUBLIC_LANDING_CACHE_TTL", 3600)
+
+
+def landing_version(slug: str) -> int:
+    """Version de contenu courante (créée si absente, ex. cache vidé)."""
+    key = _version_key(slug)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, _ttl()):
+            version = cache.get(key, version)
+    return int(version)
+
+
+def bump_landing_version(slug: Optional[str]) -> None:
+    if slug:
+        cache.set(_version_key(slug), time.time_ns(), _ttl())
+
+
+def get_cached_page(slug: str) -> Tuple[int, Optional[dict]]:
+    """(version, entrée {'html', 'etag'} ou None)."""
+    version = landing_version(slug)
+    return version, cache.get(_page_key(slug, version))
+
+
+def store_page(slug: str, version: int, html: str) -> dict:
+    entry = {"html": html, "etag": f'"{hashlib.md5(html.encode()).hexdigest()}"'}
+    cache.set(_page_key(slug, version), entry, _ttl())
+    return entry
+
+
+# ------------------ Invalidation ------------------
+@receiver(pre_save, sender=Company)
+def _bump_on_slug_change(sender, instance: Company, **kwargs):
+    # Renommage : la page de l'ancien slug ne doit plus être servie
+    if instance.pk:
+        old_slug = instance.loaded_value("slug")  # suivi depuis from_db : pas de relecture
+        if old_slug is DEFERRED:
+            old_slug = Company.objects.filter(pk=instance.pk).values_list("slug", flat=True).first()
+        if old_slug and old_slug != instance.slug:
+            bump_landing_version(old_slug)
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def _bump_on_company_change(sender, instance: Company, **kwargs):
+    bump_landing_version(instance.slug)
+
+
+@receiver(post_save, sender=RewardTemplate)
+@receiver(post_delete, sender=RewardTemplate)
+def _bump_on_template_change(sender, instance: RewardTemplate, **kwargs):
+    slug = Company.objects.filter(pk=instance.company_id).values_list("slug", flat=True).first()
+    bump_landing_version(slug)
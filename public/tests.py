@@ -1,3 +1,55 @@
-from django.test import TestCase
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
 
-# Create your tests here.
+from accounts.models import Company
+from rewards.models import RewardTemplate
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_company_landing_is_cached_and_revalidated(client, django_assert_num_queries):
+    company = Company.objects.create(name="Boutique Soleil")
+    url = reverse("public:company_presentation", args=[company.slug])
+
+    first = client.get(url)
+    assert first.status_code == 200
+    assert "public" in first["Cache-Control"] and first["ETag"]
+    assert b'type="hidden" name="csrfmiddlewaretoken"' not in first.content
+
+    with django_assert_num_queries(0):
+        again = client.get(url)
+    assert again.content == first.content
+
+    not_modified = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert not_modified.status_code == 304
+
+    RewardTemplate.objects.create(company=company, bucket="RARE", label="Un massage offert")
+    changed = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+    assert changed.status_code == 200 and "Un massage offert" in changed.content.decode()
+
+
+def test_landing_csrf_token_endpoint_is_private(client):
+    company = Company.objects.create(name="Boutique Lune")
+    resp = client.get(reverse("public:csrf_token", args=[company.slug]))
+    assert resp.json()["token"]
+    assert "no-cache" in resp["Cache-Control"] or "private" in resp["Cache-Control"]
+
+
+def test_unknown_slugs_do_not_leave_permanent_version_keys(client, settings, monkeypatch):
+    from public import landing_cache
+
+    settings.PUBLIC_LANDING_CACHE_TTL = 120
+    timeouts = []
+    real_add = cache.add
+    monkeypatch.setattr(landing_cache.cache, "add", lambda k, v, t=None: timeouts.append(t) or real_add(k, v, t))
+
+    assert client.get(reverse("public:company_presentation", args=["robot-junk"])).status_code == 404
+    assert timeouts == [120]
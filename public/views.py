@@ -11,11 +11,19 @@ from django.views.decorators.http import require_POST
 from django.contrib.auth import get_user_model
 
 from accounts.models import Company
+from core import metrics
 from dashboard.models import Client
 from .forms import ReferrerForm, ReferrerResetForm
 from rewards.models import RewardTemplate
 from dashboard.forms import ReferrerPublicForm  # ✅
 from django.db.models import Case, When, IntegerField
+from django.http import HttpResponse, JsonResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.cache import add_never_cache_headers, get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.cache import never_cache
+from .landing_cache import get_cached_page, store_page
 # ---------------------------
 # Constantes / helpers
 # ---------------------------
@@ -41,33 +49,74 @@ def _loads_token(token: str) -> dict:
     return signing.loads(token, max_age=REFERRER_RESET_MAX_AGE, salt=REFERRER_RESET_SALT)
 
 
-def company_presentation(request, slug: str):
-    company = get_object_or_404(Company, slug=slug)
-
-    form = ReferrerPublicForm(company=company)
-
+def _landing_context(company: Company) -> dict:
     reward_templates = (
-    RewardTemplate.objects
-    .filter(company=company)
-    .annotate(
-        bucket_order=Case(
-            When(bucket="SOUVENT", then=0),
-            When(bucket="MOYEN", then=1),
-            When(bucket="RARE", then=2),
-            When(bucket="TRES_RARE", then=3),
-            default=99,
-            output_field=IntegerField(),
+        RewardTemplate.objects
+        .filter(company=company)
+        .annotate(
+            bucket_order=Case(
+                When(bucket="SOUVENT", then=0),
+                When(bucket="MOYEN", then=1),
+                When(bucket="RARE", then=2),
+                When(bucket="TRES_RARE", then=3),
+                default=99,
+                output_field=IntegerField(),
+            )
         )
+        .order_by("bucket_order")
     )
-    .order_by("bucket_order")
-)
-
-
-    return render(request, "public/landing_v2.html", {
+    return {
         "company": company,
-        "form": form,
+        "form": ReferrerPublicForm(company=company),
         "reward_templates": reward_templates,
-    })
+    }
+
+
+def _has_pending_messages(request) -> bool:
+    # Sans cookie, aucun message flash possible : on ne touche pas à la session
+    cookies = request.COOKIES
+    if "messages" not in cookies and settings.SESSION_COOKIE_NAME not in cookies:
+        return False
+    return len(messages.get_messages(request)) > 0
+
+
+def company_presentation(request, slug: str):
+    """
+    Page publique de l'entreprise, servie depuis le cache (cf. public.landing_cache).
+    Rendu direct (non cacheable) uniquement s'il y a un message flash à afficher.
+    """
+    if _has_pending_messages(request):
+        company = get_object_or_404(Company, slug=slug)
+        response = render(request, "public/landing_v2.html", _landing_context(company))
+        add_never_cache_headers(response)
+        return response
+
+    version, entry = get_cached_page(slug)
+    if entry is None:
+        company = get_object_or_404(Company, slug=slug)
+        # Rendu sans requête : ni jeton CSRF ni messages dans le HTML partagé
+        html = render_to_string("public/landing_v2.html", _landing_context(company))
+        entry = store_page(slug, version, html)
+
+    last_modified = version // 1_000_000_000
+    response = get_conditional_response(request, etag=entry["etag"], last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(entry["html"])
+    response["ETag"] = entry["etag"]
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=getattr(settings, "PUBLIC_LANDING_MAX_AGE", 60),
+        s_maxage=getattr(settings, "PUBLIC_LANDING_EDGE_MAX_AGE", 300),
+    )
+    return response
+
+
+@never_cache
+def csrf_token(request, slug: str):
+    """Jeton CSRF de la modale d'inscription (la page elle-même est partagée en cache)."""
+    return JsonResponse({"token": get_token(request)})
 
 
 
@@ -154,13 +203,14 @@ def referrer_reset_request(request, slug: str):
                 f"Ce lien est valable {int(REFERRER_RESET_MAX_AGE/3600)} heures.\n"
                 f"— {company.name}"
             )
-            send_mail(
-                subject=subject,
-                message=body,
-                from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
-                recipient_list=[email],
-                fail_silently=False,
-            )
+            with metrics.track_send("email", metrics.email_provider()):
+                send_mail(
+                    subject=subject,
+                    message=body,
+                    from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
+                    recipient_list=[email],
+                    fail_silently=False,
+                )
         except Exception as e:
             messages.warning(request, f"Le lien de réinitialisation n'a pas pu être envoyé : {e}")
 
@@ -1,28 +1,37 @@
 # rewards/admin.py
+from django import forms
 from django.contrib import admin, messages
 from django.db import IntegrityError, transaction
 from django.utils.translation import gettext_lazy as _
 
-from .models import ProbabilityWheel, RewardTemplate, Reward
+from .models import ProbabilityWheel, RewardTemplate, Reward, RewardSweep
+from .services.claims import forget_claims
+from .services.probabilities import (
+    PRESET_SPECS, ensure_wheels, rebuild_wheel, reset_wheel, set_wheel_spec, validate_spec,
+)
 
 
 @admin.action(description="Marquer sélection comme Envoyée")
 def mark_sent(modeladmin, request, queryset):
+    forget_claims(queryset.values_list("token", flat=True))
     updated = queryset.update(state="SENT")
     messages.success(request, _(f"{updated} récompense(s) marquée(s) comme envoyée(s)."))
 
 @admin.action(description="Marquer sélection comme En attente")
 def mark_pending(modeladmin, request, queryset):
+    forget_claims(queryset.values_list("token", flat=True))
     updated = queryset.update(state="PENDING")
     messages.success(request, _(f"{updated} récompense(s) marquée(s) comme en attente."))
 
 @admin.action(description="Marquer sélection comme Désactivée")
 def mark_disabled(modeladmin, request, queryset):
+    forget_claims(queryset.values_list("token", flat=True))
     updated = queryset.update(state="DISABLED")
     messages.success(request, _(f"{updated} récompense(s) désactivée(s)."))
 
 @admin.action(description="Archiver la sélection")
 def mark_archived(modeladmin, request, queryset):
+    forget_claims(queryset.values_list("token", flat=True))
     updated = queryset.update(state="ARCHIVED")
     messages.success(request, _(f"{updated} récompense(s) archivée(s)."))
 
@@ -57,6 +66,13 @@ class RewardAdmin(admin.ModelAdmin):
                 level=messages.ERROR,
             )
 
+@admin.register(RewardSweep)
+class RewardSweepAdmin(admin.ModelAdmin):
+    list_display = ("started_at", "finished_at", "expired", "batches", "dry_run")
+    list_filter = ("dry_run",)
+    ordering = ("-started_at",)
+    readonly_fields = ("started_at", "finished_at", "expired", "batches", "per_company", "dry_run")
+
 @admin.register(RewardTemplate)
 class RewardTemplateAdmin(admin.ModelAdmin):
     list_display = (
@@ -91,10 +107,48 @@ def action_reset_idx(modeladmin, request, queryset):
         reset_wheel(w.company, w.key)
     messages.success(request, _("Curseur réinitialisé à 0 pour la sélection."))
 
+class ProbabilityWheelForm(forms.ModelForm):
+    class Meta:
+        model = ProbabilityWheel
+        fields = ("company", "key", "spec", "block_size")
+        help_texts = {"spec": 'Cotes, ex. {"SOUVENT": 980, "MOYEN": 19, "RARE": 1} ; vide = cotes par défaut.'}
+
+    def clean_spec(self):
+        spec = self.cleaned_data.get("spec") or {}
+        if spec:
+            try:
+                spec = validate_spec(self.cleaned_data.get("key") or getattr(self.instance, "key", ""), spec)
+            except ValueError as exc:
+                raise forms.ValidationError(str(exc))
+        return spec
+
+    def clean(self):
+        data = super().clean()
+        key = data.get("key") or getattr(self.instance, "key", "")
+        if key and not data.get("spec") and key not in PRESET_SPECS:
+            self.add_error("spec", f"Pas de cotes par défaut pour « {key} » : spécification requise.")
+        return data
+
+
 @admin.register(ProbabilityWheel)
 class ProbabilityWheelAdmin(admin.ModelAdmin):
-    list_display = ("company", "key", "size", "idx")
+    form = ProbabilityWheelForm
+    list_display = ("company", "key", "size", "idx", "block_size")
     list_filter = ("company", "key")
     search_fields = ("company__name", "key")
-    readonly_fields = ("size", "idx")
+    readonly_fields = ("size", "idx", "spare")
     actions = [action_ensure_wheels, action_rebuild_selected, action_reset_idx]
+
+    def get_queryset(self, request):
+        # Le pool (jusqu'à 100 000 cases) n'est jamais affiché : on ne le charge pas
+        return super().get_queryset(request).defer("pool")
+
+    def get_readonly_fields(self, request, obj=None):
+        return self.readonly_fields + (("company", "key") if obj else ())
+
+    def save_model(self, request, obj, form, change):
+        # Jamais de save() complet : le pool n'est pas chargé (cf. get_queryset)
+        if not change or "spec" in form.changed_data:
+            # Cotes (re)compilées, position dans le cycle conservée
+            obj.pk = set_wheel_spec(obj.company, obj.key, obj.spec).pk
+        ProbabilityWheel.objects.filter(pk=obj.pk).update(block_size=obj.block_size)
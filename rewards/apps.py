@@ -8,3 +8,4 @@ class RewardsConfig(AppConfig):
 
     def ready(self):
         import rewards.signals  # noqa
+        import rewards.services.claims  # noqa  (invalidation des pages publiques)
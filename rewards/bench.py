@@ -0,0 +1,146 @@
+# rewards/bench.py
+"""
+Banc de performance des chemins chauds (tirage, attribution, écrans de suivi).
+
+- seed_tenants() : entreprises synthétiques reproductibles (graine), via le générateur
+  de dashboard.fixture_data (un seul jeu de répartitions pour le banc et les tests de charge).
+- run_benchmarks() : pour chaque scénario, latence (p50/p95/max), requêtes SQL
+  par appel et pic mémoire (tracemalloc, mesuré sur un appel à part).
+- Résultat : dict sérialisable en JSON (cf. commande `manage.py bench`), à comparer
+  d'un commit à l'autre.
+
+Ne gère pas la base : la commande l'exécute dans une base de test jetable.
+"""
+from __future__ import annotations
+
+import statistics
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+from django.db import connection
+from django.test import Client as HttpClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import Company, User
+from dashboard.fixture_data import generate_fixture_data
+from dashboard.models import Client
+from rewards.models import RewardTemplate
+from rewards.services.probabilities import tirer_recompense, tirer_recompense_with_normalization
+
+SCENARIOS = (
+    "tirer_recompense",
+    "tirer_recompense_with_normalization",
+    "referral_create",
+    "wheels_snapshot",
+    "superadmin_home",
+    "rewards_history_company",
+)
+
+# bucket, minimum de parrainages
+_MIN_REFERRALS = (("RARE", 2), ("TRES_RARE", 5))
+
+
+@dataclass
+class BenchResult:
+    scenario: str
+    iterations: int
+    p50_ms: float
+    p95_ms: float
+    max_ms: float
+    mean_ms: float
+    queries_per_call: float
+    peak_kib: float
+
+
+def seed_tenants(*, companies: int = 3, clients: int = 200, referrals: int = 300,
+                 years: int = 1, seed: int = 42) -> List[Company]:
+    """
+    Entreprises synthétiques du banc : le générateur de dashboard.fixture_data
+    (mêmes répartitions que generate_fixture_data ; `clients` / `referrals` sont des
+    moyennes par entreprise), puis des minimums de parrainages sur RARE / TRES_RARE
+    pour que les tirages passent par le calcul d'éligibilité.
+    """
+    report = generate_fixture_data(
+        companies=companies, clients_per=clients, referrals_per=referrals,
+        years=years, seed=seed, prefix="bench",
+    )
+    created = list(Company.objects.filter(slug__in=report.slugs).order_by("id"))
+    for bucket, minimum in _MIN_REFERRALS:
+        RewardTemplate.objects.filter(company__in=created, bucket=bucket).update(min_referrals_required=minimum)
+    return created
+
+
+def _measure(name: str, fn: Callable[[int], object], iterations: int) -> BenchResult:
+    fn(-1)  # échauffement (caches, roues, templates)
+
+    timings, queries = [], 0
+    for i in range(iterations):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            fn(i)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries += len(ctx.captured_queries)
+
+    tracemalloc.start()
+    try:
+        fn(iterations)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return BenchResult(
+        scenario=name,
+        iterations=iterations,
+        p50_ms=round(statistics.median(timings), 3),
+        p95_ms=round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        max_ms=round(timings[-1], 3),
+        mean_ms=round(statistics.fmean(timings), 3),
+        queries_per_call=round(queries / iterations, 2),
+        peak_kib=round(peak / 1024, 1),
+    )
+
+
+def run_benchmarks(companies: List[Company], *, iterations: int = 50,
+                   scenarios: Optional[List[str]] = None) -> Dict[str, dict]:
+    """Exécute les scénarios demandés sur la première entreprise du jeu de données."""
+    from rewards.views import _wheels_snapshot
+
+    company = companies[0]
+    referrer = Client.objects.filter(company=company, is_referrer=True).order_by("id").first()
+
+    admin = User.objects.create_user(f"bench-admin-{company.pk}", password="x", profile="admin", company=company)
+    superadmin = User.objects.create_user(f"bench-sa-{company.pk}", password="x", profile="superadmin")
+    as_admin, as_superadmin = HttpClient(), HttpClient()
+    as_admin.force_login(admin)
+    as_superadmin.force_login(superadmin)
+
+    def referral_create(i):
+        resp = as_admin.post(reverse("dashboard:referral_create"), {
+            "referrer": referrer.pk, "last_name": f"Bench{i}", "first_name": "Filleul",
+            "email": f"bench-{i}-{time.monotonic_ns()}@filleul.test",
+        })
+        assert resp.status_code in (200, 302), resp.status_code
+
+    def get(http, name):
+        def call(_i):
+            resp = http.get(reverse(name))
+            assert resp.status_code == 200, resp.status_code
+        return call
+
+    runners = {
+        "tirer_recompense": lambda _i: tirer_recompense(company, referrer),
+        "tirer_recompense_with_normalization": lambda _i: tirer_recompense_with_normalization(company, referrer),
+        "referral_create": referral_create,
+        "wheels_snapshot": lambda _i: _wheels_snapshot(company),
+        "superadmin_home": get(as_superadmin, "dashboard:superadmin_home"),
+        "rewards_history_company": get(as_admin, "rewards:history_company"),
+    }
+
+    results = {}
+    for name in scenarios or SCENARIOS:
+        results[name] = asdict(_measure(name, runners[name], iterations))
+    return results
@@ -0,0 +1,92 @@
+import json
+import platform
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment,
+    teardown_databases, teardown_test_environment,
+)
+from django.utils import timezone
+
+from rewards.bench import SCENARIOS, run_benchmarks, seed_tenants
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+class Command(BaseCommand):
+    help = (
+        "Banc de performance (tirages, parrainage, écrans superadmin / historique) "
+        "sur des entreprises synthétiques, dans une base de test jetable. Sortie JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--companies", type=int, default=5)
+        parser.add_argument("--clients", type=int, default=500, help="Clients par entreprise (moyenne).")
+        parser.add_argument("--referrals", type=int, default=300,
+                            help="Parrainages par entreprise (moyenne ; deux récompenses chacun).")
+        parser.add_argument("--years", type=int, default=1, help="Profondeur d'historique (années).")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--iterations", type=int, default=50, help="Appels mesurés par scénario.")
+        parser.add_argument("--scenario", action="append", choices=SCENARIOS, dest="scenarios",
+                            help="Scénario à exécuter (répétable ; défaut : tous).")
+        parser.add_argument("--output", default="", help="Fichier JSON (défaut : sortie standard).")
+        parser.add_argument("--keepdb", action="store_true", help="Conserve la base de test entre deux runs.")
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1 or options["companies"] < 1:
+            raise CommandError("--iterations et --companies doivent être >= 1.")
+
+        try:
+            setup_test_environment()
+            own_test_env = True
+        except RuntimeError:
+            own_test_env = False  # déjà en environnement de test (pytest)
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options["keepdb"])
+        try:
+            # Ni SMS réels ni exception de budget de requêtes pendant la mesure
+            with override_settings(
+                SMSMODE={**settings.SMSMODE, "DRY_RUN": True},
+                QUERY_BUDGET_RAISE=False,
+                PERF_INSTRUMENTATION=False,
+            ):
+                companies = seed_tenants(
+                    companies=options["companies"], clients=options["clients"],
+                    referrals=options["referrals"], years=options["years"], seed=options["seed"],
+                )
+                results = run_benchmarks(
+                    companies, iterations=options["iterations"], scenarios=options["scenarios"],
+                )
+            report = {
+                "meta": {
+                    "git": _git_revision(),
+                    "date": timezone.now().isoformat(),
+                    "database": connection.vendor,
+                    "python": platform.python_version(),
+                    **{k: options[k] for k in ("companies", "clients", "referrals", "years", "seed", "iterations")},
+                },
+                "results": results,
+            }
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options["keepdb"])
+            if own_test_env:
+                teardown_test_environment()
+
+        payload = json.dumps(report, indent=2, ensure_ascii=False)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(payload + "\n")
+            self.stderr.write(self.style.SUCCESS(f"Résultats écrits dans {options['output']}"))
+        else:
+            sys.stdout.write(payload + "\n")
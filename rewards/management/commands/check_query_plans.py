@@ -0,0 +1,228 @@
+import json
+import re
+from types import SimpleNamespace
+from typing import List, NamedTuple, Optional
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpRequest
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from django.utils import timezone
+
+from accounts.models import Company
+from dashboard.models import Client, Referral
+from rewards.models import Reward
+
+# SQLite : "SEARCH rewards_reward USING INDEX x (company_id=?)", "SCAN rewards_reward",
+# "SCAN U0 USING COVERING INDEX x", "SEARCH T4 USING INTEGER PRIMARY KEY (rowid=?)"
+_SQLITE_SCAN = re.compile(r"\b(SCAN|SEARCH) (\w+)(.*)$")
+_SQLITE_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+
+_PG_INDEX_NODES = ("Index Scan", "Index Only Scan", "Bitmap Index Scan")
+
+
+class ScanNode(NamedTuple):
+    """Accès à une table dans un plan : index utilisé (None = parcours séquentiel), borné ou non."""
+    table: str
+    index: Optional[str]
+    has_cond: bool
+
+
+def hot_queries(company_id: int, client_id: int):
+    """
+    (nom, queryset, index attendus) des requêtes chaudes à surveiller, construites par les
+    mêmes fonctions que les vues et services : un changement de requête y est vérifié d'office.
+    Un index attendu est un nom, ou (modèle, colonnes de tête) pour les index nommés par Django.
+    """
+    # Imports locaux : la commande ne charge les vues qu'à l'exécution
+    from dashboard.loaders import reward_tab_qs
+    from dashboard.views import (
+        CLIENTS_PAGE_SIZE, _kpi_querysets, _pending_rewards_qs, _recent_referrals_qs, _referrers_list_qs,
+    )
+    from rewards.services.claims import claim_queryset
+    from rewards.services.probabilities import referrals_of
+    from rewards.services.sweeper import expired_batch
+
+    now = timezone.now()
+    company = Company(pk=company_id)
+    client = Client(pk=client_id, company_id=company_id)
+    kpi = _kpi_querysets(company, now)
+
+    # Liste des parrains telle que la voit un admin de l'entreprise (première page)
+    request = HttpRequest()
+    request.user = SimpleNamespace(company=company)
+    referrers, _q = _referrers_list_qs(request)
+
+    return [
+        ("kpi_referrer_rewards", kpi["referrer_rewards"], ["reward_referrer_state_idx"]),
+        ("kpi_referrals_month", kpi["referrals_month"], ["referral_company_created_idx"]),
+        ("kpi_referrals_prev_month", kpi["referrals_prev_month"], ["referral_company_created_idx"]),
+        ("recent_referrals", _recent_referrals_qs(company), ["referral_company_created_idx"]),
+        ("pending_rewards_company", _pending_rewards_qs(company), ["reward_pending_company_idx"]),
+        ("client_detail_tab", reward_tab_qs(client, "ok")[:5],
+         ["reward_client_state_id_idx", (Reward, ["company_id", "client_id", "state"])]),
+        ("eligibility_referrals_count", referrals_of(company, client), ["referral_company_referrer_idx"]),
+        ("claim_by_token", claim_queryset("x" * 32), [(Reward, ["token"])]),
+        ("sweeper_expired_pending", expired_batch(now), ["reward_pending_expiry_idx"]),
+        ("sweeper_expired_next", expired_batch(now, after=(now, 1)), ["reward_pending_expiry_idx"]),
+        ("referrers_list_page", referrers[: CLIENTS_PAGE_SIZE + 1], ["client_ref_list_order_idx"]),
+    ]
+
+
+def scan_nodes(plan: str, vendor: str) -> List[ScanNode]:
+    """Accès aux tables d'un plan : EXPLAIN JSON sur Postgres, EXPLAIN QUERY PLAN sur SQLite."""
+    if vendor == "postgresql":
+        nodes = []
+        stack = [entry["Plan"] for entry in json.loads(plan)]
+        while stack:
+            node = stack.pop()
+            stack.extend(node.get("Plans", []))
+            if node["Node Type"] == "Seq Scan":
+                nodes.append(ScanNode(node["Relation Name"], None, False))
+            elif node["Node Type"] in _PG_INDEX_NODES:
+                nodes.append(ScanNode(node.get("Relation Name", ""), node["Index Name"], "Index Cond" in node))
+        return nodes
+    if vendor == "sqlite":
+        nodes = []
+        for line in plan.splitlines():
+            m = _SQLITE_SCAN.search(line)
+            if not m or m.group(2) == "CONSTANT":
+                continue
+            kind, table, rest = m.groups()
+            if "PRIMARY KEY" in rest:
+                index = "PRIMARY KEY"
+            else:
+                # Index AUTOMATIC : construit à la volée en parcourant la table
+                index = (m_index := _SQLITE_INDEX.search(rest)) and m_index.group(1)
+            nodes.append(ScanNode(table, index or None, kind == "SEARCH"))
+        return nodes
+    return []
+
+
+def _index_names(cursor, model, columns) -> set:
+    """Index de la table de `model` dont les colonnes de tête sont `columns`."""
+    table = model._meta.db_table
+    if connection.vendor == "sqlite":
+        # PRAGMA : couvre aussi les index implicites des UNIQUE (sqlite_autoindex_*)
+        cursor.execute(f"PRAGMA index_list({table})")
+        names = [row[1] for row in cursor.fetchall()]
+        found = set()
+        for name in names:
+            cursor.execute(f"PRAGMA index_info({name})")
+            if [row[2] for row in cursor.fetchall()][: len(columns)] == columns:
+                found.add(name)
+        return found
+    return {
+        name for name, c in connection.introspection.get_constraints(cursor, table).items()
+        if (c["index"] or c["unique"]) and c["columns"][: len(columns)] == columns
+    }
+
+
+def _single_page_tables(cursor, tables) -> set:
+    """Tables d'une seule page : Postgres les lit d'un bloc plutôt que par un index, à raison."""
+    if connection.vendor != "postgresql" or not tables:
+        return set()
+    cursor.execute(
+        "SELECT relname FROM pg_class WHERE relname = ANY(%s) AND relpages <= 1", [sorted(tables)],
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def plan_problems(nodes: List[ScanNode], expected: set, small_tables: set = frozenset()) -> List[str]:
+    """
+    Défauts d'un plan : parcours séquentiel (hors tables d'une page), index parcouru
+    sans condition (parcours complet), aucun des index attendus utilisé avec une condition.
+    """
+    problems = []
+    for node in nodes:
+        if node.index is None and node.table not in small_tables:
+            problems.append(f"Seq Scan sur {node.table}")
+        elif node.index is not None and not node.has_cond:
+            problems.append(f"index {node.index} parcouru sans condition ({node.table})")
+    if not any(node.index in expected and node.has_cond for node in nodes):
+        problems.append(f"aucun index attendu utilisé ({', '.join(sorted(expected))})")
+    return problems
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN des requêtes chaudes (KPI, fiche client, éligibilité, liens publics…) avec les "
+        "réglages par défaut du planificateur ; échoue sur un parcours séquentiel, un index "
+        "parcouru sans condition ou une requête qui n'emprunte pas l'index prévu. "
+        "--synthetic : sur des entreprises synthétiques (rewards.bench) dans une base jetable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verbose-plans", action="store_true", help="Affiche les plans complets.")
+        parser.add_argument("--synthetic", action="store_true",
+                            help="Base de test jetable peuplée par seed_tenants (puis ANALYZE).")
+        parser.add_argument("--companies", type=int, default=3)
+        parser.add_argument("--clients", type=int, default=2000, help="Clients par entreprise (moyenne).")
+        parser.add_argument("--referrals", type=int, default=3000, help="Parrainages par entreprise (moyenne).")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        if not options["synthetic"]:
+            return self._check(options)
+
+        from rewards.bench import seed_tenants
+
+        try:
+            setup_test_environment()
+            own_test_env = True
+        except RuntimeError:
+            own_test_env = False  # déjà en environnement de test (pytest)
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            seed_tenants(
+                companies=options["companies"], clients=options["clients"],
+                referrals=options["referrals"], seed=options["seed"],
+            )
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")  # statistiques à jour : le plan est celui d'une base vivante
+            self._check(options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            if own_test_env:
+                teardown_test_environment()
+
+    def _check(self, options):
+        # Le parrain le plus ancien de l'entreprise la plus ancienne : des lignes derrière chaque requête
+        referral = Referral.objects.order_by("company_id", "id").values("company_id", "referrer_id").first()
+        if referral:
+            company_id, client_id = referral["company_id"], referral["referrer_id"]
+        else:
+            company_id = Company.objects.order_by("id").values_list("id", flat=True).first() or 1
+            client_id = (
+                Client.objects.filter(company_id=company_id).order_by("id").values_list("id", flat=True).first()
+                or 1
+            )
+
+        failures = []
+        for name, qs, expected in hot_queries(company_id, client_id):
+            if connection.vendor == "postgresql":
+                plan = qs.explain(format="json")
+            else:
+                plan = qs.explain()
+            nodes = scan_nodes(plan, connection.vendor)
+            with connection.cursor() as cursor:
+                expected_names = set()
+                for spec in expected:
+                    expected_names |= {spec} if isinstance(spec, str) else _index_names(cursor, *spec)
+                small_tables = _single_page_tables(cursor, {n.table for n in nodes if n.index is None})
+
+            problems = plan_problems(nodes, expected_names, small_tables)
+            if problems:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"KO   {name} : {' ; '.join(problems)}"))
+            else:
+                used = sorted({n.index for n in nodes if n.index in expected_names})
+                self.stdout.write(self.style.SUCCESS(f"OK   {name} ({', '.join(used)})"))
+            if options["verbose_plans"] or problems:
+                self.stdout.write(plan + "\n")
+
+        if failures:
+            raise CommandError(f"Plan inadapté pour {len(failures)} requête(s) : {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS(f"{connection.vendor} : chaque requête chaude emprunte son index."))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from rewards.services.ledger import ensure_month_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Crée les partitions mensuelles à venir du journal des tirages (DrawEvent, Postgres) "
+        "et y rapatrie les lignes tombées dans la partition DEFAULT. À planifier (cron mensuel)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=3, help="Nombre de mois à préparer (défaut 3).")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            self.stdout.write(f"Base {connection.vendor} : pas de partitionnement, rien à faire.")
+            return
+        created = ensure_month_partitions(max(0, options["ahead"]))
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(created)} partition(s) créée(s)" + (f" : {', '.join(created)}" if created else ".")
+        ))
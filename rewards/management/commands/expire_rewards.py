@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from rewards.services.sweeper import SWEEP_CHUNK_SIZE, expire_stale_rewards
+
+
+class Command(BaseCommand):
+    help = (
+        "Passe à l'état EXPIRED les récompenses en attente dont le lien a expiré "
+        "(par paquets bornés ; à planifier via cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=SWEEP_CHUNK_SIZE,
+                            help=f"Récompenses par paquet (défaut {SWEEP_CHUNK_SIZE}).")
+        parser.add_argument("--max-batches", type=int, default=None,
+                            help="Nombre maximal de paquets pour ce passage.")
+        parser.add_argument("--company", type=int, default=None, help="Limiter à une entreprise (id).")
+        parser.add_argument("--dry-run", action="store_true", help="Compte sans rien modifier.")
+
+    def handle(self, *args, **options):
+        sweep = expire_stale_rewards(
+            chunk_size=max(1, options["chunk_size"]),
+            max_batches=options["max_batches"],
+            company_id=options["company"],
+            dry_run=options["dry_run"],
+        )
+        prefix = "[dry-run] " if sweep.dry_run else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{sweep.expired} récompense(s) expirée(s) en {sweep.batches} paquet(s) "
+            f"sur {len(sweep.per_company)} entreprise(s)."
+        ))
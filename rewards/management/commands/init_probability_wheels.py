@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand, CommandError
 from accounts.models import Company
-from rewards.services.probabilities import ensure_wheels
+from rewards.services.provisioning import provision_wheels
 
 class Command(BaseCommand):
     help = "Initialise les roues de probabilité pour une entreprise."
@@ -10,10 +10,11 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         slug = options["company"]
-        try:
-            company = Company.objects.get(slug=slug)
-        except Company.DoesNotExist:
+        companies = Company.objects.filter(slug=slug)
+        if not companies.exists():
             raise CommandError(f"Company '{slug}' introuvable")
 
-        ensure_wheels(company)
-        self.stdout.write(self.style.SUCCESS(f"OK: {company} • base & very_rare"))
+        report = provision_wheels(companies)
+        self.stdout.write(self.style.SUCCESS(
+            f"OK: {slug} • base & very_rare ({report.created} créée(s), {report.updated} réécrite(s))"
+        ))
@@ -1,11 +1,19 @@
 from django.core.management.base import BaseCommand
 from accounts.models import Company
-from rewards.services.probabilities import ensure_wheels
+from rewards.services.provisioning import PROVISION_CHUNK_SIZE, provision_wheels
 
 class Command(BaseCommand):
-    help = "Reconstruit/initialise les roues de probabilité pour chaque entreprise."
+    help = "Reconstruit/initialise les roues de probabilité pour chaque entreprise active."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=PROVISION_CHUNK_SIZE,
+                            help="Entreprises par paquet.")
 
     def handle(self, *args, **opts):
-        for c in Company.objects.filter(is_active=True):
-            ensure_wheels(c)
-            self.stdout.write(self.style.SUCCESS(f"{c.name}: wheels ensured"))
+        def progress(report):
+            self.stdout.write(f"{report.done}/{report.companies} entreprises — "
+                              f"{report.created} roue(s) créée(s), {report.updated} réécrite(s)")
+
+        report = provision_wheels(Company.objects.filter(is_active=True),
+                                  chunk_size=opts["chunk_size"], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f"{report.companies} entreprise(s) mise(s) à niveau"))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Company
+from rewards.models import DrawEvent
+from rewards.services.probabilities import replay_normalized
+from rewards.services.ledger import OUTCOME_CODES, OUTCOME_LABELS
+
+
+class Command(BaseCommand):
+    help = (
+        "Rejoue les tirages journalisés (DrawEvent) d'une entreprise et vérifie que chaque "
+        "résultat correspond au flux déterministe (audit « ce jackpot était-il régulier ? »)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company", required=True, help="Slug de l'entreprise.")
+        parser.add_argument("--from", type=int, default=None, dest="first", help="Premier n° de tirage.")
+        parser.add_argument("--to", type=int, default=None, dest="last", help="Dernier n° de tirage.")
+        parser.add_argument("--outcome", choices=list(OUTCOME_LABELS.values()),
+                            help="Ne rejouer que les tirages ayant donné ce résultat (ex. TRES_RARE).")
+
+    def handle(self, *args, **o):
+        company = Company.objects.filter(slug=o["company"]).first()
+        if company is None:
+            raise CommandError(f"Entreprise '{o['company']}' introuvable.")
+
+        qs = DrawEvent.objects.filter(company=company, wheel=DrawEvent.WHEEL_NORMALIZED)
+        if o["first"] is not None:
+            qs = qs.filter(draw_no__gte=o["first"])
+        if o["last"] is not None:
+            qs = qs.filter(draw_no__lte=o["last"])
+        if o["outcome"]:
+            qs = qs.filter(outcome=OUTCOME_CODES[o["outcome"]])
+
+        checked, mismatches = 0, []
+        for draw_no, mask, outcome in qs.order_by("draw_no").values_list("draw_no", "mask", "outcome").iterator():
+            checked += 1
+            expected = replay_normalized(company.id, draw_no, mask)
+            if expected != OUTCOME_LABELS[outcome]:
+                mismatches.append((draw_no, OUTCOME_LABELS[outcome], expected))
+
+        for draw_no, got, expected in mismatches[:20]:
+            self.stdout.write(self.style.ERROR(f"  #{draw_no} : journalisé {got}, rejoué {expected}"))
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} tirage(s) non conforme(s) sur {checked}.")
+        self.stdout.write(self.style.SUCCESS(f"{checked} tirage(s) rejoué(s) : tous conformes."))
@@ -1,6 +1,9 @@
+import time
+
 from django.core.management.base import BaseCommand
-from accounts.models import Company
-from rewards.services.probabilities import ensure_wheels_for_company
+
+from rewards.services.provisioning import PROVISION_CHUNK_SIZE, provision_wheels
+
 
 class Command(BaseCommand):
     help = "Initialise (ou ré-initialise) les roues de probabilités pour chaque entreprise."
@@ -11,20 +14,17 @@ class Command(BaseCommand):
             action="store_true",
             help="Ré-initialise les roues (réécrit le pool et remet idx=0)."
         )
+        parser.add_argument("--chunk-size", type=int, default=PROVISION_CHUNK_SIZE,
+                            help="Entreprises par paquet.")
 
     def handle(self, *args, **options):
-        reset = options["reset"]
-        count = 0
-        for company in Company.objects.all():
-            ensure_wheels_for_company(company)
-            count += 1
+        started = time.monotonic()
+
+        def progress(report):
+            self.stdout.write(f"{report.done}/{report.companies} entreprises — "
+                              f"{report.created} roue(s) créée(s), {report.updated} réécrite(s)")
+
+        report = provision_wheels(reset=options["reset"], chunk_size=options["chunk_size"], progress=progress)
         self.stdout.write(self.style.SUCCESS(
-            f"Roues initialisées pour {count} entreprise(s)."
+            f"Roues initialisées pour {report.companies} entreprise(s) en {time.monotonic() - started:.1f} s."
         ))
-        if reset:
-            # Optionnel : si tu veux forcer un reset plus fort, tu peux
-            # étendre ensure_wheels_for_company pour régénérer les pools
-            self.stdout.write(self.style.WARNING(
-                "Option --reset indiquée : assure-toi que ensure_wheels_for_company "
-                "régénère les pools comme attendu."
-            ))
@@ -0,0 +1,282 @@
+import json
+import multiprocessing
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client as HttpClient
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+
+from accounts.models import Company, User
+from dashboard.models import Client
+from rewards.models import ProbabilityWheel, RewardTemplate
+from rewards.services import wheel_blocks
+from rewards.services.probabilities import (
+    BASE_KEY, MOYEN, RARE, SOUVENT, TRES_RARE, VERY_RARE_KEY,
+    _eligible_buckets_for, ensure_wheels, tirer_recompense,
+)
+
+# (type, durée s, résultat, attente verrou s, erreur)
+Sample = Tuple[str, float, str, float, bool]
+
+
+class _LockTimer:
+    """Temps passé dans les SELECT … FOR UPDATE (attente du verrou de ligne comprise)."""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        if "FOR UPDATE" not in sql:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+
+def _split(total: int, parts: int) -> List[int]:
+    return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+
+def _thread_body(company_id, client_id, user_id, draws, referrals, out: List[Sample]):
+    company = Company.objects.get(pk=company_id)
+    client = Client.objects.get(pk=client_id)
+    http = None
+    if referrals:
+        http = HttpClient()
+        http.force_login(User.objects.get(pk=user_id))
+
+    jobs = ["draw"] * draws + ["referral"] * referrals
+    try:
+        for kind in jobs:
+            timer = _LockTimer()
+            start = time.perf_counter()
+            outcome, error = "", False
+            try:
+                with connection.execute_wrapper(timer):
+                    if kind == "draw":
+                        outcome = tirer_recompense(company, client)
+                    else:
+                        tag = uuid.uuid4().hex
+                        resp = http.post(reverse("dashboard:referral_create"), {
+                            "referrer": client.pk, "last_name": f"Stress {tag[:12]}", "first_name": "Filleul",
+                            "email": f"stress-{tag}@filleul.test",
+                        })
+                        outcome, error = str(resp.status_code), resp.status_code not in (200, 302)
+            except Exception as exc:
+                outcome, error = type(exc).__name__, True
+            out.append((kind, time.perf_counter() - start, outcome, timer.seconds, error))
+    finally:
+        connection.close()
+
+
+def _run_process(args) -> List[Sample]:
+    company_id, client_id, user_id, draws, referrals, threads = args
+    samples: List[Sample] = []
+    workers = [
+        threading.Thread(target=_thread_body, args=(company_id, client_id, user_id, d, r, samples))
+        for d, r in zip(_split(draws, threads), _split(referrals, threads))
+    ]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    wheel_blocks.release_all()  # mode bloc : cases non servies rendues avant le contrôle
+    return samples
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct))]
+
+
+def expected_slots(pool: List[str], start: int, n: int) -> Counter:
+    """Contenu exact des n cases suivantes de la roue cyclique à partir de start."""
+    size = len(pool)
+    full, rest = divmod(n, size)
+    counts = Counter({k: v * full for k, v in Counter(pool).items()})
+    counts.update(pool[(start + i) % size] for i in range(rest))
+    return +counts
+
+
+def exactness_report(before: Dict[str, Tuple[int, List[str]]], after: Dict[str, int], outcomes: Counter,
+                     spare: Optional[Dict[str, List[int]]] = None) -> dict:
+    """
+    Compare les résultats obtenus au contenu exact des cases consommées :
+    un doublon (deux tirages sur la même case) ou une case sautée fausse
+    soit les comptes, soit la position finale du curseur.
+    `spare` : cases réservées puis rendues (mode bloc), derrière le curseur mais non servies.
+    """
+    spare = spare or {}
+    vr_start, vr_pool = before[VERY_RARE_KEY]
+    base_start, base_pool = before[BASE_KEY]
+    vr_spare, base_spare = spare.get(VERY_RARE_KEY, []), spare.get(BASE_KEY, [])
+
+    n_draws = sum(outcomes.values())
+    n_base = n_draws - outcomes.get(TRES_RARE, 0)
+    expected_vr = expected_slots(vr_pool, vr_start, n_draws + len(vr_spare))
+    expected_vr.subtract(vr_pool[s] for s in vr_spare)
+    expected_base = expected_slots(base_pool, base_start, n_base + len(base_spare))
+    expected_base.subtract(base_pool[s] for s in base_spare)
+    expected_base = +expected_base
+    expected = Counter({TRES_RARE: expected_vr.get(TRES_RARE, 0), **expected_base})
+    got = Counter({k: outcomes.get(k, 0) for k in (SOUVENT, MOYEN, RARE, TRES_RARE)})
+
+    checks = {
+        "counts": +got == +expected,
+        "base_cursor": after[BASE_KEY] == (base_start + n_base + len(base_spare)) % len(base_pool),
+        "very_rare_cursor": after[VERY_RARE_KEY] == (vr_start + n_draws + len(vr_spare)) % len(vr_pool),
+    }
+    return {
+        "ok": all(checks.values()),
+        "checks": checks,
+        "expected": dict(+expected),
+        "got": dict(+got),
+        "per_1000_base": {k: round(v * 1000 / n_base, 3) for k, v in expected_base.items()} if n_base else {},
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Charge concurrente (threads × processus) de tirer_recompense et referral_create "
+        "sur UNE entreprise : débit, latences p50/p99, attente de verrou et contrôle "
+        "d'exactitude de la roue (980/19/1, ni case dupliquée ni case sautée). "
+        "À lancer sur une base Postgres de recette : écrit des données réelles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company", required=True, help="Slug de l'entreprise de test.")
+        parser.add_argument("--create", action="store_true",
+                            help="Crée l'entreprise (modèles sans minimum, parrain, admin) si absente.")
+        parser.add_argument("--draws", type=int, default=2000, help="Nombre total de tirer_recompense.")
+        parser.add_argument("--referrals", type=int, default=0, help="Nombre total de referral_create.")
+        parser.add_argument("--threads", type=int, default=8, help="Threads par processus.")
+        parser.add_argument("--processes", type=int, default=1, help="Processus (fork).")
+        parser.add_argument("--block-size", type=int, default=None,
+                            help="Mode bloc : cases réservées d'un coup par processus (0 = tirage direct).")
+        parser.add_argument("--json", action="store_true", help="Rapport JSON sur la sortie standard.")
+
+    # ------------------ Préparation ------------------
+    def _prepare(self, slug: str, create: bool):
+        company = Company.objects.filter(slug=slug).first()
+        if company is None:
+            if not create:
+                raise CommandError(f"Entreprise '{slug}' introuvable (utiliser --create).")
+            company = Company.objects.create(name=f"Stress {slug}")
+            Company.objects.filter(pk=company.pk).update(slug=slug)
+            company.slug = slug
+            for bucket, _ in RewardTemplate.BUCKETS:
+                RewardTemplate.objects.create(company=company, bucket=bucket, label=f"Stress {bucket}")
+
+        referrer = Client.objects.filter(company=company, is_referrer=True).order_by("id").first()
+        if referrer is None:
+            referrer = Client.objects.create(company=company, last_name="Stress", first_name="Parrain",
+                                             is_referrer=True)
+        user = User.objects.filter(company=company, profile="admin").order_by("id").first()
+        if user is None:
+            user = User.objects.create_user(f"stress-{company.pk}", password=uuid.uuid4().hex,
+                                            profile="admin", company=company)
+        ensure_wheels(company)
+        return company, referrer, user
+
+    def handle(self, *args, **o):
+        if o["threads"] < 1 or o["processes"] < 1 or o["draws"] < 0 or o["referrals"] < 0:
+            raise CommandError("--threads/--processes >= 1, --draws/--referrals >= 0.")
+        if connection.vendor != "postgresql":
+            self.stderr.write(self.style.WARNING(
+                f"Base {connection.vendor} : les écritures concurrentes y sont sérialisées, "
+                "résultats non représentatifs de la prod."
+            ))
+
+        try:
+            setup_test_environment()  # ALLOWED_HOSTS 'testserver', emails en mémoire
+        except RuntimeError:
+            pass  # déjà en environnement de test (pytest)
+        company, referrer, user = self._prepare(o["company"], o["create"])
+        if o["block_size"] is not None:
+            ProbabilityWheel.objects.filter(company=company).update(block_size=max(0, o["block_size"]))
+
+        elig = _eligible_buckets_for(company, referrer)
+        exact_possible = all(elig.get(b) for b in (SOUVENT, MOYEN, RARE, TRES_RARE))
+        wheels = list(ProbabilityWheel.objects.filter(company=company, key__in=[BASE_KEY, VERY_RARE_KEY]))
+        before = {w.key: (w.idx, list(w.pool)) for w in wheels}
+        before_spare = {w.key: set(w.spare) for w in wheels}
+
+        jobs = [
+            (company.pk, referrer.pk, user.pk, d, r, o["threads"])
+            for d, r in zip(_split(o["draws"], o["processes"]), _split(o["referrals"], o["processes"]))
+        ]
+        started = time.perf_counter()
+        if o["processes"] == 1:
+            samples = _run_process(jobs[0])
+        else:
+            connections.close_all()  # pas de connexion partagée à travers fork()
+            with multiprocessing.get_context("fork").Pool(o["processes"]) as pool:
+                samples = [s for chunk in pool.map(_run_process, jobs) for s in chunk]
+        elapsed = time.perf_counter() - started
+
+        report = {"company": company.slug, "database": connection.vendor, "elapsed_s": round(elapsed, 3),
+                  "threads": o["threads"], "processes": o["processes"],
+                  "block_size": max((w.block_size for w in wheels), default=0), "kinds": {}}
+        for kind in ("draw", "referral"):
+            rows = [s for s in samples if s[0] == kind]
+            if not rows:
+                continue
+            lat = sorted(s[1] * 1000 for s in rows)
+            lock = sorted(s[3] * 1000 for s in rows)
+            report["kinds"][kind] = {
+                "calls": len(rows),
+                "errors": sum(1 for s in rows if s[4]),
+                "throughput_per_s": round(len(rows) / elapsed, 1) if elapsed else 0,
+                "p50_ms": round(statistics.median(lat), 2),
+                "p99_ms": round(_percentile(lat, 0.99), 2),
+                "lock_wait_total_ms": round(sum(lock), 1),
+                "lock_wait_p99_ms": round(_percentile(lock, 0.99), 2),
+            }
+
+        draws = [s for s in samples if s[0] == "draw"]
+        if draws and not any(s[4] for s in draws) and exact_possible:
+            rows = ProbabilityWheel.objects.filter(
+                company=company, key__in=[BASE_KEY, VERY_RARE_KEY]).values_list("key", "idx", "spare")
+            after = {key: idx for key, idx, _ in rows}
+            spare = {key: [s for s in sp if s not in before_spare[key]] for key, _, sp in rows}
+            report["exactness"] = exactness_report(before, after, Counter(s[2] for s in draws), spare)
+        elif draws:
+            reason = "erreurs de tirage" if any(s[4] for s in draws) else "tous les buckets ne sont pas éligibles"
+            report["exactness"] = {"ok": None, "skipped": reason}
+
+        self._output(report, o["json"])
+        if report.get("exactness", {}).get("ok") is False:
+            raise CommandError("Roue inexacte : cases dupliquées ou sautées sous concurrence.")
+
+    def _output(self, report: dict, as_json: bool):
+        if as_json:
+            self.stdout.write(json.dumps(report, indent=2, ensure_ascii=False))
+            return
+        self.stdout.write(f"{report['company']} ({report['database']}) — {report['processes']} processus × "
+                          f"{report['threads']} threads, {report['elapsed_s']} s")
+        for kind, k in report["kinds"].items():
+            self.stdout.write(
+                f"  {kind:9} {k['calls']:6} appels  {k['throughput_per_s']:8}/s  p50 {k['p50_ms']} ms  "
+                f"p99 {k['p99_ms']} ms  verrou Σ {k['lock_wait_total_ms']} ms (p99 {k['lock_wait_p99_ms']} ms)  "
+                f"erreurs {k['errors']}"
+            )
+        ex = report.get("exactness")
+        if ex is None:
+            return
+        if ex.get("ok") is None:
+            self.stdout.write(self.style.WARNING(f"  exactitude : non vérifiée ({ex['skipped']})"))
+        elif ex["ok"]:
+            self.stdout.write(self.style.SUCCESS(f"  exactitude : OK {ex['got']}"))
+        else:
+            self.stdout.write(self.style.ERROR(
+                f"  exactitude : ÉCHEC {ex['checks']} attendu={ex['expected']} obtenu={ex['got']}"))
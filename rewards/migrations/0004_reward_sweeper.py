@@ -0,0 +1,33 @@
+# Generated by Django 4.2.25 on 2026-10-19 00:07
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rewards', '0003_rewardtemplate_expires_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RewardSweep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('expired', models.PositiveIntegerField(default=0)),
+                ('batches', models.PositiveIntegerField(default=0)),
+                ('per_company', models.JSONField(blank=True, default=dict)),
+                ('dry_run', models.BooleanField(default=False)),
+            ],
+            options={
+                'ordering': ('-started_at',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reward',
+            index=models.Index(condition=models.Q(('state', 'PENDING')), fields=['token_expires_at'], name='reward_pending_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.25 on 2026-10-19 00:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rewards', '0004_reward_sweeper'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reward',
+            index=models.Index(fields=['client', 'state', '-id'], name='reward_client_state_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reward',
+            index=models.Index(condition=models.Q(('state', 'PENDING')), fields=['client'], name='reward_pending_client_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reward',
+            index=models.Index(condition=models.Q(('state', 'PENDING')), fields=['company', 'created_at'], name='reward_pending_company_idx'),
+        ),
+    ]
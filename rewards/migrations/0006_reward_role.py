@@ -0,0 +1,35 @@
+# Generated by Django 4.2.25 on 2026-10-19 00:11
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_roles(apps, schema_editor):
+    """Rôle des récompenses existantes, déduit du parrainage lié (deux UPDATE ensemblistes)."""
+    Reward = apps.get_model("rewards", "Reward")
+    Referral = apps.get_model("dashboard", "Referral")
+    for role, field in (("referrer", "referrer_id"), ("referee", "referee_id")):
+        Reward.objects.filter(referral__isnull=False).filter(
+            client_id=Subquery(Referral.objects.filter(pk=OuterRef("referral_id")).values(field)[:1])
+        ).update(role=role)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rewards', '0005_reward_query_indexes'),
+        ('dashboard', '0013_referral_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reward',
+            name='role',
+            field=models.CharField(choices=[('referrer', 'Parrain'), ('referee', 'Filleul'), ('manual', 'Manuelle')], default='manual', max_length=8),
+        ),
+        migrations.RunPython(backfill_roles, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='reward',
+            index=models.Index(condition=models.Q(('role', 'referrer')), fields=['company', 'state'], name='reward_referrer_state_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.25 on 2026-10-19 00:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_alter_user_profile'),
+        ('rewards', '0006_reward_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DrawEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('draw_no', models.PositiveBigIntegerField()),
+                ('mask', models.PositiveSmallIntegerField()),
+                ('outcome', models.PositiveSmallIntegerField(choices=[(0, 'NO_HIT'), (1, 'SOUVENT'), (2, 'MOYEN'), (3, 'RARE'), (4, 'TRES_RARE')])),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='draw_events', to='accounts.company')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company', 'draw_no'], name='drawevent_company_no_idx')],
+            },
+        ),
+    ]
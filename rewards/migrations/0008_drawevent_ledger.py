@@ -0,0 +1,106 @@
+# Generated by Django 4.2.25 on 2026-10-19 00:35
+
+from datetime import date
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+TABLE = "rewards_drawevent"
+MONTHS_AHEAD = 3
+
+
+def _month(d, shift=0):
+    y, m = divmod(d.year * 12 + d.month - 1 + shift, 12)
+    return date(y, m + 1, 1)
+
+
+def partition_by_month(apps, schema_editor):
+    """
+    Postgres : recrée la table en RANGE (created_at) par mois, clé primaire (id, created_at),
+    avec une partition DEFAULT. Les mois suivants sont créés par `manage.py drawevent_partitions`.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cur:
+        cur.execute(f"SELECT MIN(created_at) FROM {TABLE}")
+        oldest = cur.fetchone()[0]
+
+    run = schema_editor.execute
+    cols = "id, company_id, client_id, wheel, slot, draw_no, mask, outcome, created_at"
+    run(f"CREATE TEMP TABLE drawevent_flat ON COMMIT DROP AS SELECT {cols} FROM {TABLE}")
+    run(f"DROP TABLE {TABLE}")
+    run(f"""
+        CREATE TABLE {TABLE} (
+            id bigint GENERATED BY DEFAULT AS IDENTITY,
+            company_id bigint NOT NULL REFERENCES accounts_company (id) DEFERRABLE INITIALLY DEFERRED,
+            client_id bigint NULL,
+            wheel smallint NOT NULL CHECK (wheel >= 0),
+            slot integer NULL CHECK (slot >= 0),
+            draw_no bigint NULL CHECK (draw_no >= 0),
+            mask smallint NOT NULL CHECK (mask >= 0),
+            outcome smallint NOT NULL CHECK (outcome >= 0),
+            created_at timestamp with time zone NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    run(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+
+    now = timezone.now().date()
+    month = _month(min(oldest.date(), now) if oldest else now)
+    last = _month(now, MONTHS_AHEAD)
+    while month <= last:
+        nxt = _month(month, 1)
+        run(
+            f"CREATE TABLE {TABLE}_y{month.year}m{month.month:02d} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{nxt.isoformat()}')"
+        )
+        month = nxt
+
+    run(f"INSERT INTO {TABLE} ({cols}) SELECT {cols} FROM drawevent_flat")
+    run(f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), COALESCE((SELECT MAX(id) FROM {TABLE}), 0) + 1, false)")
+    run("DROP TABLE drawevent_flat")
+    run(f"CREATE INDEX drawevent_company_no_idx ON {TABLE} (company_id, draw_no)")
+    run(f"CREATE INDEX drawevent_company_at_idx ON {TABLE} (company_id, created_at)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0013_referral_query_indexes'),
+        ('accounts', '0005_alter_user_profile'),
+        ('rewards', '0007_drawevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='drawevent',
+            name='client',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='draw_events', to='dashboard.client'),
+        ),
+        migrations.AddField(
+            model_name='drawevent',
+            name='slot',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='drawevent',
+            name='wheel',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'normalized'), (1, 'base_100'), (2, 'very_rare_10000')], default=0),
+        ),
+        migrations.AlterField(
+            model_name='drawevent',
+            name='company',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='draw_events', to='accounts.company'),
+        ),
+        migrations.AlterField(
+            model_name='drawevent',
+            name='draw_no',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='drawevent',
+            index=models.Index(fields=['company', 'created_at'], name='drawevent_company_at_idx'),
+        ),
+        migrations.RunPython(partition_by_month, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.25 on 2026-10-19 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rewards', '0008_drawevent_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='probabilitywheel',
+            name='block_size',
+            field=models.PositiveIntegerField(default=0, help_text="Cases réservées d'un coup par processus (0 = tirage direct)."),
+        ),
+        migrations.AddField(
+            model_name='probabilitywheel',
+            name='spare',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
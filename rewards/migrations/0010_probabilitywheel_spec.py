@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-19 00:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rewards', '0009_wheel_block_reservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='probabilitywheel',
+            name='spec',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-19 00:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rewards', '0010_probabilitywheel_spec'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='probabilitywheel',
+            name='spec_hash',
+            field=models.CharField(blank=True, default='', max_length=16),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-19 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rewards', '0011_probabilitywheel_spec_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='probabilitywheel',
+            name='generation',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
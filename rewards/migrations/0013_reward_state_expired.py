@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-19 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rewards', '0012_probabilitywheel_generation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reward',
+            name='state',
+            field=models.CharField(choices=[('PENDING', 'En attente'), ('SENT', 'Distrubué'), ('EXPIRED', 'Expirée')], default='PENDING', max_length=20),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 4.2.25 on 2026-10-19 02:04
+
+from django.db import migrations, models
+from django.db.models import Max
+import django.db.models.deletion
+
+TABLE = "rewards_drawevent"
+
+
+def _partitions(schema_editor):
+    with schema_editor.connection.cursor() as cur:
+        cur.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass", [TABLE],
+        )
+        return [row[0] for row in cur.fetchall()]
+
+
+class AddPartitionedUniqueConstraint(migrations.AddConstraint):
+    """
+    AddConstraint, sauf sur Postgres : une contrainte unique de la table partitionnée
+    devrait inclure created_at ; on pose donc un index unique sur chaque partition
+    (les suivantes le reçoivent de rewards.services.ledger.ensure_month_partitions).
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        for name in _partitions(schema_editor):
+            schema_editor.execute(f"CREATE UNIQUE INDEX {name}_company_no_uniq ON {name} (company_id, draw_no)")
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        for name in _partitions(schema_editor):
+            schema_editor.execute(f"DROP INDEX IF EXISTS {name}_company_no_uniq")
+
+
+def seed_counters(apps, schema_editor):
+    """Compteurs repris du plus grand n° journalisé de chaque entreprise."""
+    DrawEvent = apps.get_model("rewards", "DrawEvent")
+    DrawCounter = apps.get_model("rewards", "DrawCounter")
+    rows = (
+        DrawEvent.objects.filter(draw_no__isnull=False)
+        .order_by().values("company_id").annotate(n=Max("draw_no"))
+    )
+    DrawCounter.objects.bulk_create(
+        [DrawCounter(company_id=r["company_id"], last_no=r["n"]) for r in rows], batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_alter_user_profile'),
+        ('rewards', '0013_reward_state_expired'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DrawCounter',
+            fields=[
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='draw_counter', serialize=False, to='accounts.company')),
+                ('last_no', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='drawevent',
+            name='drawevent_company_no_idx',
+        ),
+        AddPartitionedUniqueConstraint(
+            model_name='drawevent',
+            constraint=models.UniqueConstraint(fields=('company', 'draw_no'), name='drawevent_company_no_uniq'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.25 on 2026-10-19 02:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rewards', '0014_drawcounter_unique_draw_no'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='reward',
+            name='reward_pending_expiry_idx',
+        ),
+        migrations.AddIndex(
+            model_name='reward',
+            index=models.Index(condition=models.Q(('state', 'PENDING')), fields=['token_expires_at', 'id'], name='reward_pending_expiry_idx'),
+        ),
+    ]
@@ -1,6 +1,5 @@
 # rewards/models.py
 from datetime import timedelta
-import secrets
 
 from django.db import models
 from django.utils import timezone
@@ -8,6 +7,7 @@ from django.urls import reverse
 
 from accounts.models import Company
 from dashboard.models import Client, Referral
+from rewards.tokens import make_signed_token, random_token, signed_tokens_enabled
 
 
 class ProbabilityWheel(models.Model):
@@ -17,6 +17,17 @@ class ProbabilityWheel(models.Model):
     - pool  : liste ordonnée des résultats (ex: ['SOUVENT','SOUVENT',...,'NO_HIT'])
     - idx   : curseur de consommation
     - size  : longueur totale du pool (copie pour debug)
+    - block_size : 0 = tirage direct (verrou de ligne par tirage) ; k > 0 = chaque
+                   processus réserve k cases d'un coup (cf. rewards.services.wheel_blocks)
+    - spare : cases réservées non servies, rendues à l'arrêt d'un processus,
+              servies en priorité par les réservations suivantes
+    - spec  : cotes propres à l'entreprise, ex. {"SOUVENT": 980, "MOYEN": 19, "RARE": 1} ;
+              vide = cotes par défaut de la clé. Fait foi : le pool en est la
+              compilation (cf. rewards.services.probabilities.set_wheel_spec)
+    - generation : incrémentée à chaque régénération / remise à zéro (pool ou
+                   curseur réécrits) : invalide les blocs réservés par les processus
+    - spec_hash : empreinte (spec + algorithme) des roues entrelacées de
+                  rewards.probabilities, dont le pool n'est pas matérialisé
     """
     company = models.ForeignKey(
         Company, on_delete=models.CASCADE, related_name="probability_wheels"
@@ -25,6 +36,13 @@ class ProbabilityWheel(models.Model):
     pool = models.JSONField(default=list)
     idx = models.PositiveIntegerField(default=0)
     size = models.PositiveIntegerField(default=0)
+    block_size = models.PositiveIntegerField(
+        default=0, help_text="Cases réservées d'un coup par processus (0 = tirage direct)."
+    )
+    spare = models.JSONField(default=list, blank=True)
+    spec = models.JSONField(default=dict, blank=True)
+    spec_hash = models.CharField(max_length=16, blank=True, default="")
+    generation = models.PositiveIntegerField(default=0)
 
     class Meta:
         unique_together = (("company", "key"),)
@@ -85,9 +103,22 @@ class Reward(models.Model):
         ("RARE", "Rare"),
         ("TRES_RARE", "Très rare"),
     )
+    # État posé par le balayeur (cf. rewards.services.sweeper) sur les PENDING dont le lien a expiré
+    STATE_EXPIRED = "EXPIRED"
     STATE_CHOICES = (
         ("PENDING", "En attente"),
         ("SENT", "Distrubué"),
+        (STATE_EXPIRED, "Expirée"),
+    )
+
+    # Rôle du bénéficiaire (dénormalisé : évite la jointure client_id = referral.referrer_id)
+    ROLE_REFERRER = "referrer"
+    ROLE_REFEREE = "referee"
+    ROLE_MANUAL = "manual"
+    ROLE_CHOICES = (
+        (ROLE_REFERRER, "Parrain"),
+        (ROLE_REFEREE, "Filleul"),
+        (ROLE_MANUAL, "Manuelle"),
     )
 
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="rewards")
@@ -110,8 +141,37 @@ class Reward(models.Model):
     redeemed_at = models.DateTimeField(null=True, blank=True)
     redeemed_channel = models.CharField(max_length=20, blank=True)
 
+    role = models.CharField(max_length=8, choices=ROLE_CHOICES, default=ROLE_MANUAL)
+
     class Meta:
-        indexes = [models.Index(fields=["company", "client", "state"])]
+        indexes = [
+            models.Index(fields=["company", "client", "state"]),
+            # Fiche client : récompenses d'un client par état, plus récentes d'abord
+            models.Index(fields=["client", "state", "-id"], name="reward_client_state_id_idx"),
+            # Compteur « en attente » par client (liste des parrains) et par entreprise
+            models.Index(
+                fields=["client"],
+                name="reward_pending_client_idx",
+                condition=models.Q(state="PENDING"),
+            ),
+            models.Index(
+                fields=["company", "created_at"],
+                name="reward_pending_company_idx",
+                condition=models.Q(state="PENDING"),
+            ),
+            # KPI : récompenses PARRAIN uniquement, par état
+            models.Index(
+                fields=["company", "state"],
+                name="reward_referrer_state_idx",
+                condition=models.Q(role="referrer"),
+            ),
+            # Balayage des liens expirés (keyset expiration, id) : ne parcourt que les récompenses en attente
+            models.Index(
+                fields=["token_expires_at", "id"],
+                name="reward_pending_expiry_idx",
+                condition=models.Q(state="PENDING"),
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=["company", "client", "referral"],
@@ -122,11 +182,43 @@ class Reward(models.Model):
     # ----------------- Helpers d’affichage -----------------
 
     def ensure_token(self, force: bool = False):
-        if force or not self.token:
-            self.token = secrets.token_urlsafe(24)
+        """
+        Garantit un jeton de lien public et sa date d'expiration.
+        Jetons signés (REWARD_SIGNED_TOKENS) : ils embarquent l'id, donc une récompense
+        pas encore insérée n'en reçoit un qu'au post_save (cf. rewards.signals).
+        """
         if not self.token_expires_at:
             days = int(self.cooldown_days or 180)
             self.token_expires_at = timezone.now() + timedelta(days=days)
+        if force or not self.token:
+            if signed_tokens_enabled():
+                if self.pk is None:
+                    return
+                token = make_signed_token(self.pk, self.company_id, self.token_expires_at)
+            else:
+                token = random_token()
+            # ancien lien à oublier du cache des pages publiques (cf. services.claims)
+            self._previous_token = self.token
+            self.token = token
+
+    def ensure_role(self):
+        """
+        Déduit le rôle (parrain/filleul) du parrainage lié si le créateur ne l'a pas fourni.
+        Fixé une fois pour toutes à la création : les saves suivants ne relisent pas Referral.
+        """
+        if not self._state.adding or self.role != self.ROLE_MANUAL or not self.referral_id:
+            return
+        if Reward.referral.is_cached(self):
+            referrer_id, referee_id = self.referral.referrer_id, self.referral.referee_id
+        else:
+            referrer_id, referee_id = (
+                Referral.objects.filter(pk=self.referral_id)
+                .values_list("referrer_id", "referee_id").first() or (None, None)
+            )
+        if self.client_id == referrer_id:
+            self.role = self.ROLE_REFERRER
+        elif self.client_id == referee_id:
+            self.role = self.ROLE_REFEREE
 
     @property
     def valid_until(self):
@@ -169,3 +261,92 @@ class Reward(models.Model):
 
     def __str__(self):
         return f"{self.label} ({self.get_bucket_display()})"
+
+
+class RewardSweep(models.Model):
+    """Journal des passages du balayeur de récompenses expirées (cf. rewards.services.sweeper)."""
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expired = models.PositiveIntegerField(default=0)
+    batches = models.PositiveIntegerField(default=0)
+    per_company = models.JSONField(default=dict, blank=True)  # {company_id: nb expirées}
+    dry_run = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ("-started_at",)
+
+    def __str__(self):
+        return f"Balayage {self.started_at:%Y-%m-%d %H:%M} • {self.expired} expirée(s)"
+
+
+class DrawEvent(models.Model):
+    """
+    Journal append-only des tirages (cf. rewards.services.ledger).
+
+    Une ligne compacte par tirage, en petits entiers :
+    - wheel   : mode de tirage (normalisé, roue base, roue très rare) ;
+    - slot    : case consommée sur une roue exacte ;
+    - draw_no : n° dans le flux déterministe de l'entreprise (tirage normalisé,
+                rejouable via rewards.services.rng) ;
+    - mask    : éligibilité (bits SOUVENT=1, MOYEN=2, RARE=4, TRES_RARE=8) ;
+    - outcome : résultat.
+    Partitionné par mois (created_at) sur Postgres, cf. migration 0008.
+    """
+    OUTCOME_NO_HIT = 0
+    OUTCOME_CHOICES = (
+        (0, "NO_HIT"),
+        (1, "SOUVENT"),
+        (2, "MOYEN"),
+        (3, "RARE"),
+        (4, "TRES_RARE"),
+    )
+    WHEEL_NORMALIZED = 0
+    WHEEL_BASE = 1
+    WHEEL_VERY_RARE = 2
+    WHEEL_CHOICES = (
+        (WHEEL_NORMALIZED, "normalized"),
+        (WHEEL_BASE, "base_100"),
+        (WHEEL_VERY_RARE, "very_rare_10000"),
+    )
+
+    # Index composites ci-dessous : pas d'index simple sur les clés étrangères (écriture plus légère).
+    # Journal append-only : la suppression d'un client ne réécrit pas ses tirages (id conservé).
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="draw_events", db_index=False)
+    client = models.ForeignKey(
+        Client, on_delete=models.DO_NOTHING, related_name="draw_events", null=True, blank=True,
+        db_index=False, db_constraint=False,
+    )
+    wheel = models.PositiveSmallIntegerField(choices=WHEEL_CHOICES, default=WHEEL_NORMALIZED)
+    slot = models.PositiveIntegerField(null=True, blank=True)
+    draw_no = models.PositiveBigIntegerField(null=True, blank=True)
+    mask = models.PositiveSmallIntegerField()
+    outcome = models.PositiveSmallIntegerField(choices=OUTCOME_CHOICES)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Rejeu / audit d'un flux
+            # Statistiques et agrégats mensuels (élagage des partitions par created_at)
+            models.Index(fields=["company", "created_at"], name="drawevent_company_at_idx"),
+        ]
+        constraints = [
+            # Rejeu / audit d'un flux ; deux tirages au même n° échouent au commit.
+            # Postgres (table partitionnée) : index unique par partition, cf. migration 0014.
+            models.UniqueConstraint(fields=["company", "draw_no"], name="drawevent_company_no_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.company_id} • {self.get_wheel_display()} • {self.get_outcome_display()}"
+
+
+class DrawCounter(models.Model):
+    """
+    Dernier n° de tirage normalisé servi par entreprise (cf. rewards.services.rng).
+    Incrémenté par UPDATE … RETURNING dans la transaction du tirage : partagé par
+    tous les processus, et rendu au rollback (pas de trou pour un tirage annulé).
+    """
+    company = models.OneToOneField(Company, on_delete=models.CASCADE, primary_key=True, related_name="draw_counter")
+    last_no = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.company_id} • n° {self.last_no}"
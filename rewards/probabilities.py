@@ -1,10 +1,18 @@
 from __future__ import annotations
+import hashlib
+import json
+import time
+from collections import Counter
 from dataclasses import dataclass
-from typing import Iterable, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Tuple
 from django.db import transaction
 from django.utils.text import slugify
 from rewards.models import ProbabilityWheel
 from accounts.models import Company
+from core import metrics
+
+# Version de l'entrelacement : la changer force la régénération des roues (cf. spec_hash)
+INTERLEAVE_VERSION = 2
 
 # --------- Utilitaires de pool ----------
 def build_pool(pairs: Iterable[Tuple[int, str]]) -> List[str]:
@@ -15,19 +23,72 @@ def build_pool(pairs: Iterable[Tuple[int, str]]) -> List[str]:
         pool.extend([val] * n)
     return pool
 
+def _counts(pairs: Iterable[Tuple[int, str]]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for n, val in pairs:
+        if n < 0:
+            raise ValueError("n négatif")
+        counts[val] = counts.get(val, 0) + n
+    return counts
+
+def _stride_order(counts: Dict[str, int]) -> Tuple[Tuple[str, int], ...]:
+    # Les plus fréquents d'abord ; ordre indépendant de celui du dict (jsonb réordonne les clés)
+    return tuple(sorted(((v, n) for v, n in counts.items() if n > 0), key=lambda vn: (-vn[1], vn[0])))
+
+# Entrelacement par pas (stride scheduling) : la j-ième copie d'une valeur à c cases
+# sur n a pour position idéale (j + 1/2)·n/c ; la roue est l'ordre de ces positions
+# (égalité : valeur la plus fréquente d'abord). Chaque valeur est ainsi répartie
+# uniformément sur le cycle, et la case i se calcule sans construire le pool.
+def _rank(order: Tuple[Tuple[str, int], ...], v: int, j: int) -> int:
+    """Case occupée par la j-ième copie de order[v] (comparaisons entières, sans flottants)."""
+    cv = order[v][1]
+    rank = 0
+    for w, (_val, cw) in enumerate(order):
+        if w == v:
+            rank += j
+            continue
+        # copies m de w placées avant : (2m+1)·cv < (2j+1)·cw (<= si w est prioritaire)
+        a = (2 * j + 1) * cw
+        top = a // cv if w < v else -(-a // cv) - 1
+        rank += min(cw, (top + 1) // 2)
+    return rank
+
+def value_at(counts: Dict[str, int], i: int) -> str:
+    """Valeur de la case i de la roue entrelacée, en O(k² log n) pour k valeurs distinctes."""
+    order = _stride_order(counts)
+    if not 0 <= i < sum(n for _v, n in order):
+        raise IndexError(i)
+    for v, (val, c) in enumerate(order):
+        lo, hi = 0, c - 1
+        while lo <= hi:  # _rank est strictement croissant en j
+            mid = (lo + hi) // 2
+            r = _rank(order, v, mid)
+            if r == i:
+                return val
+            if r < i:
+                lo = mid + 1
+            else:
+                hi = mid - 1
+    raise AssertionError("entrelacement incohérent")  # les rangs forment une permutation
+
+def iter_interleaved(counts: Dict[str, int]) -> Iterator[str]:
+    """Roue entrelacée complète, dans l'ordre (mêmes cases que value_at), en O(n·k)."""
+    order = _stride_order(counts)
+    nxt = [0] * len(order)
+    for _ in range(sum(n for _v, n in order)):
+        best = -1
+        for w, (_val, cw) in enumerate(order):
+            if nxt[w] < cw and (best < 0 or (2 * nxt[w] + 1) * order[best][1] < (2 * nxt[best] + 1) * cw):
+                best = w
+        nxt[best] += 1
+        yield order[best][0]
+
 def interleave(pool: List[str]) -> List[str]:
-    from collections import defaultdict, deque
-    buckets = defaultdict(deque)
-    for v in pool:
-        buckets[v].append(v)
+    return list(iter_interleaved(Counter(pool)))
 
-    keys = sorted(buckets.keys(), key=lambda k: -len(buckets[k]))
-    out: List[str] = []
-    while any(buckets[k] for k in keys):
-        for k in keys:
-            if buckets[k]:
-                out.append(buckets[k].popleft())
-    return out
+def spec_hash(counts: Dict[str, int]) -> str:
+    payload = json.dumps([INTERLEAVE_VERSION, _stride_order(counts)], separators=(",", ":"))
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
 
 # --------- API principale ----------
 @dataclass
@@ -36,37 +97,59 @@ class WheelSpec:
     pairs: Tuple[Tuple[int, str], ...]
 
 def ensure_wheel(company: Company, spec: WheelSpec) -> ProbabilityWheel:
+    """
+    Crée ou met à niveau la roue. Le pool n'est pas matérialisé : seuls la spec
+    et son empreinte sont stockés, et la comparaison se fait sur l'empreinte.
+
+    Les clés des roues exactes (rewards.services.probabilities.PRESET_SPECS)
+    sont refusées : leur pool est compilé depuis leurs propres cotes, une spec
+    entrelacée écrite dessus les rendrait intirables.
+    """
+    from rewards.services.probabilities import PRESET_SPECS  # import circulaire au chargement
+
     key = slugify(spec.key)
-    raw = build_pool(spec.pairs)
-    pool = interleave(raw) if len(set(raw)) > 1 else raw
+    if key in PRESET_SPECS:
+        raise ValueError(f"Clé « {key} » réservée aux roues exactes : choisir une autre clé.")
+    counts = {v: n for v, n in _counts(spec.pairs).items() if n > 0}
+    digest = spec_hash(counts)
+    size = sum(counts.values())
     with transaction.atomic():
-        obj, _created = ProbabilityWheel.objects.select_for_update().get_or_create(
-            company=company, key=key, defaults={"pool": pool, "size": len(pool), "idx": 0}
+        start = time.perf_counter()
+        obj, _created = ProbabilityWheel.objects.select_for_update().defer("pool").get_or_create(
+            company=company, key=key,
+            defaults={"pool": [], "size": size, "idx": 0, "spec": counts, "spec_hash": digest},
         )
-        if obj.size != len(pool) or obj.pool != pool:
-            obj.pool = pool
-            obj.size = len(pool)
-            obj.idx = obj.idx % (len(pool) or 1)
-            obj.save(update_fields=["pool", "size", "idx"])
+        metrics.observe_on_commit("wheel_lock_wait_seconds", time.perf_counter() - start, key=key)
+        if obj.spec_hash != digest:
+            obj.pool = []
+            obj.spec = counts
+            obj.spec_hash = digest
+            obj.size = size
+            obj.idx = obj.idx % (size or 1)
+            obj.save(update_fields=["pool", "spec", "spec_hash", "size", "idx"])
     return obj
 
 def draw(company: Company, key: str) -> str:
     k = slugify(key)
     with transaction.atomic():
-        wheel = ProbabilityWheel.objects.select_for_update().get(company=company, key=k)
+        start = time.perf_counter()
+        wheel = ProbabilityWheel.objects.select_for_update().defer("pool").get(company=company, key=k)
+        metrics.observe_on_commit("wheel_lock_wait_seconds", time.perf_counter() - start, key=k)
         if wheel.size == 0:
             raise ValueError("Roue vide")
-        value = wheel.pool[wheel.idx]
+        # Roue entrelacée : case calculée ; ancienne roue (sans empreinte) : pool stocké
+        value = value_at(wheel.spec, wheel.idx) if wheel.spec_hash else wheel.pool[wheel.idx]
         wheel.idx = (wheel.idx + 1) % wheel.size
         wheel.save(update_fields=["idx"])
         return value
 
 # --------- Specs prêtes à l’emploi ----------
+# Clés distinctes de celles des roues exactes (base_100 / very_rare_10000)
 BASE_100 = WheelSpec(
-    key="base_100",
+    key="interleaved_base_100",
     pairs=((80, "Souvent"), (19, "Moyen"), (1, "Rare")),
 )
 VERY_RARE_10000 = WheelSpec(
-    key="very_rare_10000",
+    key="interleaved_very_rare_10000",
     pairs=((9999, "NO_HIT"), (1, "Très rare")),
 )
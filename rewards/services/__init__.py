@@ -42,6 +42,7 @@ def award_both_parties(*, referral):
         label=tpl_referee.label or "Cadeau",
         state="SENT",
         referral=referral,
+        role=Reward.ROLE_REFEREE,
     )
 
     update_fields = []
@@ -87,6 +88,7 @@ def award_both_parties(*, referral):
                 label=tpl_referrer.label or "Cadeau",
                 state="PENDING",
                 referral=referral,
+                role=Reward.ROLE_REFERRER,
             )
 
     return reward_parrain, reward_filleul
@@ -28,7 +28,7 @@ def award_both_parties(*, referral: Referral) -> Tuple[Reward, Reward]:
     label_referee = (tpl_referee.label if tpl_referee and tpl_referee.label else "Cadeau")
     reward_filleul, _ = Reward.objects.get_or_create(
         company=company, client=referee, referral=referral,
-        defaults={"label": label_referee, "bucket": SOUVENT, "state": "PENDING"},
+        defaults={"label": label_referee, "bucket": SOUVENT, "state": "PENDING", "role": Reward.ROLE_REFEREE},
     )
 
     # --- PARRAIN : respect des minimums via tirer_recompense ---
@@ -37,7 +37,7 @@ def award_both_parties(*, referral: Referral) -> Tuple[Reward, Reward]:
         # On garde une trace neutre (DISABLED) pour ne pas polluer KPI/historiques
         reward_parrain, _ = Reward.objects.get_or_create(
             company=company, client=referrer, referral=referral,
-            defaults={"label": "—", "bucket": NO_HIT, "state": "DISABLED"},
+            defaults={"label": "—", "bucket": NO_HIT, "state": "DISABLED", "role": Reward.ROLE_REFERRER},
         )
         if reward_parrain.state != "DISABLED":
             reward_parrain.label = "—"
@@ -51,7 +51,7 @@ def award_both_parties(*, referral: Referral) -> Tuple[Reward, Reward]:
     label = (tpl.label if tpl and tpl.label else hit.title())
     reward_parrain, _ = Reward.objects.get_or_create(
         company=company, client=referrer, referral=referral,
-        defaults={"label": label, "bucket": hit, "state": "PENDING"},
+        defaults={"label": label, "bucket": hit, "state": "PENDING", "role": Reward.ROLE_REFERRER},
     )
     # Normalisation si existait autrement
     changed = False
@@ -0,0 +1,159 @@
+# rewards/services/claims.py
+"""
+Modèle de lecture de la page publique d'une récompense (rewards:use_reward).
+
+Les liens sont ouverts en rafale depuis les SMS : la projection complète
+(branding, libellé, noms, accroches, validité, options du modèle) est construite
+en UNE requête puis mise en cache par token. Une page déjà vue coûte 0 requête.
+
+Invalidation : post_save / post_delete de Reward (changement d'état, de token…),
+et forget_claims() pour les mises à jour en masse (queryset.update) qui
+n'émettent pas de signaux.
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.urls import reverse
+
+from rewards.models import Reward, RewardTemplate
+from rewards.tokens import SignedClaim, is_signed_token, looks_like_random_token, parse_signed_token
+
+# Sentinelle pour les tokens inconnus (évite de re-frapper la base sur un lien invalide)
+_MISSING = "__missing__"
+
+_FIELDS = (
+    "id", "company_id", "client_id", "state", "label", "bucket", "token",
+    "token_expires_at", "created_at", "cooldown_days",
+    "company__name", "client__first_name", "client__last_name",
+    "referral_id", "referral__referrer_id", "referral__referee_id",
+    "referral__referrer__first_name", "referral__referrer__last_name",
+    "referral__referee__first_name", "referral__referee__last_name",
+)
+
+
+def _claim_key(token: str) -> str:
+    return f"claim:{token}"
+
+
+def _first_name(first: Optional[str], last: Optional[str]) -> str:
+    return (first or last or "").strip()
+
+
+def _headlines(row: Dict[str, Any]) -> Dict[str, str]:
+    """Phrases d'accroche selon le rôle du client dans le parrainage."""
+    company_name = (row["company__name"] or "").strip()
+    client_name = _first_name(row["client__first_name"], row["client__last_name"])
+    referrer_name = _first_name(row["referral__referrer__first_name"], row["referral__referrer__last_name"])
+    referee_name = _first_name(row["referral__referee__first_name"], row["referral__referee__last_name"])
+
+    is_ref = bool(row["referral_id"])
+    is_referrer = is_ref and row["client_id"] == row["referral__referrer_id"]
+    is_referee = is_ref and row["client_id"] == row["referral__referee_id"]
+
+    if is_referrer:
+        headline = f"Félicitations {client_name} !" if client_name else "Félicitations !"
+        celebrate = f"Tu as fait découvrir {company_name} à {referee_name}".strip()
+        ribbon = f"Parrainage validé grâce à {referee_name}".strip()
+    elif is_referee:
+        headline = f"Bienvenue {client_name} !" if client_name else "Bienvenue !"
+        celebrate = f"Parrainage validé grâce à {referrer_name}".strip()
+        ribbon = "Ton cadeau"
+    else:
+        headline = f"Félicitations {client_name} !" if client_name else "Félicitations !"
+        celebrate = company_name
+        ribbon = "Ton cadeau"
+
+    return {
+        "company_name": company_name,
+        "headline": headline,
+        "celebrate": celebrate,
+        "subline": "Voici ton cadeau 🎁",
+        "ribbon": ribbon,
+    }
+
+
+def claim_queryset(token: str, signed: Optional[SignedClaim] = None):
+    """
+    Requête de la projection (par token, ou par clé primaire pour un jeton signé :
+    le token reste comparé, un lien régénéré est refusé).
+    """
+    template_items = RewardTemplate.objects.filter(
+        company_id=OuterRef("company_id"), bucket=OuterRef("bucket"),
+    ).values("only_on_some_items")[:1]
+
+    qs = Reward.objects.filter(token=token)
+    if signed is not None:
+        qs = Reward.objects.filter(pk=signed.reward_id, company_id=signed.company_id, token=token)
+
+    return qs.annotate(only_on_some_items=Subquery(template_items)).values(*_FIELDS, "only_on_some_items")
+
+
+def build_claim(token: str, signed: Optional[SignedClaim] = None) -> Optional[Dict[str, Any]]:
+    """Projection compacte de la récompense `token` (une seule requête), ou None."""
+    row = claim_queryset(token, signed).first()
+    if row is None:
+        return None
+
+    # Même règle que Reward.valid_until
+    valid_until = row["token_expires_at"]
+    if not valid_until and row["cooldown_days"] and row["created_at"]:
+        valid_until = row["created_at"] + timedelta(days=int(row["cooldown_days"]))
+
+    return {
+        "id": row["id"],
+        "company_id": row["company_id"],
+        "state": row["state"],
+        "label": row["label"],
+        "valid_until": valid_until,
+        "claim_path": reverse("rewards:use_reward", kwargs={"token": row["token"]}),
+        "only_on_some_items": bool(row["only_on_some_items"]),
+        **_headlines(row),
+    }
+
+
+def get_claim(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Projection en cache (0 requête si déjà vue, 1 sinon).
+    Jeton mal formé, signature invalide ou lien signé expiré : None sans base ni cache.
+    """
+    signed = None
+    if is_signed_token(token):
+        signed = parse_signed_token(token)
+        if signed is None:
+            return None
+    elif not looks_like_random_token(token):
+        return None
+
+    key = _claim_key(token)
+    cached = cache.get(key)
+    if cached == _MISSING:
+        return None
+    if cached is not None:
+        return cached
+
+    claim = build_claim(token, signed)
+    if claim is None:
+        cache.set(key, _MISSING, getattr(settings, "REWARD_CLAIM_MISSING_TTL", 60))
+    else:
+        cache.set(key, claim, getattr(settings, "REWARD_CLAIM_CACHE_TTL", 600))
+    return claim
+
+
+def forget_claims(tokens: Iterable[Optional[str]]) -> None:
+    """Invalide les projections (à appeler avant/après un queryset.update())."""
+    keys = [_claim_key(t) for t in tokens if t]
+    if keys:
+        cache.delete_many(keys)
+
+
+@receiver(post_save, sender=Reward)
+@receiver(post_delete, sender=Reward)
+def _forget_claim_on_reward_change(sender, instance: Reward, **kwargs):
+    forget_claims([instance.token, getattr(instance, "_previous_token", None)])
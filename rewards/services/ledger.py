@@ -0,0 +1,149 @@
+# rewards/services/ledger.py
+"""
+Journal des tirages (DrawEvent) : écriture groupée et partitions mensuelles.
+
+- record() met l'événement en tampon ; un seul bulk_create au commit de la
+  transaction englobante (aucun verrou, aucune requête dans le tirage).
+  Hors transaction, l'insertion est immédiate.
+- Sur Postgres, la table est partitionnée par mois sur created_at (UTC) avec
+  une partition DEFAULT de secours : ensure_month_partitions() crée les mois
+  à venir (commande `manage.py drawevent_partitions`, à planifier) et y
+  rapatrie les lignes tombées entre-temps dans DEFAULT.
+- outcome_counts() : agrégats par résultat sans parcourir Reward (qui mêle
+  récompenses manuelles et tirages).
+"""
+from __future__ import annotations
+
+import threading
+import weakref
+from datetime import date
+from typing import Dict, List, Optional
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from rewards.models import DrawEvent
+
+OUTCOME_CODES: Dict[str, int] = {label: code for code, label in DrawEvent.OUTCOME_CHOICES}
+OUTCOME_LABELS: Dict[int, str] = dict(DrawEvent.OUTCOME_CHOICES)
+
+PARENT_TABLE = DrawEvent._meta.db_table
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+
+_local = threading.local()
+
+
+# ------------------ Écriture groupée au commit ------------------
+class _DrawBuffer(list):
+    closed = False
+
+    def __call__(self):
+        self.closed = True
+        rows, self[:] = list(self), []
+        if rows:
+            DrawEvent.objects.bulk_create(rows)
+
+
+def _pending_buffer() -> _DrawBuffer:
+    """
+    Tampon du bloc atomique courant (un par savepoint), enregistré par on_commit.
+
+    Seul on_commit garde une référence forte au tampon : au rollback du bloc,
+    Django abandonne le callback et le tampon disparaît avec lui (la référence
+    faible meurt) ; après le commit, il est fermé. Dans les deux cas un nouveau
+    tampon est enregistré.
+    """
+    buffers = getattr(_local, "buffers", None)
+    if buffers is None:
+        buffers = _local.buffers = {}
+    key = tuple(connection.savepoint_ids)
+    ref = buffers.get(key)
+    buf = ref() if ref is not None else None
+    if buf is None or buf.closed:
+        buf = _DrawBuffer()
+        transaction.on_commit(buf)
+        for stale in [k for k, r in buffers.items() if r() is None]:
+            del buffers[stale]
+        buffers[key] = weakref.ref(buf)
+    return buf
+
+
+def record(company_id: int, *, outcome: str, mask: int, wheel: int = DrawEvent.WHEEL_NORMALIZED,
+           client_id: Optional[int] = None, slot: Optional[int] = None,
+           draw_no: Optional[int] = None) -> None:
+    event = DrawEvent(
+        company_id=company_id, client_id=client_id, wheel=wheel, slot=slot,
+        draw_no=draw_no, mask=mask, outcome=OUTCOME_CODES[outcome],
+    )
+    if not connection.in_atomic_block:
+        DrawEvent.objects.bulk_create([event])
+        return
+    _pending_buffer().append(event)
+
+
+# ------------------ Partitions mensuelles (Postgres) ------------------
+def _month_start(d: date, shift: int = 0) -> date:
+    y, m = divmod(d.year * 12 + d.month - 1 + shift, 12)
+    return date(y, m + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_y{month.year}m{month.month:02d}"
+
+
+def ensure_month_partitions(months_ahead: int = 3, *, start: Optional[date] = None) -> List[str]:
+    """
+    Crée les partitions manquantes de `start` (défaut : mois courant) à
+    +months_ahead mois. Renvoie les noms créés ; sans effet hors Postgres.
+    """
+    if connection.vendor != "postgresql":
+        return []
+    first = _month_start(start or timezone.now().date())  # USE_TZ : mois UTC
+    created = []
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass", [PARENT_TABLE],
+        )
+        existing = {row[0] for row in cur.fetchall()}
+        for shift in range(months_ahead + 1):
+            lo, hi = _month_start(first, shift), _month_start(first, shift + 1)
+            name = partition_name(lo)
+            if name in existing:
+                continue
+            # Lignes du mois déjà tombées dans DEFAULT : à sortir avant de créer la partition
+            cur.execute(f"CREATE TEMP TABLE _drawevent_moving (LIKE {PARENT_TABLE}) ON COMMIT DROP")
+            cur.execute(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                f"WHERE created_at >= %s AND created_at < %s RETURNING *) "
+                f"INSERT INTO _drawevent_moving SELECT * FROM moved",
+                [lo, hi],
+            )
+            cur.execute(
+                f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+                f"FOR VALUES FROM ('{lo.isoformat()}') TO ('{hi.isoformat()}')"
+            )
+            # Unicité (company, draw_no) : portée par partition (cf. migration 0014)
+            cur.execute(f"CREATE UNIQUE INDEX {name}_company_no_uniq ON {name} (company_id, draw_no)")
+            cur.execute(f"INSERT INTO {PARENT_TABLE} SELECT * FROM _drawevent_moving")
+            cur.execute("DROP TABLE _drawevent_moving")
+            created.append(name)
+    return created
+
+
+# ------------------ Lecture ------------------
+def outcome_counts(company_id: Optional[int] = None, *, since=None, until=None,
+                   wheel: Optional[int] = None) -> Dict[str, int]:
+    """Nombre de tirages par résultat (toutes entreprises si company_id est None)."""
+    qs = DrawEvent.objects.all()
+    if company_id is not None:
+        qs = qs.filter(company_id=company_id)
+    if since is not None:
+        qs = qs.filter(created_at__gte=since)
+    if until is not None:
+        qs = qs.filter(created_at__lt=until)
+    if wheel is not None:
+        qs = qs.filter(wheel=wheel)
+    counts = dict(qs.order_by().values_list("outcome").annotate(n=Count("id")))
+    return {label: counts.get(code, 0) for code, label in DrawEvent.OUTCOME_CHOICES}
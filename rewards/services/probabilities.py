@@ -1,7 +1,9 @@
 # rewards/services/probabilities.py
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass  # compat legacy (exposé plus bas)
+from functools import lru_cache
 from decimal import Decimal, getcontext
 from typing import Dict, List, Tuple, Set
 
@@ -9,9 +11,9 @@ from django.db import transaction
 from django.shortcuts import render  # inoffensif si non utilisé
 
 from accounts.models import Company
-from rewards.models import ProbabilityWheel, RewardTemplate
+from rewards.models import DrawEvent, ProbabilityWheel, RewardTemplate
 from dashboard.models import Referral
-import random
+from rewards.services import ledger, rng, wheel_blocks
 
 # ---------- Compatibilité historique avec rewards.probabilities ----------
 from rewards.probabilities import (  # type: ignore
@@ -19,9 +21,11 @@ from rewards.probabilities import (  # type: ignore
     ensure_wheel as _legacy_ensure_wheel,
     draw as _legacy_draw,
 )
-from django.db.models import Max
+from django.db.models import F, Max
 import logging
 
+from core import events, metrics
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,10 +41,13 @@ __all__ = [
     "BASE_COUNTS", "BASE_SIZE", "VR_COUNTS", "VR_SIZE",
     # API roues exactes
     "ensure_wheels", "rebuild_wheel", "reset_wheel",
+    # Cotes par entreprise
+    "PRESET_SPECS", "validate_spec", "spec_for", "compiled_pool", "set_wheel_spec", "wheel_specs",
     # Tirage métier + affichage
     "tirer_recompense",
     "get_normalized_percentages",
     "tirer_recompense_with_normalization",
+    "replay_normalized",
     # Compat
     "WheelSpec", "ensure_wheel", "draw",
 ]
@@ -65,19 +72,67 @@ VR_SIZE: int = sum(VR_COUNTS.values())  # 100_000
 getcontext().prec = 28
 
 
-# ------------------ Construction (pools) ------------------
-def _build_base_pool() -> List[str]:
+# ------------------ Spécifications (cotes) par entreprise ------------------
+# Cotes par défaut de chaque clé ; ProbabilityWheel.spec les remplace pour une entreprise.
+PRESET_SPECS: Dict[str, Dict[str, int]] = {BASE_KEY: BASE_COUNTS, VERY_RARE_KEY: VR_COUNTS}
+SPEC_TOKENS: Dict[str, Tuple[str, ...]] = {
+    BASE_KEY: (SOUVENT, MOYEN, RARE),
+    VERY_RARE_KEY: (NO_HIT, TRES_RARE),
+}
+# Ordre canonique des cases : ne dépend pas de l'ordre des clés JSON (jsonb les réordonne)
+TOKEN_ORDER: Tuple[str, ...] = (SOUVENT, MOYEN, RARE, NO_HIT, TRES_RARE)
+MAX_WHEEL_SIZE = 1_000_000
+
+
+def validate_spec(key: str, counts: Dict[str, int]) -> Dict[str, int]:
+    """Contrôle une spec {token: nombre de cases} ; renvoie sa forme canonique (ValueError sinon)."""
+    if not isinstance(counts, dict) or not counts:
+        raise ValueError("Spécification vide : {token: nombre de cases} attendu.")
+    allowed = SPEC_TOKENS.get(key, TOKEN_ORDER)
+    unknown = set(counts) - set(allowed)
+    if unknown:
+        raise ValueError(f"Résultat(s) non autorisé(s) pour {key}: {', '.join(sorted(unknown))}")
+    if any(not isinstance(n, int) or isinstance(n, bool) or n < 0 for n in counts.values()):
+        raise ValueError("Les nombres de cases doivent être des entiers positifs.")
+    total = sum(counts.values())
+    if not 0 < total <= MAX_WHEEL_SIZE:
+        raise ValueError(f"Taille de roue invalide ({total}) : 1 à {MAX_WHEEL_SIZE} cases.")
+    return {t: counts[t] for t in TOKEN_ORDER if counts.get(t)}
+
+
+def spec_for(wheel: ProbabilityWheel) -> Dict[str, int]:
+    """Spec effective d'une roue : la sienne (contrôlée), sinon celle par défaut de sa clé."""
+    if wheel.spec:
+        return validate_spec(wheel.key, wheel.spec)
+    counts = PRESET_SPECS.get(wheel.key)
+    if not counts:
+        raise ValueError(f"Clé de roue inconnue: {wheel.key}")
+    return counts
+
+
+@lru_cache(maxsize=128)
+def _compile(items: Tuple[Tuple[str, int], ...]) -> Tuple[str, ...]:
     pool: List[str] = []
-    for token, n in BASE_COUNTS.items():
+    for token, n in items:
         pool.extend([token] * n)
-    return pool
+    return tuple(pool)
+
+
+def compiled_pool(counts: Dict[str, int]) -> Tuple[str, ...]:
+    """Pool compilé (immuable, en cache par processus) d'une spec."""
+    unknown = set(counts) - set(TOKEN_ORDER)
+    if unknown:
+        raise ValueError(f"Résultat(s) inconnu(s) dans la spec : {', '.join(sorted(map(str, unknown)))}")
+    return _compile(tuple(sorted(counts.items(), key=lambda kv: TOKEN_ORDER.index(kv[0]))))
+
+
+# ------------------ Construction (pools) ------------------
+def _build_base_pool() -> List[str]:
+    return list(compiled_pool(BASE_COUNTS))
 
 
 def _build_very_rare_pool() -> List[str]:
-    pool: List[str] = []
-    for token, n in VR_COUNTS.items():
-        pool.extend([token] * n)
-    return pool
+    return list(compiled_pool(VR_COUNTS))
 
 
 # ------------------ Création / maintenance des roues ------------------
@@ -85,51 +140,103 @@ def _build_very_rare_pool() -> List[str]:
 def ensure_wheels(company: Company) -> Tuple[ProbabilityWheel, ProbabilityWheel]:
     """
     Crée (ou met à niveau) les deux roues exactes pour l’entreprise :
-      - base_100      (SOUVENT/MOYEN/RARE) 980/19/1
-      - very_rare_10000 (TRES_RARE vs NO_HIT) 1/100000
-    """
-    base, _ = ProbabilityWheel.objects.get_or_create(
-        company=company,
-        key=BASE_KEY,
-        defaults={"pool": _build_base_pool(), "size": BASE_SIZE, "idx": 0},
-    )
-    very_rare, _ = ProbabilityWheel.objects.get_or_create(
-        company=company,
-        key=VERY_RARE_KEY,
-        defaults={"pool": _build_very_rare_pool(), "size": VR_SIZE, "idx": 0},
-    )
-
-    if base.size != BASE_SIZE or len(base.pool) != BASE_SIZE:
-        base.pool, base.size, base.idx = _build_base_pool(), BASE_SIZE, 0
-        base.save(update_fields=["pool", "size", "idx"])
+      - base_100      (SOUVENT/MOYEN/RARE) 980/19/1 par défaut
+      - very_rare_10000 (TRES_RARE vs NO_HIT) 1/100000 par défaut
 
-    if very_rare.size != VR_SIZE or len(very_rare.pool) != VR_SIZE:
-        very_rare.pool, very_rare.size, very_rare.idx = _build_very_rare_pool(), VR_SIZE, 0
-        very_rare.save(update_fields=["pool", "size", "idx"])
+    Le pool n'est pas relu en base : il est recompilé depuis la spec (en cache).
+    """
+    found = {
+        w.key: w
+        for w in ProbabilityWheel.objects.filter(company=company, key__in=[BASE_KEY, VERY_RARE_KEY]).defer("pool")
+    }
+    out = []
+    for key in (BASE_KEY, VERY_RARE_KEY):
+        wheel = found.get(key)
+        if wheel is None:
+            pool = compiled_pool(PRESET_SPECS[key])
+            wheel, _ = ProbabilityWheel.objects.get_or_create(
+                company=company, key=key, defaults={"pool": list(pool), "size": len(pool), "idx": 0},
+            )
+        pool = compiled_pool(spec_for(wheel))
+        if wheel.size != len(pool):
+            wheel.pool, wheel.size, wheel.idx, wheel.spare = list(pool), len(pool), 0, []
+            wheel.generation += 1
+            wheel.save(update_fields=["pool", "size", "idx", "spare", "generation"])
+        wheel.pool = pool
+        out.append(wheel)
+    return out[0], out[1]
+
+
+def rebuild_wheel(company: Company, key: str, spec: Dict[str, int] | None = None) -> None:
+    """
+    Régénère la roue (curseur à 0) depuis `spec` si fournie (et l'enregistre),
+    sinon depuis sa spec enregistrée, sinon depuis les cotes par défaut de la clé.
+    """
+    wheel = ProbabilityWheel.objects.filter(company=company, key=key).only("spec").first()
+    stored = validate_spec(key, spec) if spec is not None else (wheel.spec if wheel else {})
+    counts = stored or PRESET_SPECS.get(key)
+    if not counts:
+        raise ValueError(f"Clé de roue inconnue: {key}")
 
-    return base, very_rare
+    pool = compiled_pool(counts)
+    fields = {"pool": list(pool), "size": len(pool), "idx": 0, "spare": [], "spec": stored}
+    # generation + 1 : les blocs réservés sur l'ancien cycle ne sont plus servis
+    if not ProbabilityWheel.objects.filter(company=company, key=key).update(generation=F("generation") + 1, **fields):
+        ProbabilityWheel.objects.create(company=company, key=key, **fields)
 
 
-def rebuild_wheel(company: Company, key: str) -> None:
-    if key == BASE_KEY:
-        pool, size = _build_base_pool(), BASE_SIZE
-    elif key == VERY_RARE_KEY:
-        pool, size = _build_very_rare_pool(), VR_SIZE
-    else:
+@transaction.atomic
+def set_wheel_spec(company: Company, key: str, counts: Dict[str, int] | None) -> ProbabilityWheel:
+    """
+    Change les cotes d'une roue (None / {} : retour aux cotes par défaut) en gardant
+    la position dans le cycle : même curseur si la taille est inchangée, sinon
+    curseur ramené à la même proportion du cycle (cases rendues `spare` abandonnées).
+    """
+    stored = validate_spec(key, counts) if counts else {}
+    effective = stored or PRESET_SPECS.get(key)
+    if not effective:
         raise ValueError(f"Clé de roue inconnue: {key}")
+    pool = compiled_pool(effective)
 
-    ProbabilityWheel.objects.update_or_create(
-        company=company, key=key, defaults={"pool": pool, "size": size, "idx": 0}
+    wheel = (
+        ProbabilityWheel.objects.select_for_update().defer("pool")
+        .filter(company=company, key=key).first()
     )
+    if wheel is None:
+        return ProbabilityWheel.objects.create(
+            company=company, key=key, pool=list(pool), size=len(pool), idx=0, spec=stored,
+        )
+
+    if wheel.size != len(pool):
+        wheel.idx = wheel.idx * len(pool) // wheel.size if wheel.size else 0
+        wheel.spare = []
+    wheel.pool, wheel.size, wheel.spec = list(pool), len(pool), stored
+    wheel.generation += 1  # ligne verrouillée
+    wheel.save(update_fields=["pool", "size", "idx", "spare", "spec", "generation"])
+    return wheel
+
+
+def wheel_specs(company: Company) -> Dict[str, Dict[str, int]]:
+    """Spec effective de chaque roue de l'entreprise (sans charger les pools)."""
+    specs = {key: dict(counts) for key, counts in PRESET_SPECS.items()}
+    for key, spec in ProbabilityWheel.objects.filter(company=company).values_list("key", "spec"):
+        if spec or key in specs:
+            specs[key] = spec or specs[key]
+    return specs
 
 
 def reset_wheel(company: Company, key: str) -> None:
-    wheel = ProbabilityWheel.objects.get(company=company, key=key)
-    wheel.idx = 0
-    wheel.save(update_fields=["idx"])
+    wheels = ProbabilityWheel.objects.filter(company=company, key=key)
+    if not wheels.update(idx=0, spare=[], generation=F("generation") + 1):
+        raise ProbabilityWheel.DoesNotExist(f"Roue {key} introuvable")
 
 
 # ------------------ Éligibilité par minimums ------------------
+def referrals_of(company: Company, client):
+    """Parrainages faits par `client` dans l'entreprise (compté à chaque tirage)."""
+    return Referral.objects.filter(company=company, referrer=client)
+
+
 def _eligible_buckets_for(company: Company, client) -> Dict[str, bool]:
     """
     Retourne l'éligibilité par bucket, SANS bloquer globalement.
@@ -140,7 +247,7 @@ def _eligible_buckets_for(company: Company, client) -> Dict[str, bool]:
     - Un bucket est éligible si referrals_count >= min_required.
     """
     # Nombre de parrainages de ce client dans cette entreprise
-    referrals_count = Referral.objects.filter(company=company, referrer=client).count()
+    referrals_count = referrals_of(company, client).count()
 
     # Agrégation par bucket : on prend le max des minimums configurés
     agg = (
@@ -167,14 +274,14 @@ def _eligible_buckets_for(company: Company, client) -> Dict[str, bool]:
         TRES_RARE: is_ok(TRES_RARE),
     }
 
-    # Log debug utile pour vérifier ce qui se passe en vrai
-    logger.warning(
-        "ELIG company=%s client=%s referrals=%s thresholds=%s elig=%s",
-        getattr(company, "id", None),
-        getattr(client, "id", None),
-        referrals_count,
-        thresholds,
-        elig,
+    # Appelé à chaque tirage : événement échantillonné (DEBUG par défaut)
+    events.emit(
+        "wheel.eligibility",
+        company=getattr(company, "id", None),
+        client=getattr(client, "id", None),
+        referrals=referrals_count,
+        thresholds=thresholds,
+        elig=elig,
     )
 
     return elig
@@ -209,16 +316,26 @@ def tirer_recompense(company: Company, client) -> str:
     Combine la roue VERY_RARE (1/100000) puis, en cas d’échec, la roue BASE.
     On respecte les minimums (éligibilité) en sautant les cases non autorisées.
     """
+    bucket = _tirer_sur_roues(company, client)
+    metrics.inc("wheel_draws_total", company=company.id, bucket=bucket, mode="wheel")
+    return bucket
+
+
+def _tirer_sur_roues(company: Company, client) -> str:
     elig = _eligible_buckets_for(company, client)
     base, very_rare = ensure_wheels(company)
+    mask = rng.elig_mask(elig)
+    client_id = getattr(client, "id", None)
 
     # VERY RARE : autoriser TRES_RARE seulement si éligible
     allowed_vr: Set[str] = {NO_HIT}
     if elig.get(TRES_RARE, False):
         allowed_vr.add(TRES_RARE)
 
-    vr = _consume_one_eligible(very_rare, allowed_vr)
+    vr, vr_slot = _draw_on(very_rare, allowed_vr)
     if vr == TRES_RARE:
+        ledger.record(company.id, client_id=client_id, wheel=DrawEvent.WHEEL_VERY_RARE,
+                      slot=vr_slot, mask=mask, outcome=TRES_RARE)
         return TRES_RARE
 
     # BASE : autoriser uniquement les buckets éligibles
@@ -231,9 +348,35 @@ def tirer_recompense(company: Company, client) -> str:
         allowed_base.add(RARE)
 
     if not allowed_base:
+        ledger.record(company.id, client_id=client_id, wheel=DrawEvent.WHEEL_VERY_RARE,
+                      slot=vr_slot, mask=mask, outcome=NO_HIT)
         return NO_HIT
 
-    return _consume_one_eligible(base, allowed_base)
+    bucket, slot = _draw_on(base, allowed_base)
+    ledger.record(company.id, client_id=client_id, wheel=DrawEvent.WHEEL_BASE,
+                  slot=slot, mask=mask, outcome=bucket)
+    return bucket
+
+
+def _draw_on(wheel: ProbabilityWheel, allowed: Set[str]) -> Tuple[str, int]:
+    """
+    Consomme une case éligible et renvoie (résultat, case consommée).
+
+    - block_size > 0 : depuis le bloc réservé par le processus (rewards.services.wheel_blocks) ;
+    - sinon : curseur avancé sous verrou de ligne (deux tirages concurrents
+      ne lisent jamais le même idx).
+    """
+    if wheel.block_size:
+        return wheel_blocks.consume(wheel, allowed)
+    with transaction.atomic():
+        start = time.perf_counter()
+        locked = ProbabilityWheel.objects.select_for_update().only("idx", "size").get(pk=wheel.pk)
+        # Mesure envoyée au commit : le verrou est tenu jusqu'à la fin de la transaction englobante
+        metrics.observe_on_commit("wheel_lock_wait_seconds", time.perf_counter() - start, key=wheel.key)
+        locked.pool = wheel.pool  # déjà chargé par ensure_wheels : pas de second transfert du pool
+        value = _consume_one_eligible(locked, allowed)
+    wheel.idx = locked.idx
+    return value, (locked.idx - 1) % locked.size
 
 
 # ------------------ Pourcentages UI normalisés ------------------
@@ -247,8 +390,10 @@ def get_normalized_percentages(company: Company, client) -> Dict[str, Decimal]:
       - RARE      = 0.99999 / 100
       - TRES_RARE = 1 / 100000
     """
-    elig = _eligible_buckets_for(company, client)
+    return _normalized_from_elig(_eligible_buckets_for(company, client))
+
 
+def _normalized_from_elig(elig: Dict[str, bool]) -> Dict[str, Decimal]:
     # Poids de base (sur [0..1])
     p_base = {
         SOUVENT: Decimal("80") / Decimal("100"),        # 0.80
@@ -275,6 +420,8 @@ def get_normalized_percentages(company: Company, client) -> Dict[str, Decimal]:
         RARE:      (p_base[RARE]    / mass) * Decimal(100) if elig.get(RARE,    False)   else Decimal(0),
         TRES_RARE: (p_tr[TRES_RARE] / mass) * Decimal(100) if elig.get(TRES_RARE, False) else Decimal(0),
     }
+
+
 def tirer_recompense_with_normalization(company: Company, client) -> str:
     """
     Tirage « mathématique » :
@@ -287,19 +434,41 @@ def tirer_recompense_with_normalization(company: Company, client) -> str:
     2. On enlève les buckets dont le minimum n'est pas atteint
        (via _eligible_buckets_for).
     3. On RENORMALISE pour que la somme fasse 100.
-    4. On tire un bucket pondéré.
+    4. On tire un bucket pondéré, avec le flux déterministe de l'entreprise
+       (rewards.services.rng) : le tirage est journalisé et rejouable
+       (cf. replay_normalized).
 
     Si aucun bucket n'est éligible → NO_HIT.
     """
-    # Pourcentages déjà normalisés côté UI (0..100)
-    pct = get_normalized_percentages(company, client)
+    bucket = _tirer_normalise(company, client)
+    metrics.inc("wheel_draws_total", company=company.id, bucket=bucket, mode="normalized")
+    return bucket
+
+
+def _tirer_normalise(company: Company, client) -> str:
+    elig = _eligible_buckets_for(company, client)
+    draw_no = rng.next_draw_no(company.id)
+    mask = rng.elig_mask(elig)
+    bucket = _pick_normalise(_normalized_from_elig(elig), rng.uniform(rng.company_stream(company.id), draw_no))
+    ledger.record(company.id, client_id=getattr(client, "id", None), draw_no=draw_no, mask=mask, outcome=bucket)
+    return bucket
+
+
+def replay_normalized(company_id: int, draw_no: int, mask: int) -> str:
+    """Rejoue le tirage n° draw_no de l'entreprise, à éligibilité (masque) donnée."""
+    u = rng.uniform(rng.company_stream(company_id), draw_no)
+    return _pick_normalise(_normalized_from_elig(rng.mask_elig(mask)), u)
+
+
+def _pick_normalise(pct: Dict[str, Decimal], u: float) -> str:
+    # Pourcentages normalisés (0..100)
     total = sum(pct.values())
 
     if total <= 0:
         return NO_HIT
 
     # tirage dans [0 ; total) (en pratique total ≈ 100)
-    x = Decimal(str(random.random())) * total
+    x = Decimal(str(u)) * total
     acc = Decimal("0")
 
     for bucket in (SOUVENT, MOYEN, RARE, TRES_RARE):
@@ -0,0 +1,123 @@
+# rewards/services/provisioning.py
+"""
+Mise en place des roues exactes pour toutes les entreprises, en masse.
+
+- Une seule requête repère les entreprises dont une roue manque ou est périmée
+  (cotes par défaut, mais taille différente de la spec actuelle) ; les autres
+  ne sont ni lues ni réécrites.
+- Par paquets d'entreprises : les roues manquantes en bulk_create, les roues
+  périmées en un UPDATE par clé (même pool pour tout le paquet : il n'est
+  envoyé qu'une fois, au lieu d'un save() de ~1 Mo par entreprise).
+- Les roues à cotes propres (ProbabilityWheel.spec) relèvent de set_wheel_spec :
+  elles ne sont jamais réécrites ici (reset=True remet seulement leur curseur à 0).
+- Tout se fait dans une transaction : un déploiement de cotes interrompu ne
+  laisse pas la moitié des entreprises sur l'ancien cycle.
+"""
+from __future__ import annotations
+
+import itertools
+import logging
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, QuerySet
+
+from accounts.models import Company
+from rewards.models import ProbabilityWheel
+from rewards.services.probabilities import PRESET_SPECS, compiled_pool
+
+logger = logging.getLogger(__name__)
+
+PROVISION_CHUNK_SIZE = 10  # entreprises par paquet (2 roues dont une de 100 000 cases chacune)
+
+
+@dataclass
+class ProvisionReport:
+    companies: int = 0   # entreprises à traiter (roue manquante ou périmée)
+    done: int = 0        # entreprises traitées jusqu'ici
+    created: int = 0     # roues créées
+    updated: int = 0     # roues réécrites (ou curseurs remis à 0)
+
+
+def _chunks(iterable: Iterable, size: int):
+    it = iter(iterable)
+    while batch := list(itertools.islice(it, size)):
+        yield batch
+
+
+def _wheels(key: str):
+    return ProbabilityWheel.objects.filter(company=OuterRef("pk"), key=key)
+
+
+def companies_to_provision(companies: Optional[QuerySet] = None, *, reset: bool = False) -> List[tuple]:
+    """
+    [(company_id, clés manquantes, clés à réécrire)] en une requête.
+    reset=True : toutes les roues existantes sont à réécrire.
+    """
+    qs = Company.objects.all() if companies is None else companies
+    keys = list(PRESET_SPECS)
+    annotations, todo = {}, Q()
+    for i, key in enumerate(keys):
+        stale = _wheels(key)
+        if not reset:
+            stale = stale.filter(spec={}).exclude(size=len(compiled_pool(PRESET_SPECS[key])))
+        annotations[f"has_{i}"] = Exists(_wheels(key))
+        annotations[f"stale_{i}"] = Exists(stale)
+        todo |= Q(**{f"has_{i}": False}) | Q(**{f"stale_{i}": True})
+
+    rows = qs.annotate(**annotations).filter(todo).order_by("pk").values_list("pk", *annotations)
+    out = []
+    for pk, *flags in rows:
+        pairs = list(zip(keys, flags[0::2], flags[1::2]))  # (clé, existe, périmée)
+        missing = [k for k, has, _stale in pairs if not has]
+        rewrite = [k for k, has, stale in pairs if has and stale]
+        out.append((pk, missing, rewrite))
+    return out
+
+
+def provision_wheels(companies: Optional[QuerySet] = None, *, reset: bool = False,
+                     chunk_size: int = PROVISION_CHUNK_SIZE,
+                     progress: Optional[Callable[[ProvisionReport], None]] = None) -> ProvisionReport:
+    """
+    Crée les roues manquantes et réécrit les roues périmées de `companies`
+    (défaut : toutes). reset=True : réécrit toutes les roues, curseur à 0.
+    `progress(report)` est appelé après chaque paquet.
+    """
+    report = ProvisionReport()
+    pools = {key: compiled_pool(counts) for key, counts in PRESET_SPECS.items()}
+    with transaction.atomic():
+        todo = companies_to_provision(companies, reset=reset)
+        report.companies = len(todo)
+        for batch in _chunks(todo, max(1, chunk_size)):
+            new = [
+                ProbabilityWheel(company_id=pk, key=key, pool=list(pools[key]), size=len(pools[key]), idx=0)
+                for pk, missing, _rewrite in batch for key in missing
+            ]
+            if new:
+                # ignore_conflicts : une roue créée entre-temps par ensure_wheels est laissée telle quelle ;
+                # on compte donc les lignes réellement insérées, pas les objets envoyés
+                chunk_wheels = ProbabilityWheel.objects.filter(
+                    company_id__in={w.company_id for w in new}, key__in=list(pools),
+                )
+                before = chunk_wheels.count()
+                ProbabilityWheel.objects.bulk_create(new, ignore_conflicts=True)
+                report.created += chunk_wheels.count() - before
+
+            for key, pool in pools.items():
+                ids = [pk for pk, _missing, rewrite in batch if key in rewrite]
+                if not ids:
+                    continue
+                wheels = ProbabilityWheel.objects.filter(company_id__in=ids, key=key)
+                # generation + 1 : les blocs réservés par les processus sur l'ancien cycle sont abandonnés
+                bump = {"idx": 0, "spare": [], "generation": F("generation") + 1}
+                report.updated += wheels.filter(spec={}).update(pool=list(pool), size=len(pool), **bump)
+                if reset:
+                    report.updated += wheels.exclude(spec={}).update(**bump)
+
+            report.done += len(batch)
+            if progress:
+                progress(report)
+    logger.info("Roues : %s entreprise(s), %s créée(s), %s réécrite(s)",
+                report.companies, report.created, report.updated)
+    return report
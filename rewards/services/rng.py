@@ -0,0 +1,93 @@
+# rewards/services/rng.py
+"""
+Aléa déterministe des tirages de récompense, avec journal d'audit.
+
+- Un flux par entreprise, à compteur : le n-ième tirage utilise
+  u = HMAC-SHA256(REWARD_RNG_SECRET, "company:<id>:<n>") ramené dans [0, 1).
+  Connaissant (entreprise, n, masque d'éligibilité), on régénère le tirage à
+  l'identique : « ce jackpot était-il régulier ? » devient un simple rejeu.
+- Le compteur n est une ligne DrawCounter par entreprise, incrémentée par un
+  UPDATE dans la transaction du tirage : partagé par tous les workers (quel
+  que soit le cache), verrouillé jusqu'au commit, rendu si le tirage est
+  annulé. L'unicité (entreprise, n) du journal fait échouer toute collision.
+- Chaque tirage est consigné dans DrawEvent (n, masque, résultat) via
+  rewards.services.ledger.
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import random
+from typing import Dict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+
+from rewards.models import DrawCounter, DrawEvent
+
+# Ordre des bits du masque d'éligibilité
+MASK_BITS = ("SOUVENT", "MOYEN", "RARE", "TRES_RARE")
+
+
+def _secret() -> bytes:
+    # Secret dédié : une rotation de SECRET_KEY ne doit pas rendre les tirages passés invérifiables
+    return (getattr(settings, "REWARD_RNG_SECRET", "") or settings.SECRET_KEY).encode()
+
+
+def uniform(stream: str, counter: int) -> float:
+    """Valeur de [0, 1) du flux `stream` à la position `counter` (53 bits, comme random.random)."""
+    digest = hmac.new(_secret(), f"{stream}:{counter}".encode(), hashlib.sha256).digest()
+    return (int.from_bytes(digest[:8], "big") >> 11) / float(1 << 53)
+
+
+def company_stream(company_id: int) -> str:
+    return f"company:{company_id}"
+
+
+class CounterStream(random.Random):
+    """
+    random.Random adossé au même générateur à compteur : random(), choice(),
+    shuffle()… sont reproductibles à partir de la seule graine (roue de test).
+    """
+
+    def seed(self, a=None, version=2):
+        self.stream = f"seed:{a}"
+        self.counter = 0
+
+    def random(self) -> float:
+        self.counter += 1
+        return uniform(self.stream, self.counter)
+
+    def getrandbits(self, k: int) -> int:
+        words = [int(self.random() * (1 << 32)) for _ in range((k + 31) // 32)] or [0]
+        return int.from_bytes(b"".join(w.to_bytes(4, "big") for w in words), "big") >> (len(words) * 32 - k)
+
+    def getstate(self):
+        return self.stream, self.counter
+
+    def setstate(self, state):
+        self.stream, self.counter = state
+
+
+# ------------------ Compteur par entreprise ------------------
+def next_draw_no(company_id: int) -> int:
+    counter = DrawCounter.objects.filter(company_id=company_id)
+    with transaction.atomic():
+        # L'UPDATE verrouille la ligne : la relecture voit notre propre incrément
+        if not counter.update(last_no=F("last_no") + 1):
+            # Premier tirage : amorçage depuis le journal (course gérée par ignore_conflicts)
+            last = DrawEvent.objects.filter(company_id=company_id).aggregate(n=Max("draw_no"))["n"] or 0
+            DrawCounter.objects.bulk_create([DrawCounter(company_id=company_id, last_no=last)], ignore_conflicts=True)
+            counter.update(last_no=F("last_no") + 1)
+        return counter.values_list("last_no", flat=True).get()
+
+
+# ------------------ Masque d'éligibilité ------------------
+def elig_mask(elig: Dict[str, bool]) -> int:
+    return sum(1 << i for i, bucket in enumerate(MASK_BITS) if elig.get(bucket))
+
+
+def mask_elig(mask: int) -> Dict[str, bool]:
+    return {bucket: bool(mask & (1 << i)) for i, bucket in enumerate(MASK_BITS)}
+
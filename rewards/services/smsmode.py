@@ -8,6 +8,7 @@ import re
 import requests
 from django.conf import settings
 from common.phone_utils import normalize_msisdn  # retourne (to_digits, meta)
+from core import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -92,6 +93,17 @@ def _to_provider_digits(raw_number: str) -> Tuple[str, Dict[str, Any]]:
 # =========================
 
 def send_sms(payload: SMSPayload) -> SMSResult:
+    """Envoi mesuré (durée, résultat) : voir _post_sms."""
+    with metrics.track_send("sms", "smsmode") as outcome:
+        result = _post_sms(payload)
+        if result.status == "DRY_RUN":
+            outcome["value"] = "dry_run"
+        elif not result.ok:
+            outcome["value"] = "error"
+    return result
+
+
+def _post_sms(payload: SMSPayload) -> SMSResult:
     """
     Envoi via smsmode.
     Auth: header 'X-Api-Key: <API_KEY>'
@@ -104,7 +116,7 @@ def send_sms(payload: SMSPayload) -> SMSResult:
       }
     """
     if settings.SMSMODE.get("DRY_RUN"):
-        logger.info("[SMSMODE DRY-RUN] %s", payload)
+        logger.debug("[SMSMODE DRY-RUN] to=%s", payload.to)
         return SMSResult(ok=True, provider_id=None, status="DRY_RUN", raw={"dry_run": True})
 
     url = _build_smsmode_url()
@@ -122,7 +134,7 @@ def send_sms(payload: SMSPayload) -> SMSResult:
         return SMSResult(ok=False, provider_id=None, status="INVALID_NUMBER", raw={"meta": meta})
 
     if meta.get("e164"):
-        logger.info("SMSMODE normalize: raw=%s -> e164=%s -> to=%s", payload.to, meta["e164"], final_to)
+        logger.debug("SMSMODE normalize: raw=%s -> e164=%s -> to=%s", payload.to, meta["e164"], final_to)
 
     data: Dict[str, Any] = {
         "recipient": {"to": final_to},
@@ -131,7 +143,7 @@ def send_sms(payload: SMSPayload) -> SMSResult:
     if payload.sender:
         data["from"] = payload.sender
 
-    logger.info("SMSMODE POST %s to=%s sender=%s", url, final_to, payload.sender or "")
+    logger.debug("SMSMODE POST %s to=%s sender=%s", url, final_to, payload.sender or "")
 
     try:
         timeout = int(settings.SMSMODE.get("TIMEOUT", 10))
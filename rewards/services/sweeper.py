@@ -0,0 +1,100 @@
+# rewards/services/sweeper.py
+"""
+Balayeur des récompenses expirées.
+
+Les récompenses PENDING dont le lien a expiré (token_expires_at <= maintenant)
+passent à l'état EXPIRED, par paquets bornés :
+  1) SELECT id … WHERE state='PENDING' AND token_expires_at <= now
+     ORDER BY token_expires_at, id LIMIT n
+     (keyset sur l'index partiel reward_pending_expiry_idx : coût proportionnel au paquet,
+     pas à la table ; un keyset sur id seul fait parcourir la clé primaire)
+  2) UPDATE … SET state='EXPIRED' WHERE id IN (…) AND state='PENDING'
+     (une récompense distribuée entre-temps n'est pas touchée)
+Chaque passage est consigné dans RewardSweep. Les KPI sont calculés à la volée sur
+state='PENDING' : ils restent cohérents dès l'UPDATE ; seules les projections en cache
+des pages publiques sont à invalider.
+"""
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from rewards.models import Reward, RewardSweep
+from rewards.services.claims import forget_claims
+
+logger = logging.getLogger(__name__)
+
+SWEEP_CHUNK_SIZE = 500
+
+
+def expired_batch(now, *, after: Optional[tuple] = None, chunk_size: int = SWEEP_CHUNK_SIZE,
+                  company_id: Optional[int] = None):
+    """
+    Paquet suivant des récompenses PENDING au lien expiré : lignes (id, company_id, token,
+    token_expires_at), keyset sur (token_expires_at, id) ; `after` = (expiration, id) de la
+    dernière ligne du paquet précédent.
+    """
+    qs = Reward.objects.filter(state="PENDING", token_expires_at__lte=now)
+    if after is not None:
+        expires_at, last_id = after
+        qs = qs.filter(Q(token_expires_at__gt=expires_at) | Q(token_expires_at=expires_at, id__gt=last_id))
+    if company_id:
+        qs = qs.filter(company_id=company_id)
+    return (
+        qs.order_by("token_expires_at", "id")
+        .values_list("id", "company_id", "token", "token_expires_at")[:chunk_size]
+    )
+
+
+def expire_stale_rewards(
+    *,
+    now=None,
+    chunk_size: int = SWEEP_CHUNK_SIZE,
+    max_batches: Optional[int] = None,
+    company_id: Optional[int] = None,
+    dry_run: bool = False,
+) -> RewardSweep:
+    now = now or timezone.now()
+    sweep = RewardSweep.objects.create(started_at=timezone.now(), dry_run=dry_run)
+    per_company: Counter = Counter()
+
+    after = None
+    while max_batches is None or sweep.batches < max_batches:
+        rows = list(expired_batch(now, after=after, chunk_size=chunk_size, company_id=company_id))
+        if not rows:
+            break
+        after = (rows[-1][3], rows[-1][0])
+        ids = [r[0] for r in rows]
+
+        if dry_run:
+            per_company.update(r[1] for r in rows)
+        else:
+            with transaction.atomic():
+                updated_ids = set(
+                    Reward.objects.select_for_update()
+                    .filter(id__in=ids, state="PENDING")
+                    .values_list("id", flat=True)
+                )
+                Reward.objects.filter(id__in=updated_ids).update(state=Reward.STATE_EXPIRED)
+            per_company.update(r[1] for r in rows if r[0] in updated_ids)
+            forget_claims(r[2] for r in rows if r[0] in updated_ids)
+
+        sweep.batches += 1
+        if len(rows) < chunk_size:
+            break
+
+    sweep.expired = sum(per_company.values())
+    sweep.per_company = {str(cid): n for cid, n in per_company.items()}
+    sweep.finished_at = timezone.now()
+    sweep.save(update_fields=["expired", "batches", "per_company", "finished_at"])
+
+    logger.info(
+        "reward_sweep id=%s expired=%s batches=%s companies=%s dry_run=%s",
+        sweep.pk, sweep.expired, sweep.batches, len(per_company), dry_run,
+    )
+    return sweep
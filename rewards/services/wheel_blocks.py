@@ -0,0 +1,212 @@
+# rewards/services/wheel_blocks.py
+"""
+Réservation de cases par blocs (roues à fort volume, ProbabilityWheel.block_size = k > 0).
+
+- Un processus réserve k cases d'un coup sous UN verrou de ligne
+  (cases rendues `spare` d'abord, puis idx += k), sur une connexion dédiée
+  validée aussitôt, et sert ensuite les tirages depuis ce bloc local, sans
+  aller-retour SELECT … FOR UPDATE.
+- Chaque case n'est servie qu'une fois : le cycle exact (980/19/1, 1/100 000)
+  est conservé sur l'ensemble des processus ; seul l'ordre de service change.
+- À l'arrêt (atexit), les cases non servies sont rendues : si personne n'a
+  réservé depuis, le curseur recule simplement ; sinon elles vont dans `spare`.
+  Un processus tué sans arrêt propre perd au plus k cases par roue.
+- Le bloc garde une référence au pool et la `generation` de la roue : toute
+  régénération ou remise à zéro (rebuild_wheel, reset_wheel, set_wheel_spec,
+  provision_wheels) l'incrémente, et les blocs de l'ancienne génération sont
+  abandonnés — au prochain tirage, ou à la réservation suivante si l'appelant
+  tenait encore une roue périmée (elle est alors relue).
+- fork() : un enfant ne doit jamais servir le bloc de son parent.
+"""
+from __future__ import annotations
+
+import atexit
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Set, Tuple
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+
+from core import metrics
+from rewards.models import ProbabilityWheel
+
+logger = logging.getLogger(__name__)
+
+
+class _Block:
+    __slots__ = ("key", "pool", "size", "spec", "generation", "slots")
+
+    def __init__(self, wheel: ProbabilityWheel):
+        self.key = wheel.key
+        self.pool = wheel.pool
+        self.size = wheel.size
+        self.spec = wheel.spec
+        self.generation = wheel.generation
+        self.slots: Deque[int] = deque()
+
+    def matches(self, wheel: ProbabilityWheel) -> bool:
+        return (self.generation, self.size, self.spec) == (wheel.generation, wheel.size, wheel.spec)
+
+
+class _Regenerated(Exception):
+    """La roue a changé de génération depuis la création du bloc."""
+
+
+_TABLE = ProbabilityWheel._meta.db_table
+_blocks: Dict[int, _Block] = {}  # par ProbabilityWheel.pk
+_lock = threading.Lock()
+_conn = None
+
+
+def _forget_after_fork():
+    global _lock, _conn
+    _blocks.clear()
+    _lock = threading.Lock()
+    _conn = None  # socket du parent : ne pas la réutiliser
+
+
+os.register_at_fork(after_in_child=_forget_after_fork)
+
+
+def _reservation_connection():
+    """
+    Connexion dédiée, en autocommit : une réservation est validée tout de suite,
+    indépendamment de la transaction de l'appelant (dont un rollback ne doit pas
+    remettre en jeu des cases déjà distribuées au bloc). SQLite (dev) : une seule
+    connexion écrivain, on garde la connexion courante.
+    """
+    global _conn
+    if connection.vendor == "sqlite":
+        return connection
+    if _conn is None:
+        _conn = connections.create_connection(DEFAULT_DB_ALIAS)
+        _conn.inc_thread_sharing()  # protégée par _lock, partagée entre threads
+    _conn.close_if_unusable_or_obsolete()
+    return _conn
+
+
+def _locked_update(wheel_pk: int, key: str,
+                   compute: Callable[[int, int, List[int], int, int], Tuple[int, List[int]]]):
+    """
+    SELECT … FOR UPDATE de (idx, size, spare, block_size, generation), puis UPDATE de (idx, spare)
+    calculés par compute(), en une transaction courte. Renvoie False si la roue n'existe plus.
+    """
+    conn = _reservation_connection()
+    dedicated = conn is not connection
+    lock = " FOR UPDATE" if conn.features.has_select_for_update else ""
+    waited = None
+    with (contextlib.nullcontext() if dedicated else transaction.atomic()):
+        if dedicated:
+            conn.set_autocommit(False)
+        try:
+            with conn.cursor() as cur:
+                start = time.perf_counter()
+                cur.execute(f"SELECT idx, size, spare, block_size, generation FROM {_TABLE} "
+                            f"WHERE id = %s{lock}", [wheel_pk])
+                row = cur.fetchone()
+                waited = time.perf_counter() - start
+                if row is None:
+                    found = False
+                else:
+                    idx, size, spare, block_size, generation = row
+                    spare = json.loads(spare) if isinstance(spare, str) else list(spare or [])
+                    idx, spare = compute(idx, size, spare, block_size, generation)
+                    cur.execute(f"UPDATE {_TABLE} SET idx = %s, spare = %s WHERE id = %s",
+                                [idx, json.dumps(spare), wheel_pk])
+                    found = True
+            if dedicated:
+                conn.commit()
+        except Exception:
+            if dedicated:
+                conn.rollback()
+            raise
+        finally:
+            if dedicated:
+                conn.set_autocommit(True)
+    if waited is not None:
+        # Envoyée une fois le verrou relâché (pas d'aller-retour Redis dans la section critique)
+        metrics.observe_on_commit("wheel_lock_wait_seconds", waited, key=key)
+    return found
+
+
+def _reserve(wheel_pk: int, block: _Block) -> None:
+    reserved: List[int] = []
+
+    def compute(idx, size, spare, block_size, generation):
+        if (generation, size) != (block.generation, block.size):
+            raise _Regenerated(wheel_pk)
+        k = max(1, block_size)
+        spare = [s for s in spare if s < size]
+        taken, spare = spare[:k], spare[k:]
+        reserved[:] = taken + [(idx + i) % size for i in range(k - len(taken))]
+        return (idx + k - len(taken)) % size, spare
+
+    if not _locked_update(wheel_pk, block.key, compute):
+        raise ProbabilityWheel.DoesNotExist(f"Roue {wheel_pk} introuvable")
+    block.slots.extend(reserved)  # seulement une fois la réservation validée
+
+
+def consume(wheel: ProbabilityWheel, allowed: Set[str]) -> Tuple[str, int]:
+    """
+    Équivalent de _consume_one_eligible pour une roue en mode bloc : sert la
+    prochaine case du bloc local (en sautant les cases non autorisées).
+    Renvoie (résultat, case) ; NO_HIT si rien d'autorisé sur un tour complet.
+    """
+    if wheel.size == 0:
+        raise ValueError("Roue vide")
+    with _lock:
+        block = _blocks.get(wheel.pk)
+        if block is None or not block.matches(wheel):
+            block = _blocks[wheel.pk] = _Block(wheel)
+        slot = -1
+        for _ in range(block.size):
+            if not block.slots:
+                try:
+                    _reserve(wheel.pk, block)
+                except _Regenerated:
+                    # Roue de l'appelant périmée : on relit l'état courant (pool compris)
+                    wheel.refresh_from_db(fields=["pool", "size", "spec", "generation", "idx", "spare"])
+                    block = _blocks[wheel.pk] = _Block(wheel)
+                    _reserve(wheel.pk, block)
+            slot = block.slots.popleft()
+            if block.pool[slot] in allowed:
+                return block.pool[slot], slot
+        return "NO_HIT", slot
+
+
+def release_all() -> int:
+    """Rend les cases non servies de tous les blocs du processus ; renvoie leur nombre."""
+    returned = 0
+    with _lock:
+        for wheel_pk, block in list(_blocks.items()):
+            if block.slots:
+                try:
+                    returned += _release(wheel_pk, block)
+                except Exception:  # arrêt du processus : ne jamais bloquer la sortie
+                    logger.exception("Restitution du bloc impossible (roue %s)", wheel_pk)
+            _blocks.pop(wheel_pk, None)
+    return returned
+
+
+def _release(wheel_pk: int, block: _Block) -> int:
+    unused = list(block.slots)
+
+    def compute(idx, size, spare, block_size, generation):
+        if (generation, size) != (block.generation, block.size):
+            return idx, spare  # roue régénérée / remise à zéro : cases caduques
+        contiguous = all((unused[0] + i) % size == s for i, s in enumerate(unused))
+        if contiguous and (unused[-1] + 1) % size == idx:
+            return unused[0], spare  # personne n'a réservé depuis : on recule le curseur
+        return idx, spare + unused
+
+    _locked_update(wheel_pk, block.key, compute)
+    block.slots.clear()
+    return len(unused)
+
+
+atexit.register(release_all)
@@ -1,5 +1,5 @@
 # rewards/signals.py
-from django.db.models.signals import pre_save
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 from .models import Reward
 
@@ -7,3 +7,15 @@ from .models import Reward
 def reward_token_autogen(sender, instance: Reward, **kwargs):
     if not instance.token:
         instance.ensure_token()
+    instance.ensure_role()
+
+
+@receiver(post_save, sender=Reward)
+def reward_signed_token_after_insert(sender, instance: Reward, created: bool, **kwargs):
+    # Jeton signé : il embarque l'id, connu seulement après l'INSERT
+    if created and not instance.token:
+        instance.ensure_token()
+        if instance.token:
+            Reward.objects.filter(pk=instance.pk).update(
+                token=instance.token, token_expires_at=instance.token_expires_at,
+            )
@@ -0,0 +1,27 @@
+import json
+
+import pytest
+
+from dashboard.models import Client, Referral
+from rewards.bench import SCENARIOS, run_benchmarks, seed_tenants
+from rewards.models import ProbabilityWheel, Reward, RewardTemplate
+
+pytestmark = pytest.mark.django_db
+
+
+def test_seeded_tenants_are_reproducible_and_benchmarks_serialize(settings):
+    settings.SMSMODE = {**settings.SMSMODE, "DRY_RUN": True}
+    companies = seed_tenants(companies=2, clients=30, referrals=20, seed=7)
+
+    assert [c.slug for c in companies] == ["bench-7-00000", "bench-7-00001"]
+    refs = Referral.objects.filter(company=companies[0]).count()
+    assert Client.objects.filter(company=companies[0]).count() > refs > 0
+    assert Reward.objects.filter(company=companies[0]).count() == 2 * refs  # générateur de fixture_data
+    assert ProbabilityWheel.objects.filter(company__in=companies).count() == 4
+    assert RewardTemplate.objects.get(company=companies[0], bucket="RARE").min_referrals_required == 2
+
+    results = run_benchmarks(companies, iterations=2)
+    assert list(results) == list(SCENARIOS)
+    for row in results.values():
+        assert row["iterations"] == 2 and row["p50_ms"] > 0 and row["queries_per_call"] > 0
+    json.dumps(results)
@@ -0,0 +1,80 @@
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+
+from accounts.models import Company
+from dashboard.models import Client, Referral
+from rewards.models import Reward, RewardTemplate
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _reward_for_referrer():
+    company = Company.objects.create(name="Salon Rose")
+    referrer = Client.objects.create(company=company, first_name="Inès", last_name="Roy", is_referrer=True)
+    referee = Client.objects.create(company=company, first_name="Noé", last_name="Lin")
+    referral = Referral.objects.create(company=company, referrer=referrer, referee=referee)
+    RewardTemplate.objects.create(company=company, bucket="MOYEN", label="Soin offert", only_on_some_items=True)
+    return Reward.objects.create(
+        company=company, client=referrer, referral=referral, label="Soin offert", bucket="MOYEN",
+    )
+
+
+def test_use_reward_page_is_served_from_claim_cache(client, django_assert_num_queries):
+    reward = _reward_for_referrer()
+    url = reverse("rewards:use_reward", kwargs={"token": reward.token})
+
+    with django_assert_num_queries(1):
+        first = client.get(url)
+    html = first.content.decode()
+    assert "Félicitations Inès !" in html and "Tu as fait découvrir Salon Rose à Noé" in html
+    assert "Valable sur une sélection d'articles" in html
+
+    with django_assert_num_queries(0):
+        assert client.get(url).status_code == 200
+
+
+def test_claim_cache_is_invalidated_on_state_change_and_unknown_tokens_404(client):
+    from rewards.services.claims import get_claim
+
+    reward = _reward_for_referrer()
+    assert get_claim(reward.token)["state"] == "PENDING"
+
+    reward.state = "SENT"
+    reward.save(update_fields=["state"])
+    assert get_claim(reward.token)["state"] == "SENT"
+
+    old_token = reward.token
+    reward.ensure_token(force=True)
+    reward.save(update_fields=["token"])
+    assert get_claim(old_token) is None
+
+    assert client.get(reverse("rewards:use_reward", kwargs={"token": "nope"})).status_code == 404
+
+
+def test_signed_tokens_resolve_by_pk_and_reject_forgeries_without_queries(client, settings, django_assert_num_queries):
+    from datetime import timedelta
+    from django.utils import timezone
+    from rewards.tokens import make_signed_token, parse_signed_token
+
+    settings.REWARD_SIGNED_TOKENS = True
+    reward = _reward_for_referrer()
+    reward.refresh_from_db()
+    claim = parse_signed_token(reward.token)
+    assert (claim.reward_id, claim.company_id) == (reward.id, reward.company_id)
+
+    with django_assert_num_queries(1):
+        assert client.get(reverse("rewards:use_reward", kwargs={"token": reward.token})).status_code == 200
+
+    forged = reward.token[:-1] + ("A" if reward.token[-1] != "A" else "B")
+    expired = make_signed_token(reward.id, reward.company_id, timezone.now() - timedelta(days=1))
+    with django_assert_num_queries(0):
+        for token in (forged, expired, "junk"):
+            assert client.get(reverse("rewards:use_reward", kwargs={"token": token})).status_code == 404
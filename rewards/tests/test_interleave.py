@@ -0,0 +1,74 @@
+# rewards/tests/test_interleave.py
+import random
+from collections import Counter
+
+import pytest
+
+from accounts.models import Company
+from rewards import probabilities as legacy
+from rewards.models import ProbabilityWheel
+
+pytestmark = pytest.mark.django_db
+
+
+def test_value_at_matches_full_interleave():
+    rnd = random.Random(7)
+    specs = [{"a": 3}, {"a": 1, "b": 1}, {"Souvent": 80, "Moyen": 19, "Rare": 1}, {"x": 6, "y": 4, "z": 4}]
+    specs += [{c: rnd.randint(0, 40) + 1 for c in "abcde"[: rnd.randint(2, 5)]} for _ in range(20)]
+    for counts in specs:
+        wheel = list(legacy.iter_interleaved(counts))
+        assert Counter(wheel) == Counter(counts)
+        assert [legacy.value_at(counts, i) for i in range(len(wheel))] == wheel
+
+
+def test_interleave_spreads_rare_values_over_the_cycle():
+    wheel = legacy.interleave(legacy.build_pool(((9999, "NO_HIT"), (1, "Très rare"))))
+    assert wheel.index("Très rare") == 5000
+    pos = [i for i, v in enumerate(legacy.interleave(legacy.build_pool(((80, "S"), (19, "M"), (1, "R"))))) if v == "M"]
+    assert max(b - a for a, b in zip(pos, pos[1:])) <= 6  # ~100/19, pas tous en tête de roue
+    with pytest.raises(IndexError):
+        legacy.value_at({"a": 2}, 2)
+
+
+def test_spec_hash_ignores_key_order_but_not_counts():
+    assert legacy.spec_hash({"a": 2, "b": 1}) == legacy.spec_hash({"b": 1, "a": 2})
+    assert legacy.spec_hash({"a": 2, "b": 1}) != legacy.spec_hash({"a": 1, "b": 2})
+
+
+def test_ensure_wheel_rebuilds_only_when_the_spec_changes(django_assert_num_queries):
+    company = Company.objects.create(name="Leg", slug="leg")
+    wheel = legacy.ensure_wheel(company, legacy.BASE_100)
+    assert (wheel.size, wheel.pool) == (100, [])
+
+    ProbabilityWheel.objects.filter(pk=wheel.pk).update(idx=42)
+    with django_assert_num_queries(3):  # SAVEPOINT, SELECT … FOR UPDATE, RELEASE : aucune écriture
+        legacy.ensure_wheel(company, legacy.BASE_100)
+
+    legacy.ensure_wheel(company, legacy.WheelSpec("interleaved_base_100", ((60, "Souvent"), (40, "Moyen"))))
+    wheel.refresh_from_db()
+    assert (wheel.spec, wheel.idx) == ({"Souvent": 60, "Moyen": 40}, 42)
+
+
+def test_draw_follows_the_interleaved_cycle():
+    company = Company.objects.create(name="Leg", slug="leg")
+    legacy.ensure_wheel(company, legacy.BASE_100)
+    drawn = [legacy.draw(company, "interleaved_base_100") for _ in range(100)]
+    assert drawn == list(legacy.iter_interleaved({"Souvent": 80, "Moyen": 19, "Rare": 1}))
+
+
+def test_ensure_wheel_refuses_the_exact_wheel_keys():
+    company = Company.objects.create(name="Leg", slug="leg")
+    with pytest.raises(ValueError, match="réservée"):
+        legacy.ensure_wheel(company, legacy.WheelSpec("base_100", ((80, "Souvent"), (20, "Moyen"))))
+
+
+def test_unknown_tokens_in_a_stored_spec_fail_clearly():
+    from rewards.services.probabilities import BASE_KEY, compiled_pool, ensure_wheels
+
+    company = Company.objects.create(name="Leg", slug="leg")
+    ensure_wheels(company)
+    ProbabilityWheel.objects.filter(company=company, key=BASE_KEY).update(spec={"Souvent": 80})
+    with pytest.raises(ValueError, match="non autorisé"):
+        ensure_wheels(company)
+    with pytest.raises(ValueError, match="inconnu"):
+        compiled_pool({"Souvent": 1})
@@ -0,0 +1,98 @@
+# rewards/tests/test_ledger.py
+from datetime import date, timedelta
+
+import pytest
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Company
+from dashboard.models import Client
+from rewards.models import DrawEvent, ProbabilityWheel, RewardTemplate
+from rewards.services import ledger
+from rewards.services.probabilities import (
+    BASE_KEY, MOYEN, NO_HIT, RARE, SOUVENT, TRES_RARE, VERY_RARE_KEY,
+    ensure_wheels, tirer_recompense,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def company():
+    c = Company.objects.create(name="Ledger", slug="ledger")
+    for bucket in (SOUVENT, MOYEN, RARE, TRES_RARE):
+        RewardTemplate.objects.create(company=c, bucket=bucket, label=bucket)
+    ensure_wheels(c)
+    return c
+
+
+@pytest.fixture
+def referrer(company):
+    return Client.objects.create(company=company, last_name="Parrain", first_name="A", is_referrer=True)
+
+
+def test_wheel_draws_record_wheel_and_slot(company, referrer, django_capture_on_commit_callbacks):
+    base = ProbabilityWheel.objects.get(company=company, key=BASE_KEY)
+    with django_capture_on_commit_callbacks(execute=True):
+        with transaction.atomic():
+            outcomes = [tirer_recompense(company, referrer) for _ in range(5)]
+
+    events = list(DrawEvent.objects.filter(company=company).order_by("id"))
+    assert [e.get_outcome_display() for e in events] == outcomes
+    assert {e.wheel for e in events} == {DrawEvent.WHEEL_BASE}
+    assert [e.slot for e in events] == [0, 1, 2, 3, 4]
+    assert [base.pool[e.slot] for e in events] == outcomes
+    assert all(e.client_id == referrer.id and e.mask == 0b1111 and e.draw_no is None for e in events)
+
+
+def test_no_eligible_bucket_is_recorded_on_very_rare_wheel(company, referrer, django_capture_on_commit_callbacks):
+    RewardTemplate.objects.filter(company=company).update(min_referrals_required=3)
+    with django_capture_on_commit_callbacks(execute=True):
+        assert tirer_recompense(company, referrer) == NO_HIT
+
+    event = DrawEvent.objects.get(company=company)
+    assert (event.wheel, event.mask, event.outcome, event.slot) == (DrawEvent.WHEEL_VERY_RARE, 0, 0, 0)
+    assert ProbabilityWheel.objects.get(company=company, key=VERY_RARE_KEY).pool[event.slot] == NO_HIT
+
+
+def test_ledger_survives_client_deletion(company, referrer, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        tirer_recompense(company, referrer)
+    client_id = referrer.id
+    referrer.delete()
+    assert DrawEvent.objects.get(company=company).client_id == client_id
+
+
+def test_rolled_back_savepoint_drops_only_its_events(company, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        with transaction.atomic():
+            ledger.record(company.id, outcome=SOUVENT, mask=15, draw_no=1)
+            with pytest.raises(RuntimeError):
+                with transaction.atomic():
+                    ledger.record(company.id, outcome=RARE, mask=15, draw_no=2)
+                    raise RuntimeError
+            ledger.record(company.id, outcome=MOYEN, mask=15, draw_no=3)
+
+    assert list(DrawEvent.objects.order_by("draw_no").values_list("draw_no", flat=True)) == [1, 3]
+
+
+def test_outcome_counts_by_company_and_period(company):
+    other = Company.objects.create(name="Autre", slug="autre")
+    old = timezone.now() - timedelta(days=40)
+    DrawEvent.objects.bulk_create([
+        DrawEvent(company=company, mask=15, outcome=ledger.OUTCOME_CODES[SOUVENT]),
+        DrawEvent(company=company, mask=15, outcome=ledger.OUTCOME_CODES[SOUVENT]),
+        DrawEvent(company=company, mask=15, outcome=ledger.OUTCOME_CODES[RARE], created_at=old),
+        DrawEvent(company=other, mask=15, outcome=ledger.OUTCOME_CODES[MOYEN]),
+    ])
+
+    assert ledger.outcome_counts(company.id) == {"NO_HIT": 0, "SOUVENT": 2, "MOYEN": 0, "RARE": 1, "TRES_RARE": 0}
+    recent = ledger.outcome_counts(company.id, since=timezone.now() - timedelta(days=7))
+    assert (recent["SOUVENT"], recent["RARE"]) == (2, 0)
+    assert ledger.outcome_counts()["MOYEN"] == 1
+
+
+def test_month_partition_names_and_noop_outside_postgres():
+    assert ledger._month_start(date(2025, 11, 17), 2) == date(2026, 1, 1)
+    assert ledger.partition_name(date(2026, 1, 1)) == "rewards_drawevent_y2026m01"
+    assert ledger.ensure_month_partitions() == []  # SQLite : table simple
@@ -0,0 +1,91 @@
+# rewards/tests/test_provisioning.py
+import pytest
+from django.core.management import call_command
+
+from accounts.models import Company
+from rewards.models import ProbabilityWheel
+from rewards.services.probabilities import BASE_KEY, BASE_SIZE, VERY_RARE_KEY, VR_SIZE, SOUVENT, set_wheel_spec
+from rewards.services.provisioning import companies_to_provision, provision_wheels
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def companies():
+    cs = [Company.objects.create(name=f"Prov {i}", slug=f"prov-{i}") for i in range(5)]
+    ProbabilityWheel.objects.filter(company__in=cs).delete()
+    return cs
+
+
+def _sizes(company):
+    return dict(ProbabilityWheel.objects.filter(company=company).values_list("key", "size"))
+
+
+def test_missing_and_outdated_wheels_are_found_in_one_query(companies, django_assert_num_queries):
+    provision_wheels(Company.objects.filter(pk__in=[c.pk for c in companies[:3]]))
+    ProbabilityWheel.objects.filter(company=companies[1], key=VERY_RARE_KEY).update(size=10_000)
+    ProbabilityWheel.objects.filter(company=companies[2], key=BASE_KEY).delete()
+
+    with django_assert_num_queries(1):
+        todo = companies_to_provision(Company.objects.filter(pk__in=[c.pk for c in companies]))
+    assert todo == [
+        (companies[1].pk, [], [VERY_RARE_KEY]),
+        (companies[2].pk, [BASE_KEY], []),
+        (companies[3].pk, [BASE_KEY, VERY_RARE_KEY], []),
+        (companies[4].pk, [BASE_KEY, VERY_RARE_KEY], []),
+    ]
+
+
+def test_provision_creates_and_repairs_in_chunks(companies):
+    ProbabilityWheel.objects.create(company=companies[0], key=BASE_KEY, pool=["SOUVENT"] * 100, size=100, idx=7)
+    seen = []
+    report = provision_wheels(chunk_size=2, progress=lambda r: seen.append(r.done))
+
+    assert (report.companies, report.created, report.updated) == (5, 9, 1)
+    assert seen == [2, 4, 5]
+    assert all(_sizes(c) == {BASE_KEY: BASE_SIZE, VERY_RARE_KEY: VR_SIZE} for c in companies)
+    assert ProbabilityWheel.objects.get(company=companies[0], key=BASE_KEY).idx == 0
+
+    assert provision_wheels().companies == 0  # déjà à jour : rien n'est réécrit
+
+
+def test_custom_specs_are_left_alone_and_reset_only_rewinds_them(companies):
+    provision_wheels()
+    set_wheel_spec(companies[0], BASE_KEY, {SOUVENT: 10})
+    ProbabilityWheel.objects.filter(company=companies[0]).update(idx=3)
+
+    assert provision_wheels().companies == 0
+    report = provision_wheels(Company.objects.filter(pk=companies[0].pk), reset=True)
+    assert report.updated == 2
+    wheel = ProbabilityWheel.objects.get(company=companies[0], key=BASE_KEY)
+    assert (wheel.size, wheel.idx, wheel.pool) == (10, 0, [SOUVENT] * 10)
+
+
+def test_seed_wheels_command_reports_progress(companies, capsys):
+    call_command("seed_wheels", "--chunk-size", "3")
+    out = capsys.readouterr().out
+    assert "3/5 entreprises" in out and "5/5 entreprises" in out
+    assert ProbabilityWheel.objects.filter(company__in=companies).count() == 10
+
+
+def test_created_counts_only_inserted_rows(companies, monkeypatch):
+    from rewards.services import provisioning
+
+    real = provisioning.companies_to_provision
+
+    def racing(*args, **kwargs):
+        todo = real(*args, **kwargs)
+        provisioning.ProbabilityWheel.objects.create(  # créée entre-temps par ensure_wheels
+            company=companies[0], key=BASE_KEY, pool=[], size=BASE_SIZE,
+        )
+        return todo
+
+    monkeypatch.setattr(provisioning, "companies_to_provision", racing)
+    report = provision_wheels()
+    assert report.created == 9
+
+
+def test_reset_bumps_generation_to_drop_reserved_blocks(companies):
+    provision_wheels()
+    provision_wheels(reset=True)
+    assert set(ProbabilityWheel.objects.filter(company__in=companies).values_list("generation", flat=True)) == {1}
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from rewards.bench import seed_tenants
+from rewards.management.commands.check_query_plans import ScanNode, plan_problems, scan_nodes
+
+pytestmark = pytest.mark.django_db
+
+
+def test_hot_queries_use_their_index_on_seeded_tenants():
+    # Volumes réalistes et statistiques à jour, planificateur aux réglages par défaut
+    seed_tenants(companies=3, clients=300, referrals=200, seed=5)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    call_command("check_query_plans")
+
+
+def test_plan_parsing_and_problems():
+    sqlite_plan = (
+        "2 0 0 SCAN rewards_reward\n"
+        "3 0 0 SCAN U0 USING COVERING INDEX reward_client_state_id_idx\n"
+        "4 0 0 SEARCH dashboard_client USING INDEX client_ref_list_order_idx (company_id=?)\n"
+        "5 0 0 SEARCH T4 USING INTEGER PRIMARY KEY (rowid=?)\n"
+        "6 0 0 SCAN CONSTANT ROW"
+    )
+    assert scan_nodes(sqlite_plan, "sqlite") == [
+        ScanNode("rewards_reward", None, False),
+        ScanNode("U0", "reward_client_state_id_idx", False),
+        ScanNode("dashboard_client", "client_ref_list_order_idx", True),
+        ScanNode("T4", "PRIMARY KEY", True),
+    ]
+    pg_plan = json.dumps([{"Plan": {"Node Type": "Limit", "Plans": [
+        {"Node Type": "Nested Loop", "Plans": [
+            {"Node Type": "Index Scan", "Relation Name": "rewards_reward",
+             "Index Name": "rewards_reward_pkey"},
+            {"Node Type": "Seq Scan", "Relation Name": "accounts_company"},
+            {"Node Type": "Bitmap Heap Scan", "Relation Name": "dashboard_referral", "Plans": [
+                {"Node Type": "Bitmap Index Scan", "Index Name": "referral_company_created_idx",
+                 "Index Cond": "(company_id = 1)"},
+            ]},
+        ]},
+    ]}}])
+    nodes = scan_nodes(pg_plan, "postgresql")
+    assert sorted(nodes) == sorted([
+        ScanNode("rewards_reward", "rewards_reward_pkey", False),
+        ScanNode("accounts_company", None, False),
+        ScanNode("", "referral_company_created_idx", True),
+    ])
+
+    # Parcours complet de la clé primaire (tri + LIMIT) : refusé même sans Seq Scan
+    assert plan_problems(nodes, {"referral_company_created_idx"}, {"accounts_company"}) == [
+        "index rewards_reward_pkey parcouru sans condition (rewards_reward)",
+    ]
+    # Bon index sur une table, mauvais index (mais borné) sur la requête attendue
+    wrong = [ScanNode("rewards_reward", "rewards_reward_company_id_1d649bdd", True)]
+    assert plan_problems(wrong, {"reward_pending_company_idx"}) == [
+        "aucun index attendu utilisé (reward_pending_company_idx)",
+    ]
+    assert plan_problems([ScanNode("rewards_reward", None, False)], {"x"}) == [
+        "Seq Scan sur rewards_reward", "aucun index attendu utilisé (x)",
+    ]
@@ -0,0 +1,113 @@
+# rewards/tests/test_rng.py
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, transaction
+
+from accounts.models import Company
+from dashboard.models import Client
+from rewards.models import DrawCounter, DrawEvent, RewardTemplate
+from rewards.services import ledger, rng
+from rewards.services.probabilities import (
+    MOYEN, NO_HIT, RARE, SOUVENT, TRES_RARE,
+    replay_normalized, tirer_recompense_with_normalization,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def company():
+    c = Company.objects.create(name="Rng", slug="rng")
+    for bucket in (SOUVENT, MOYEN, RARE, TRES_RARE):
+        RewardTemplate.objects.create(company=c, bucket=bucket, label=bucket)
+    return c
+
+
+@pytest.fixture
+def referrer(company):
+    return Client.objects.create(company=company, last_name="Parrain", first_name="A", is_referrer=True)
+
+
+def test_uniform_is_deterministic_and_per_stream():
+    a = [rng.uniform(rng.company_stream(1), n) for n in range(1, 50)]
+    assert a == [rng.uniform(rng.company_stream(1), n) for n in range(1, 50)]
+    assert a != [rng.uniform(rng.company_stream(2), n) for n in range(1, 50)]
+    assert all(0.0 <= u < 1.0 for u in a)
+
+
+def test_counter_stream_is_reproducible_from_seed():
+    one, two = rng.CounterStream("42"), rng.CounterStream("42")
+    pool = list(range(100))
+    one.shuffle(pool)
+    other = list(range(100))
+    two.shuffle(other)
+    assert pool == other
+    assert one.random() == two.random()
+    assert rng.CounterStream("43").random() != rng.CounterStream("42").random()
+
+
+def test_mask_roundtrip():
+    elig = {SOUVENT: True, MOYEN: False, RARE: True, TRES_RARE: True}
+    assert rng.elig_mask(elig) == 0b1101
+    assert rng.mask_elig(rng.elig_mask(elig)) == elig
+
+
+def test_draws_are_recorded_in_bulk_on_commit_and_replayable(company, referrer,
+                                                              django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        with transaction.atomic():
+            outcomes = [tirer_recompense_with_normalization(company, referrer) for _ in range(30)]
+            assert not DrawEvent.objects.exists()  # rien avant le commit
+
+    events = list(DrawEvent.objects.filter(company=company).order_by("draw_no"))
+    assert [e.draw_no for e in events] == list(range(1, 31))
+    assert [e.get_outcome_display() for e in events] == outcomes
+    assert all(e.mask == 0b1111 for e in events)
+    assert all(replay_normalized(company.id, e.draw_no, e.mask) == e.get_outcome_display() for e in events)
+
+
+def test_rolled_back_draws_are_not_flushed_with_the_next_transaction(company, referrer,
+                                                                       django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                tirer_recompense_with_normalization(company, referrer)
+                raise RuntimeError
+        with transaction.atomic():
+            tirer_recompense_with_normalization(company, referrer)
+
+    # Le n° du tirage annulé est rendu avec lui
+    assert list(DrawEvent.objects.values_list("draw_no", flat=True)) == [1]
+
+
+def test_counter_is_seeded_from_ledger_and_shared_without_cache(company, referrer):
+    DrawEvent.objects.create(company=company, draw_no=41, mask=0b1111, outcome=1)
+    assert rng.next_draw_no(company.id) == 42
+    cache.clear()  # le compteur ne dépend pas du cache
+    assert rng.next_draw_no(company.id) == 43
+    assert DrawCounter.objects.get(company=company).last_no == 43
+
+
+def test_duplicate_draw_no_fails_loudly(company):
+    DrawEvent.objects.create(company=company, draw_no=7, mask=0b1111, outcome=1)
+    with pytest.raises(IntegrityError):
+        with transaction.atomic():
+            DrawEvent.objects.create(company=company, draw_no=7, mask=0b1111, outcome=2)
+    DrawEvent.objects.create(company=company, mask=0, outcome=0)  # tirages sur roue : sans n°
+    DrawEvent.objects.create(company=company, mask=0, outcome=0)
+
+
+def test_replay_draws_command_flags_tampered_outcomes(company, referrer, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        with transaction.atomic():
+            for _ in range(10):
+                tirer_recompense_with_normalization(company, referrer)
+    call_command("replay_draws", company="rng")
+
+    event = DrawEvent.objects.filter(company=company).order_by("draw_no").first()
+    event.outcome = ledger.OUTCOME_CODES[TRES_RARE if event.outcome != ledger.OUTCOME_CODES[TRES_RARE] else NO_HIT]
+    event.save(update_fields=["outcome"])
+    with pytest.raises(CommandError):
+        call_command("replay_draws", company="rng")
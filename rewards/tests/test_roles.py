@@ -0,0 +1,66 @@
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Company, User
+from dashboard.models import Client, Referral
+from dashboard.views import _kpis_for_company
+from rewards.models import Reward
+
+pytestmark = pytest.mark.django_db
+
+
+def test_role_is_derived_from_referral_and_drives_kpis():
+    c = Company.objects.create(name="Shop Roles")
+    referrer = Client.objects.create(company=c, last_name="Parrain")
+    referee = Client.objects.create(company=c, last_name="Filleul")
+    other = Client.objects.create(company=c, last_name="Autre")
+    ref = Referral.objects.create(company=c, referrer=referrer, referee=referee, created_at=timezone.now())
+    ref2 = Referral.objects.create(company=c, referrer=referrer, referee=other, created_at=timezone.now())
+
+    # Rôle non fourni : déduit du parrainage au pre_save
+    rw_referrer = Reward.objects.create(company=c, client=referrer, referral=ref, label="A", bucket="SOUVENT")
+    rw_referee = Reward.objects.create(company=c, client=referee, referral=ref, label="B", bucket="SOUVENT")
+    manual = Reward.objects.create(company=c, client=referee, label="C", bucket="SOUVENT", state="SENT")
+    Reward.objects.create(
+        company=c, client=referrer, referral=ref2, label="D", bucket="RARE",
+        state="SENT", role=Reward.ROLE_REFERRER,
+    )
+
+    assert (rw_referrer.role, rw_referee.role, manual.role) == ("referrer", "referee", "manual")
+
+    k = _kpis_for_company(c)
+    assert (k["rewards_pending"], k["rewards_sent"]) == (1, 1)
+
+
+def test_role_is_settled_at_creation_only(django_assert_num_queries):
+    c = Company.objects.create(name="Shop Roles 2")
+    referrer = Client.objects.create(company=c, last_name="Parrain")
+    referee = Client.objects.create(company=c, last_name="Filleul")
+    other = Client.objects.create(company=c, last_name="Autre")
+    ref = Referral.objects.create(company=c, referrer=referrer, referee=referee, created_at=timezone.now())
+    # Client hors du parrainage : reste « manual »
+    reward = Reward.objects.create(company=c, client=other, referral=ref, label="A", bucket="SOUVENT")
+    assert reward.role == Reward.ROLE_MANUAL
+
+    reward = Reward.objects.get(pk=reward.pk)
+    reward.state = "SENT"
+    with django_assert_num_queries(1):  # l'UPDATE seul, pas de lecture de Referral
+        reward.save(update_fields=["state"])
+
+
+def test_history_shows_other_badge_for_manual_rewards(client):
+    c = Company.objects.create(name="Shop Roles 3")
+    referrer = Client.objects.create(company=c, last_name="Parrain")
+    referee = Client.objects.create(company=c, last_name="Filleul")
+    other = Client.objects.create(company=c, last_name="Tiers")
+    ref = Referral.objects.create(company=c, referrer=referrer, referee=referee, created_at=timezone.now())
+    Reward.objects.create(company=c, client=referrer, referral=ref, label="A", bucket="SOUVENT")
+    Reward.objects.create(company=c, client=other, referral=ref, label="B", bucket="SOUVENT")
+    Reward.objects.create(company=c, client=other, label="C", bucket="SOUVENT")
+
+    client.force_login(User.objects.create_user("roles-admin", password="x", profile="admin", company=c))
+    html = client.get(reverse("rewards:history_company")).content.decode()
+
+    assert html.count(">Parrain</span>") == 1
+    assert html.count(">Autre</span>") == 2
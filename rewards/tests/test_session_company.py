@@ -0,0 +1,37 @@
+# rewards/tests/test_session_company.py
+import pytest
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import RequestFactory
+
+from accounts.models import Company, User
+from rewards.views import _current_company
+
+pytestmark = pytest.mark.django_db
+
+
+def _request(user, **params):
+    request = RequestFactory().get("/rewards/", params)
+    request.user = user
+    request.session = SessionStore()
+    return request
+
+
+def test_superadmin_company_is_written_to_session_only_when_it_changes():
+    a = Company.objects.create(name="A shop")
+    b = Company.objects.create(name="B shop")
+    admin = User.objects.create_superuser("root", password="x")
+
+    request = _request(admin)
+    assert _current_company(request) == a  # 1ʳᵉ entreprise par défaut
+    assert request.session.modified
+
+    request.session.modified = False
+    assert _current_company(request) == a
+    request.GET = request.GET.copy()
+    request.GET["company"] = str(a.id)
+    assert _current_company(request) == a
+    assert not request.session.modified  # même valeur : pas de réécriture de session
+
+    request.GET["company"] = str(b.id)
+    assert _current_company(request) == b
+    assert request.session.modified and request.session["dash_company_id"] == b.id
@@ -0,0 +1,61 @@
+import json
+from collections import Counter
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from rewards.management.commands.stress_wheels import exactness_report, expected_slots
+from rewards.services.probabilities import BASE_KEY, VERY_RARE_KEY, _build_base_pool, _build_very_rare_pool
+
+
+def test_expected_slots_wraps_around_the_cycle():
+    pool = ["A", "B", "B", "C"]
+    assert expected_slots(pool, 3, 2) == Counter({"C": 1, "A": 1})
+    assert expected_slots(pool, 1, 9) == Counter({"A": 2, "B": 5, "C": 2})
+
+
+def test_exactness_report_flags_duplicated_slots():
+    base, vr = _build_base_pool(), _build_very_rare_pool()
+    before = {BASE_KEY: (0, base), VERY_RARE_KEY: (0, vr)}
+    exact = Counter({"SOUVENT": 980, "MOYEN": 19, "RARE": 1})
+
+    assert exactness_report(before, {BASE_KEY: 0, VERY_RARE_KEY: 1000}, exact)["ok"] is True
+
+    # Deux tirages sur la même case : un SOUVENT de trop, curseur en retard
+    dup = exactness_report(before, {BASE_KEY: 999, VERY_RARE_KEY: 999}, exact)
+    assert dup["ok"] is False and dup["checks"]["base_cursor"] is False
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stress_command_sequential_run_is_exact():
+    out = StringIO()
+    call_command("stress_wheels", "--company", "stress-test", "--create", "--draws", "1000",
+                 "--threads", "1", "--json", stdout=out, stderr=StringIO())
+    report = json.loads(out.getvalue())
+
+    assert report["kinds"]["draw"]["calls"] == 1000 and report["kinds"]["draw"]["errors"] == 0
+    assert report["exactness"]["ok"] is True
+    assert report["exactness"]["got"] == {"SOUVENT": 980, "MOYEN": 19, "RARE": 1}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stress_command_block_mode_is_exact():
+    out = StringIO()
+    call_command("stress_wheels", "--company", "stress-blocks", "--create", "--draws", "1000",
+                 "--threads", "1", "--block-size", "64", "--json", stdout=out, stderr=StringIO())
+    report = json.loads(out.getvalue())
+
+    assert report["block_size"] == 64
+    assert report["exactness"]["ok"] is True
+    assert report["exactness"]["got"] == {"SOUVENT": 980, "MOYEN": 19, "RARE": 1}
+
+
+def test_exactness_report_accounts_for_returned_spare_slots():
+    base, vr = _build_base_pool(), _build_very_rare_pool()
+    before = {BASE_KEY: (0, base), VERY_RARE_KEY: (0, vr)}
+    # 10 tirages, dont la case 3 réservée puis rendue : curseur à 11
+    outcomes = Counter(base[s] for s in range(11) if s != 3)
+    report = exactness_report(before, {BASE_KEY: 11, VERY_RARE_KEY: 11}, outcomes,
+                              {BASE_KEY: [3], VERY_RARE_KEY: [3]})
+    assert report["ok"] is True
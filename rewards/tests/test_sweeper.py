@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from accounts.models import Company
+from dashboard.models import Client
+from rewards.models import Reward, RewardSweep
+from rewards.services.sweeper import expire_stale_rewards
+
+pytestmark = pytest.mark.django_db
+
+
+def _rewards(company, client, n, *, expires_in_days, state="PENDING"):
+    out = []
+    for i in range(n):
+        rw = Reward.objects.create(company=company, client=client, label=f"R{i}", bucket="SOUVENT", state=state)
+        Reward.objects.filter(pk=rw.pk).update(token_expires_at=timezone.now() + timedelta(days=expires_in_days))
+        out.append(rw)
+    return out
+
+
+def test_sweeper_expires_only_stale_pending_rewards_in_chunks():
+    c = Company.objects.create(name="Shop Sweep")
+    cl = Client.objects.create(company=c, last_name="Kim")
+    stale = _rewards(c, cl, 5, expires_in_days=-1)
+    live = _rewards(c, cl, 2, expires_in_days=+10)
+    sent = _rewards(c, cl, 1, expires_in_days=-1, state="SENT")
+
+    dry = expire_stale_rewards(chunk_size=2, dry_run=True)
+    assert dry.expired == 5 and Reward.objects.filter(state="PENDING").count() == 7
+
+    sweep = expire_stale_rewards(chunk_size=2)
+    assert (sweep.expired, sweep.batches) == (5, 3)
+    assert sweep.per_company == {str(c.id): 5}
+    assert set(Reward.objects.filter(state="EXPIRED").values_list("id", flat=True)) == {r.id for r in stale}
+    assert Reward.objects.filter(id__in=[r.id for r in live], state="PENDING").count() == 2
+    assert Reward.objects.get(pk=sent[0].pk).state == "SENT"
+
+    call_command("expire_rewards", "--max-batches", "1")
+    assert RewardSweep.objects.count() == 3
+    assert RewardSweep.objects.first().expired == 0
@@ -0,0 +1,98 @@
+# rewards/tests/test_wheel_blocks.py
+from collections import Counter
+
+import pytest
+
+from accounts.models import Company
+from dashboard.models import Client
+from rewards.models import ProbabilityWheel, RewardTemplate
+from rewards.services import wheel_blocks
+from rewards.services.probabilities import (
+    BASE_KEY, MOYEN, RARE, SOUVENT, TRES_RARE, VERY_RARE_KEY, ensure_wheels, tirer_recompense,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def company():
+    c = Company.objects.create(name="Blocs", slug="blocs")
+    for bucket in (SOUVENT, MOYEN, RARE, TRES_RARE):
+        RewardTemplate.objects.create(company=c, bucket=bucket, label=bucket)
+    ensure_wheels(c)
+    ProbabilityWheel.objects.filter(company=c).update(block_size=50)
+    yield c
+    wheel_blocks.release_all()
+
+
+@pytest.fixture
+def referrer(company):
+    return Client.objects.create(company=company, last_name="Parrain", first_name="A", is_referrer=True)
+
+
+def _idx(company, key=BASE_KEY):
+    return ProbabilityWheel.objects.get(company=company, key=key)
+
+
+def test_block_is_reserved_once_and_unused_slots_returned(company, referrer):
+    tirer_recompense(company, referrer)
+    assert _idx(company).idx == 50  # un seul idx += k pour le bloc
+
+    tirer_recompense(company, referrer)
+    assert _idx(company).idx == 50  # servi depuis le bloc local
+
+    assert wheel_blocks.release_all() == 48 + 48
+    base, vr = _idx(company), _idx(company, VERY_RARE_KEY)
+    assert (base.idx, base.spare) == (2, [])  # personne n'a réservé depuis : le curseur recule
+    assert (vr.idx, vr.spare) == (2, [])
+
+
+def test_slots_go_to_spare_when_cursor_moved_and_are_served_first(company, referrer):
+    tirer_recompense(company, referrer)
+    ProbabilityWheel.objects.filter(company=company, key=BASE_KEY).update(idx=120)  # autre processus
+
+    wheel_blocks.release_all()
+    base = _idx(company)
+    assert base.idx == 120 and base.spare == list(range(1, 50))
+
+    tirer_recompense(company, referrer)
+    base = _idx(company)
+    assert base.spare == [] and base.idx == 121  # 49 cases rendues + 1 neuve
+
+
+def test_block_mode_keeps_the_exact_cycle(company, referrer):
+    got = Counter(tirer_recompense(company, referrer) for _ in range(1000))
+    wheel_blocks.release_all()
+
+    assert got == Counter({SOUVENT: 980, MOYEN: 19, RARE: 1})
+    assert _idx(company).idx == 0
+    assert _idx(company, VERY_RARE_KEY).idx == 1000
+
+
+def test_direct_mode_advances_cursor_per_draw(company, referrer):
+    ProbabilityWheel.objects.filter(company=company).update(block_size=0)
+    for _ in range(3):
+        tirer_recompense(company, referrer)
+    assert _idx(company).idx == 3 and _idx(company, VERY_RARE_KEY).idx == 3
+
+
+def test_reset_drops_blocks_reserved_on_the_previous_generation(company, referrer):
+    from rewards.services.probabilities import reset_wheel
+
+    for _ in range(10):
+        tirer_recompense(company, referrer)
+    reset_wheel(company, BASE_KEY)
+
+    tirer_recompense(company, referrer)
+    base = _idx(company)
+    assert base.idx == 50  # nouveau bloc 0..49 : l'ancien (10..49) n'est plus servi
+    assert wheel_blocks.release_all() == 49 + 39  # base : 1..49 ; very_rare : reste du 1ᵉʳ bloc
+    assert (_idx(company).idx, _idx(company).spare) == (1, [])
+
+
+def test_stale_caller_wheel_is_reloaded_at_reservation(company):
+    base, _vr = ensure_wheels(company)
+    ProbabilityWheel.objects.filter(pk=base.pk).update(generation=base.generation + 1, idx=7)
+
+    value, slot = wheel_blocks.consume(base, {SOUVENT, MOYEN, RARE})
+    assert slot == 7 and base.generation == _idx(company).generation
@@ -0,0 +1,86 @@
+# rewards/tests/test_wheel_specs.py
+from collections import Counter
+
+import pytest
+
+from accounts.models import Company
+from dashboard.models import Client
+from rewards.models import ProbabilityWheel, RewardTemplate
+from rewards.services.probabilities import (
+    BASE_KEY, MOYEN, NO_HIT, RARE, SOUVENT, TRES_RARE, VERY_RARE_KEY,
+    _build_base_pool, compiled_pool, ensure_wheels, rebuild_wheel, set_wheel_spec,
+    tirer_recompense, validate_spec, wheel_specs,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def company():
+    c = Company.objects.create(name="Cotes", slug="cotes")
+    for bucket in (SOUVENT, MOYEN, RARE, TRES_RARE):
+        RewardTemplate.objects.create(company=c, bucket=bucket, label=bucket)
+    ensure_wheels(c)
+    return c
+
+
+def _wheel(company, key=BASE_KEY):
+    return ProbabilityWheel.objects.get(company=company, key=key)
+
+
+def test_validate_spec_rejects_bad_input_and_canonicalizes_order():
+    assert list(validate_spec(BASE_KEY, {RARE: 2, SOUVENT: 90, MOYEN: 8})) == [SOUVENT, MOYEN, RARE]
+    for bad in ({}, {TRES_RARE: 1}, {SOUVENT: -1}, {SOUVENT: 1.5}, {SOUVENT: 0}):
+        with pytest.raises(ValueError):
+            validate_spec(BASE_KEY, bad)
+
+
+def test_compiled_pool_is_cached_and_matches_the_legacy_layout():
+    assert compiled_pool({SOUVENT: 980, MOYEN: 19, RARE: 1}) is compiled_pool({RARE: 1, MOYEN: 19, SOUVENT: 980})
+    assert list(compiled_pool({SOUVENT: 980, MOYEN: 19, RARE: 1})) == _build_base_pool()
+
+
+def test_custom_odds_drive_the_draws(company):
+    set_wheel_spec(company, BASE_KEY, {SOUVENT: 90, MOYEN: 8, RARE: 2})
+    referrer = Client.objects.create(company=company, last_name="P", first_name="A", is_referrer=True)
+
+    got = Counter(tirer_recompense(company, referrer) for _ in range(100))
+    assert got == Counter({SOUVENT: 90, MOYEN: 8, RARE: 2})
+    assert wheel_specs(company)[BASE_KEY] == {SOUVENT: 90, MOYEN: 8, RARE: 2}
+    assert wheel_specs(company)[VERY_RARE_KEY] == {NO_HIT: 99_999, TRES_RARE: 1}
+
+
+def test_changing_odds_keeps_cycle_position(company):
+    ProbabilityWheel.objects.filter(company=company, key=BASE_KEY).update(idx=500)
+
+    set_wheel_spec(company, BASE_KEY, {SOUVENT: 970, MOYEN: 25, RARE: 5})  # même taille
+    w = _wheel(company)
+    assert (w.idx, w.size, w.pool.count(RARE)) == (500, 1000, 5)
+
+    set_wheel_spec(company, BASE_KEY, {SOUVENT: 180, MOYEN: 19, RARE: 1})  # taille 200
+    w = _wheel(company)
+    assert (w.idx, w.size) == (100, 200)
+
+    set_wheel_spec(company, BASE_KEY, None)  # retour aux cotes par défaut
+    w = _wheel(company)
+    assert (w.spec, w.size, w.idx) == ({}, 1000, 500)
+
+
+def test_ensure_wheels_keeps_custom_odds(company):
+    set_wheel_spec(company, BASE_KEY, {SOUVENT: 45, MOYEN: 5})
+    base, _ = ensure_wheels(company)
+    assert base.size == 50 and _wheel(company).size == 50
+    assert list(base.pool) == [SOUVENT] * 45 + [MOYEN] * 5
+
+
+def test_rebuild_wheel_accepts_custom_keys(company):
+    with pytest.raises(ValueError):
+        rebuild_wheel(company, "saisonniere")
+
+    rebuild_wheel(company, "saisonniere", {SOUVENT: 3, TRES_RARE: 1})
+    w = _wheel(company, "saisonniere")
+    assert (w.size, w.idx, w.spec) == (4, 0, {SOUVENT: 3, TRES_RARE: 1})
+
+    ProbabilityWheel.objects.filter(pk=w.pk).update(idx=2)
+    rebuild_wheel(company, "saisonniere")  # depuis la spec enregistrée
+    assert (_wheel(company, "saisonniere").idx, _wheel(company, "saisonniere").size) == (0, 4)
@@ -0,0 +1,72 @@
+# rewards/tokens.py
+"""
+Jetons des liens publics de récompense (/rewards/use/<token>/).
+
+Deux formats coexistent :
+- aléatoire (historique) : secrets.token_urlsafe(24), 32 caractères [A-Za-z0-9_-],
+  résolu par l'index unique Reward.token ;
+- signé (REWARD_SIGNED_TOKENS) : "<id>.<company>.<expiration>:<signature>"
+  (base 36 + signature django.core.signing), vérifiable sans base de données,
+  résolu par clé primaire.
+
+Dans les deux cas, un jeton mal formé est rejeté avant toute requête.
+"""
+from __future__ import annotations
+
+import re
+import secrets
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+from typing import Optional
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+from django.utils.http import base36_to_int, int_to_base36
+
+REWARD_TOKEN_SALT = "rewards.claim-token"
+
+_RANDOM_TOKEN_RE = re.compile(r"^[A-Za-z0-9_-]{32}$")
+
+
+@dataclass(frozen=True)
+class SignedClaim:
+    reward_id: int
+    company_id: int
+    expires_at: datetime
+
+
+def signed_tokens_enabled() -> bool:
+    return bool(getattr(settings, "REWARD_SIGNED_TOKENS", False))
+
+
+def random_token() -> str:
+    return secrets.token_urlsafe(24)
+
+
+def is_signed_token(token: str) -> bool:
+    return ":" in (token or "")
+
+
+def looks_like_random_token(token: str) -> bool:
+    return bool(_RANDOM_TOKEN_RE.match(token or ""))
+
+
+def make_signed_token(reward_id: int, company_id: int, expires_at: datetime) -> str:
+    value = ".".join(
+        int_to_base36(int(n)) for n in (reward_id, company_id, int(expires_at.timestamp()))
+    )
+    return signing.Signer(salt=REWARD_TOKEN_SALT).sign(value)
+
+
+def parse_signed_token(token: str, *, now: Optional[datetime] = None) -> Optional[SignedClaim]:
+    """Contenu d'un jeton signé valide et non expiré, sinon None (aucune requête)."""
+    try:
+        value = signing.Signer(salt=REWARD_TOKEN_SALT).unsign(token)
+        rid, cid, exp = (base36_to_int(part) for part in value.split("."))
+    except (signing.BadSignature, ValueError):
+        return None
+    expires_at = datetime.fromtimestamp(exp, tz=dt_timezone.utc)
+    if expires_at <= (now or timezone.now()):
+        return None
+    return SignedClaim(reward_id=rid, company_id=cid, expires_at=expires_at)
@@ -18,12 +18,15 @@ from django.utils import timezone
 from django.views.decorators.http import require_POST
 
 from accounts.models import Company
+from core import events
 from dashboard.models import Referral
 from rewards.services import award_both_parties
 from .models import RewardTemplate, Reward, ProbabilityWheel
 from .forms import RewardTemplateForm
-from rewards.services.probabilities import BASE_COUNTS, VR_COUNTS, BASE_SIZE, VR_SIZE
+from rewards.services.probabilities import wheel_specs
 from .services.smsmode import SMSPayload, send_sms, build_reward_sms_text
+from .services.rng import CounterStream
+from .services.claims import get_claim
 from common.phone_utils import normalize_msisdn
 
 logger = logging.getLogger(__name__)
@@ -40,6 +43,7 @@ BUCKET_UI = {
 STATE_UI = {
     "PENDING":  {"label": "En attente",   "badge": "warning"},
     "SENT":     {"label": "Distribué",      "badge": "success"},
+    "EXPIRED":  {"label": "Expirée",        "badge": "secondary"},
 }
 
 
@@ -51,6 +55,12 @@ def _is_superadmin(u) -> bool:
 def _company_for(u):
     return getattr(u, "company", None)
 
+def _remember_company(request, company: Company) -> None:
+    # On stocke proprement l'int, et seulement s'il change : sinon pas de réécriture de session
+    if request.session.get("dash_company_id") != company.id:
+        request.session["dash_company_id"] = company.id
+
+
 def _current_company(request, *, allow_default_for_superadmin: bool = True) -> Company | None:
     """
     Admin/Opérateur : user.company
@@ -75,14 +85,14 @@ def _current_company(request, *, allow_default_for_superadmin: bool = True) -> C
     # On résout l'entreprise (Django accepte int/str pour pk)
     company = Company.objects.filter(pk=raw_cid).first() if raw_cid else None
     if company:
-        request.session["dash_company_id"] = company.id  # on stocke proprement l'int
+        _remember_company(request, company)
         return company
 
     # Fallback : 1ʳᵉ entreprise (si autorisé)
     if allow_default_for_superadmin:
         company = Company.objects.order_by("name").first()
         if company:
-            request.session["dash_company_id"] = company.id
+            _remember_company(request, company)
         return company
 
     return None
@@ -237,10 +247,11 @@ def reward_list(request):
     # 3) Préparer l'affichage (paire (template, ui))
     items = [(tpl, BUCKET_UI[tpl.bucket]) for tpl in items_sorted]
 
-    # 4) Données de la roue de test (probas identiques à Reward)
+    # 4) Données de la roue de test (cotes de l'entreprise, identiques au tirage réel)
+    specs = wheel_specs(company)
     test_wheel = {
-        "base": {"size": BASE_SIZE, "counts": BASE_COUNTS},
-        "very_rare": {"size": VR_SIZE, "counts": VR_COUNTS},
+        "base": {"size": sum(specs[_BASE_KEY].values()), "counts": specs[_BASE_KEY]},
+        "very_rare": {"size": sum(specs[_VERY_RARE_KEY].values()), "counts": specs[_VERY_RARE_KEY]},
     }
 
     return render(request, "rewards/list.html", {
@@ -279,7 +290,7 @@ def rewards_history_company(request):
 
     base_qs = (
         Reward.objects
-        .select_related("company", "client", "referral", "referral__referrer", "referral__referee")
+        .select_related("company", "client")
         .order_by("-created_at", "-id")
     )
 
@@ -300,7 +311,10 @@ def rewards_history_company(request):
     bucket = (request.GET.get("bucket") or "").strip().upper()
     state  = (request.GET.get("state") or "").strip().upper()
     q      = (request.GET.get("q") or "").strip()
+    role   = (request.GET.get("role") or "").strip().lower()
 
+    if role in dict(Reward.ROLE_CHOICES):
+        qs = qs.filter(role=role)
     if bucket in BUCKET_UI:
         qs = qs.filter(bucket=bucket)
     if state in STATE_UI:
@@ -321,6 +335,8 @@ def rewards_history_company(request):
         "page": page,
         "bucket": bucket,
         "state": state,
+        "role": role,
+        "roles": Reward.ROLE_CHOICES,
         "q": q,
         "BUCKET_UI": BUCKET_UI,
         "STATE_UI": STATE_UI,
@@ -359,69 +375,29 @@ def reward_spin(request, reward_id: int):
 def use_reward(request, token):
     """
     Page publique d'une récompense (par token) avec un rendu "joli".
-    AUCUN changement de logique métier : on enrichit juste le contexte.
+    Données lues depuis la projection en cache (rewards.services.claims) :
+    0 requête pour un lien déjà ouvert, 1 sinon.
     """
-    reward = get_object_or_404(
-        Reward.objects.select_related(
-            "company", "client", "referral", "referral__referrer", "referral__referee"
-        ),
-        token=token,
-    )
+    claim = get_claim(token)
+    if claim is None:
+        raise Http404("Récompense introuvable")
 
     # Message informatif si la récompense n'est plus en attente
-    if reward.state != "PENDING":
+    if claim["state"] != "PENDING":
         messages.info(
             request,
             "Cette récompense n’est plus en attente (déjà distribuée ou inactive)."
         )
 
-    # Données d'en-tête
-    company_name = (getattr(reward.company, "name", "") or "").strip()
-    client_name  = (reward.client.first_name or reward.client.last_name or "").strip()
-
-    # Si la récompense provient d'un parrainage, on personnalise :
-    is_ref = bool(reward.referral_id)
-    is_referrer = is_ref and reward.client_id == reward.referral.referrer_id
-    is_referee  = is_ref and reward.client_id == reward.referral.referee_id
-
-    referrer_name = ""
-    referee_name  = ""
-    if is_ref:
-        referrer_name = (reward.referral.referrer.first_name or reward.referral.referrer.last_name or "").strip()
-        referee_name  = (reward.referral.referee.first_name  or reward.referral.referee.last_name  or "").strip()
-
-    # Phrases d'accroche (comme sur la maquette)
-    if is_referrer:
-        headline  = f"Félicitations {client_name} !" if client_name else "Félicitations !"
-        celebrate = f"Tu as fait découvrir {company_name} à {referee_name}".strip()
-        subline   = "Voici ton cadeau 🎁"
-        ribbon    = f"Parrainage validé grâce à {referee_name}".strip()
-    elif is_referee:
-        headline  = f"Bienvenue {client_name} !" if client_name else "Bienvenue !"
-        celebrate = f"Parrainage validé grâce à {referrer_name}".strip()
-        subline   = "Voici ton cadeau 🎁"
-        ribbon    = "Ton cadeau"
-    else:
-        headline  = f"Félicitations {client_name} !" if client_name else "Félicitations !"
-        celebrate = company_name
-        subline   = "Voici ton cadeau 🎁"
-        ribbon    = "Ton cadeau"
-
-    claim_absolute = request.build_absolute_uri(reward.claim_path) if reward.claim_path else ""
-
-    template = RewardTemplate.objects.filter(
-        company=reward.company, bucket=reward.bucket
-    ).first()
-
     context = {
-        "reward": reward,
-        "template": template,
-        "headline": headline,
-        "celebrate": celebrate,
-        "subline": subline,
-        "ribbon": ribbon,
-        "company_name": company_name,
-        "claim_absolute": claim_absolute,
+        "reward": claim,
+        "template": {"only_on_some_items": claim["only_on_some_items"]},
+        "headline": claim["headline"],
+        "celebrate": claim["celebrate"],
+        "subline": claim["subline"],
+        "ribbon": claim["ribbon"],
+        "company_name": claim["company_name"],
+        "claim_absolute": request.build_absolute_uri(claim["claim_path"]),
     }
     return render(request, "rewards/use_reward.html", context)
 
@@ -616,13 +592,14 @@ def test_wheel(request):
       - very_rare         : TRES_RARE vs NO_HIT
     GET:
       - n    : simuler N tirages
-      - seed : graine RNG (reproductible)
+      - seed : graine RNG (reproductible : tirage affiché ET simulation,
+               générateur à compteur de rewards.services.rng)
       - mode : combined | base | very_rare
     """
     mode = (request.GET.get("mode") or "combined").lower()
     simulate_n = int(request.GET.get("n") or 0)
     seed = request.GET.get("seed")
-    rng = random.Random(seed) if seed else random
+    rng = CounterStream(seed) if seed else random
 
     # Probabilités demandées
     P_S  = Decimal("80") / Decimal("100")        # 0.80
@@ -767,9 +744,12 @@ def reward_send_sms(request, pk: int):
     )
     result = send_sms(payload)
 
-    # Log utile pour debug (meta contient ce qu'a fait la normalisation)
-    logger.warning("SMS SEND to=%s ok=%s status=%s meta=%s raw=%s",
-                   to_e164, result.ok, result.status, meta, (result.raw or {}))
+    # Sans la réponse brute du fournisseur ; WARNING (non échantillonné) en cas d'échec
+    events.emit(
+        "sms.sent", None if result.ok else logging.WARNING,
+        role="manual", reward=reward.id, ok=result.ok, status=result.status,
+        provider_id=result.provider_id,
+    )
 
     if result.ok:
         messages.success(request, "SMS envoyé au client.")